@@ -0,0 +1,1046 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for TCGInventoryUpdater
+
+Usage:
+    python benchmark.py startup [--repeat N] [--exe FROZEN_APP] [--json PATH] [--max-cli-ms MS]
+    python benchmark.py parallel [--files N] [--rows N] [--max-workers N]
+    python benchmark.py encoding [--rows N]
+    python benchmark.py load [--rows N]
+    python benchmark.py formats [--rows N] [--repeat N]
+    python benchmark.py stream [--rows N] [--chunk-rows N] [--ceiling-mb N]
+    python benchmark.py keys [--rows N] [--repeat N]
+    python benchmark.py fuzzy [--rows N] [--repeat N] [--min-precision P]
+    python benchmark.py write [--rows N] [--repeat N]
+    python benchmark.py fanout [--stores N] [--rows N] [--scans N] [--scan-rows N] [--workers N]
+    python benchmark.py suite [--sizes N ...] [--json PATH] [--compare BASELINE.json] [--max-slowdown X]
+"""
+
+import argparse
+import csv
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_MAIN = os.path.join(HERE, "sample_main_inventory.csv")
+SAMPLE_ADDITIONS = [
+    os.path.join(HERE, "sample_addition1.csv"),
+    os.path.join(HERE, "sample_addition2.csv"),
+]
+
+# tcg_inventory_updater.STARTUP_PROBE_ENV: the app records its startup times there and quits
+STARTUP_PROBE_ENV = "TCG_INVENTORY_STARTUP_PROBE"
+# Modules whose import time the startup benchmark reports
+IMPORT_TIME_MODULES = ("tcg_inventory_updater", "inventory_cli", "inventory_core")
+# Cold start target for a CLI dry run on the sample files
+CLI_STARTUP_TARGET_MS = 300
+
+
+def time_command(cmd, repeat):
+    """Run cmd repeat times and return the wall times in seconds, or None if it fails"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"  failed: {result.stderr.decode(errors='replace').strip().splitlines()[-1:]}")
+            return None
+        timings.append(elapsed)
+    return timings
+
+
+def report(label, timings):
+    if timings is None:
+        print(f"{label:<28} unavailable")
+        return
+    print(f"{label:<28} median {statistics.median(timings) * 1000:8.1f} ms   "
+          f"min {min(timings) * 1000:8.1f} ms   ({len(timings)} runs)")
+
+
+def import_times(module):
+    """(cumulative seconds, {direct import: cumulative seconds}) for importing module, from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    total = None
+    children = {}
+    # Lines look like "import time:  self | cumulative | name", the name indented two spaces per level,
+    # and each module is listed after everything it imported
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        seconds = int(fields[1]) / 1e6
+        if depth == 0 and name.strip() == module:
+            total = seconds
+        elif depth == 1:
+            children[name.strip()] = seconds
+        elif depth == 0:
+            children = {}
+    if total is None:
+        return None
+    return total, children
+
+
+def probe_startup(cmd, repeat):
+    """(seconds to first idle, seconds to engine loaded) per launch of the GUI, or None if it fails"""
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            probe_path = os.path.join(tmp, "startup.json")
+            env = dict(os.environ, **{STARTUP_PROBE_ENV: probe_path})
+            launched = time.time()
+            try:
+                result = subprocess.run(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                        timeout=120)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                print(f"  failed: {e}")
+                return None
+            if result.returncode != 0 or not os.path.exists(probe_path):
+                print(f"  failed: {result.stderr.decode(errors='replace').strip().splitlines()[-1:]}")
+                return None
+            with open(probe_path, "r", encoding="utf-8") as f:
+                probe = json.load(f)
+        runs.append((probe["first_idle_at"] - launched, probe["engine_ready_at"] - launched))
+    return runs
+
+
+def report_probe(label, runs, results):
+    """Print and record the median time to first idle and to engine loaded"""
+    if runs is None:
+        print(f"{label:<28} unavailable")
+        return
+    first_idle = statistics.median(run[0] for run in runs)
+    engine_ready = statistics.median(run[1] for run in runs)
+    print(f"{label:<28} first idle {first_idle * 1000:8.1f} ms   engine loaded {engine_ready * 1000:8.1f} ms   "
+          f"({len(runs)} runs)")
+    results[label] = {"first_idle_seconds": first_idle, "engine_ready_seconds": engine_ready}
+
+
+def bench_startup(args):
+    """Import times, CLI cold start, and GUI time to first idle from source and (with --exe) frozen"""
+    cli_cmd = [sys.executable, "inventory_cli.py", "merge", "--main", SAMPLE_MAIN, "--quiet"]
+    for path in SAMPLE_ADDITIONS:
+        cli_cmd += ["--add", path]
+    report_data = {
+        "version": 1,
+        "commit": git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "imports": {},
+        "startup": {},
+    }
+
+    print(f"Import time (-X importtime, median of {args.repeat})")
+    for module in IMPORT_TIME_MODULES:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        if any(run is None for run in runs):
+            print(f"{module:<28} unavailable")
+            continue
+        total = statistics.median(run[0] for run in runs)
+        heaviest = sorted(runs[-1][1].items(), key=lambda item: item[1], reverse=True)[:4]
+        print(f"{module:<28} {total * 1000:8.1f} ms   heaviest: "
+              + ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in heaviest))
+        report_data["imports"][module] = {"seconds": total, "heaviest": dict(heaviest)}
+
+    print("Startup (sample files)")
+    # The floor for any merge: the CLI cannot start faster than pandas imports
+    floor = time_command([sys.executable, "-c", "import pandas"], args.repeat)
+    report("import pandas (floor)", floor)
+    timings = time_command(cli_cmd, args.repeat)
+    report("CLI merge (dry run)", timings)
+    if timings is not None:
+        report_data["startup"]["CLI merge (dry run)"] = {"seconds": statistics.median(timings)}
+    if floor is not None:
+        report_data["startup"]["import pandas (floor)"] = {"seconds": statistics.median(floor)}
+    report_probe("GUI from source", probe_startup([sys.executable, "tcg_inventory_updater.py"], args.repeat),
+                 report_data["startup"])
+    if args.exe:
+        report_probe("GUI frozen build", probe_startup([os.path.abspath(args.exe)], args.repeat),
+                     report_data["startup"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report_data, f, indent=2)
+        print(f"Report written to {args.json}")
+
+    if timings is None:
+        return 1
+    if statistics.median(timings) * 1000 > args.max_cli_ms:
+        print(f"FAIL: CLI cold start is over the {args.max_cli_ms:.0f} ms target")
+        return 1
+    return 0
+
+
+SETS = ["Magic 2011", "Magic 2010", "Alpha", "Commander 2013", "Tempest", "Dominaria", "Ravnica", "Zendikar"]
+CONDITIONS = ["Near Mint", "Lightly Played", "Moderately Played", "Heavily Played", "Damaged"]
+# Spellings a scanner export might use instead, for the fuzzy matching benchmark
+CONDITION_CODES = {"Near Mint": "NM", "Lightly Played": "LP", "Moderately Played": "MP", "Heavily Played": "HP",
+                   "Damaged": "DMG"}
+SET_CODES = {"Magic 2011": "M11", "Magic 2010": "M10", "Commander 2013": "C13", "Tempest": "TMP", "Dominaria": "DOM"}
+
+
+# Extra columns carried by a full TCGplayer export but never used for matching
+EXTRA_COLUMNS = ["TCGplayer Id", "Rarity", "TCG Market Price", "TCG Direct Low", "TCG Low Price With Shipping",
+                 "TCG Low Price", "Total Quantity", "TCG Marketplace Price", "Photo URL", "SKU"]
+
+
+def misspell(rng, name):
+    """Drop one letter from name"""
+    position = rng.randrange(len(name))
+    return name[:position] + name[position + 1:]
+
+
+def write_secondary_csv(path, rows, seed, wide=False, dirty=0.0, truth=None):
+    """Write a synthetic scanner export, a dirty fraction of its keys misspelled; truth maps each to its card"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Product Line", "Set", "Product Name", "Number", "Condition", "Quantity"]
+                        + (EXTRA_COLUMNS if wide else []))
+        for _ in range(rows):
+            card = rng.randrange(5000)
+            row = ["Magic", SETS[card % len(SETS)], f"Card {card}", card % 300 + 1,
+                   rng.choice(CONDITIONS), rng.randint(1, 4)]
+            clean = tuple(str(value) for value in row[:5])
+            if rng.random() < dirty:
+                kind = rng.randrange(4)
+                if kind == 0:
+                    row[4] = CONDITION_CODES[row[4]]
+                elif kind == 1:
+                    row[1] = SET_CODES.get(row[1], row[1])
+                elif kind == 2:
+                    row[3] = f"{row[3]:03d}"
+                else:
+                    row[2] = misspell(rng, row[2])
+            if truth is not None:
+                truth[tuple(str(value) for value in row[:5])] = clean
+            if wide:
+                price = round(rng.uniform(0.1, 50), 2)
+                row += [100000 + card, "Rare", price, price, price + 0.99, price, rng.randint(0, 20), price,
+                        f"https://tcgplayer-cdn.tcgplayer.com/product/{100000 + card}_200w.jpg", f"SKU-{card:06d}"]
+            writer.writerow(row)
+
+
+def write_main_csv(path, rows, seed):
+    """Write a synthetic main inventory with one row per card/condition"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Product Line", "Set Name", "Product Name", "Number", "Condition", "Add to Quantity"]
+                        + EXTRA_COLUMNS)
+        for row_number in range(rows):
+            card, condition = divmod(row_number, len(CONDITIONS))
+            price = round(rng.uniform(0.1, 50), 2)
+            writer.writerow(["Magic", SETS[card % len(SETS)], f"Card {card}", card % 300 + 1, CONDITIONS[condition],
+                             rng.randint(0, 3), 100000 + card, "Rare", price, price, price + 0.99, price,
+                             rng.randint(0, 20), price, f"https://tcgplayer-cdn.tcgplayer.com/product/{100000 + card}_200w.jpg",
+                             f"SKU-{card:06d}"])
+
+
+def bench_parallel(args):
+    """Time parsing and pre-aggregating secondary files with 1..N pool workers"""
+    import inventory_core
+
+    max_workers = args.max_workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"scan_{i:03d}.csv")
+            write_secondary_csv(path, args.rows, seed=i)
+            paths.append(path)
+
+        print(f"Parallel secondary loading ({args.files} files x {args.rows:,} rows)")
+        baseline = None
+        reference = None
+        mismatched = False
+        for workers in range(1, max_workers + 1):
+            start = time.perf_counter()
+            partials = inventory_core.load_secondary_partials(paths, workers)
+            aggregated = inventory_core.reduce_partials(partials.values())
+            elapsed = time.perf_counter() - start
+
+            if reference is None:
+                reference = aggregated
+            elif aggregated != reference:
+                print(f"  MISMATCH with {workers} workers")
+                mismatched = True
+            baseline = baseline or elapsed
+            print(f"  {workers:>2} workers  {elapsed:8.3f} s   speedup {baseline / elapsed:5.2f}x")
+    return 1 if mismatched else 0
+
+
+def bench_fanout(args):
+    """One merge per store vs one fan-out merge over 1..N stores sharing the same scans"""
+    import inventory_core
+    from inventory_metrics import StageTimer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main_paths = []
+        for store in range(args.stores):
+            path = os.path.join(tmp, f"store_{store}.csv")
+            write_main_csv(path, args.rows, seed=store)
+            main_paths.append(path)
+        scan_paths = []
+        for scan in range(args.scans):
+            path = os.path.join(tmp, f"scan_{scan}.csv")
+            write_secondary_csv(path, args.scan_rows, seed=100 + scan, wide=True)
+            scan_paths.append(path)
+
+        print(f"Fan-out merge ({args.rows:,} main rows per store, {args.scans} scans x {args.scan_rows:,} rows)")
+        print(f"  {'stores':>6}  {'separate':>10}  {'fan-out':>10}  {'aggregate':>10}  {'stores':>10}")
+        for count in range(1, args.stores + 1):
+            start = time.perf_counter()
+            for main_path in main_paths[:count]:
+                inventory_core.merge_inventory(main_path, scan_paths, os.path.join(tmp, "separate.csv"),
+                                               workers=args.workers)
+            separate = time.perf_counter() - start
+
+            out_dir = os.path.join(tmp, f"out_{count}")
+            os.makedirs(out_dir)
+            timer = StageTimer()
+            start = time.perf_counter()
+            results = inventory_core.merge_stores(main_paths[:count], scan_paths,
+                                                  inventory_core.store_output_paths(main_paths[:count], out_dir),
+                                                  workers=args.workers, timer=timer)
+            fanout = time.perf_counter() - start
+            failed = [result for result in results if result.error is not None]
+            if failed:
+                print(f"  FAILED: {failed[0].error}")
+                return 1
+            seconds = {stage.name: stage.seconds for stage in timer.stages}
+            aggregate = seconds["load secondary"] + seconds["aggregate"]
+            print(f"  {count:>6}  {separate:>8.3f} s  {fanout:>8.3f} s  {aggregate:>8.3f} s  {seconds['stores']:>8.3f} s")
+
+
+def load_csv_try_each_encoding(file_path):
+    """The old loader: a full read_csv per encoding until one succeeds"""
+    import pandas as pd
+
+    for encoding in ['utf-8', 'latin-1', 'cp1252']:
+        try:
+            return pd.read_csv(file_path, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+
+
+def bench_encoding(args):
+    """Time loading a latin-1 export whose only non-UTF-8 byte is near the end"""
+    import inventory_core
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "latin1_export.csv")
+        write_secondary_csv(path, args.rows, seed=0)
+        with open(path, "ab") as f:
+            f.write("Magic,Alpha,Æther Vial,1,Near Mint,2\n".encode("latin-1"))
+
+        print(f"Encoding detection ({args.rows:,} rows, latin-1 byte in the last line)")
+        for label, load in (("parse per encoding (old)", load_csv_try_each_encoding),
+                            ("detect then parse once", inventory_core.load_csv_data)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                load(path)
+                timings.append(time.perf_counter() - start)
+            report(label, timings)
+
+
+LOAD_SNIPPET = (
+    "import json, resource, sys, time\n"
+    "import inventory_core\n"
+    "inventory_core.PYARROW_AVAILABLE = inventory_core.PYARROW_AVAILABLE and sys.argv[2] == 'pyarrow'\n"
+    "load = inventory_core.load_csv_data if sys.argv[1] == 'full' else inventory_core.load_secondary_frame\n"
+    "start = time.perf_counter()\n"
+    "df = load(sys.argv[3])\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'seconds': elapsed, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,\n"
+    "                  'frame_bytes': int(df.memory_usage(deep=True).sum())}))\n"
+)
+
+
+def bench_load(args):
+    """Compare the full-width loader with the column-projected, typed secondary loader"""
+    import inventory_core
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "wide_export.csv")
+        write_secondary_csv(path, args.rows, seed=0, wide=True)
+        print(f"Secondary load ({args.rows:,} rows, {6 + len(EXTRA_COLUMNS)} columns, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB)")
+
+        cases = [("all columns, inferred", "full", "c"), ("projected + typed (C)", "fast", "c")]
+        if inventory_core.PYARROW_AVAILABLE:
+            cases.append(("projected + typed (pyarrow)", "fast", "pyarrow"))
+        for label, mode, engine in cases:
+            # Each case runs in a fresh process so peak RSS is not shared between them
+            result = subprocess.run([sys.executable, "-c", LOAD_SNIPPET, mode, engine, path],
+                                    cwd=HERE, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{label:<28} failed: {result.stderr.strip().splitlines()[-1:]}")
+                continue
+            stats = json.loads(result.stdout)
+            print(f"{label:<28} {stats['seconds'] * 1000:8.1f} ms   peak RSS {stats['max_rss_kb'] / 1024:7.1f} MB   "
+                  f"frame {stats['frame_bytes'] / 1e6:7.1f} MB")
+
+
+FORMATS_SNIPPET = (
+    "import json, os, resource, shutil, sys, time\n"
+    "import pandas as pd\n"
+    "import inventory_core, inventory_reader\n"
+    "mode, path, csv_path = sys.argv[1:4]\n"
+    "start = time.perf_counter()\n"
+    "if mode == 'convert' and inventory_reader.is_excel(path):\n"
+    "    pd.read_excel(path).to_csv(csv_path, index=False)\n"
+    "elif mode == 'convert':\n"
+    "    with inventory_reader.open_input(path) as source, open(csv_path, 'wb') as target:\n"
+    "        shutil.copyfileobj(source, target)\n"
+    "partial = inventory_core.aggregate_secondary_quantities(\n"
+    "    inventory_core.load_secondary_frame(csv_path if mode == 'convert' else path))\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'seconds': elapsed, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,\n"
+    "                  'cards': len(partial), 'quantity': sum(partial.values())}))\n"
+)
+
+
+# Copies a CSV into a one-sheet workbook the way Excel stores it (strings in the shared
+# strings table, which openpyxl's write-only mode does not use)
+XLSX_SNIPPET = (
+    "import csv, sys\n"
+    "import openpyxl\n"
+    "workbook = openpyxl.Workbook()\n"
+    "sheet = workbook.active\n"
+    "with open(sys.argv[1], newline='', encoding='utf-8') as f:\n"
+    "    reader = csv.reader(f)\n"
+    "    sheet.append(next(reader))\n"
+    "    for row in reader:\n"
+    "        sheet.append([int(value) if value.isdigit() else value for value in row])\n"
+    "workbook.save(sys.argv[2])\n"
+)
+
+
+def bench_formats(args):
+    """Load compressed and Excel secondary files directly vs converting them to CSV first"""
+    import gzip
+    import shutil
+    import zipfile
+
+    # Nothing here imports pandas or builds the workbook: Linux keeps a process's peak RSS
+    # across exec, so the subprocesses below would otherwise report this one's
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "scan.csv")
+        write_secondary_csv(csv_path, args.rows, seed=0, wide=True)
+        paths = [csv_path, csv_path + ".gz", os.path.join(tmp, "scan.zip")]
+        with open(csv_path, "rb") as source, gzip.open(paths[1], "wb") as target:
+            shutil.copyfileobj(source, target)
+        with zipfile.ZipFile(paths[2], "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.write(csv_path, "scan.csv")
+        if importlib.util.find_spec("openpyxl") is not None:
+            paths.append(os.path.join(tmp, "scan.xlsx"))
+            subprocess.run([sys.executable, "-c", XLSX_SNIPPET, csv_path, paths[-1]], check=True)
+        else:
+            print("(openpyxl is not installed: skipping .xlsx)")
+
+        print(f"Secondary formats ({args.rows:,} rows, {6 + len(EXTRA_COLUMNS)} columns)")
+        reference = None
+        failed = False
+        for path in paths:
+            for mode in (("direct",) if path == csv_path else ("direct", "convert")):
+                label = f"{os.path.basename(path)}{', convert to CSV first' if mode == 'convert' else ''}"
+                runs = []
+                for _ in range(args.repeat):
+                    result = subprocess.run([sys.executable, "-c", FORMATS_SNIPPET, mode, path,
+                                             os.path.join(tmp, "converted.csv")],
+                                            cwd=HERE, capture_output=True, text=True)
+                    if result.returncode != 0:
+                        print(f"  {label:<34} failed: {result.stderr.strip().splitlines()[-1:]}")
+                        failed = True
+                        break
+                    runs.append(json.loads(result.stdout))
+                if not runs:
+                    continue
+                totals = (runs[0]['cards'], runs[0]['quantity'])
+                reference = reference or totals
+                mismatch = "   MISMATCH" if totals != reference else ""
+                failed = failed or bool(mismatch)
+                seconds = statistics.median(run['seconds'] for run in runs)
+                peak = max(run['max_rss_kb'] for run in runs) / 1024
+                print(f"  {label:<34} median {seconds * 1000:9.1f} ms   peak RSS {peak:7.1f} MB{mismatch}")
+    return 1 if failed else 0
+
+
+MERGE_SNIPPET = (
+    "import json, resource, sys, time\n"
+    "import inventory_core\n"
+    "start = time.perf_counter()\n"
+    "inventory_core.merge_inventory(sys.argv[2], [sys.argv[3]], sys.argv[4], workers=1,\n"
+    "                               stream=sys.argv[1] == 'stream', chunk_rows=int(sys.argv[5]))\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'seconds': elapsed, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))\n"
+)
+
+
+def bench_stream(args):
+    """Peak memory of the in-memory merge vs the streaming merge, plus a byte-for-byte output check"""
+    import filecmp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main_path = os.path.join(tmp, "main.csv")
+        secondary_path = os.path.join(tmp, "scan.csv")
+        write_main_csv(main_path, args.rows, seed=0)
+        write_secondary_csv(secondary_path, 20000, seed=1)
+        print(f"Streaming merge ({args.rows:,} main rows, {os.path.getsize(main_path) / 1e6:.1f} MB, "
+              f"chunks of {args.chunk_rows:,})")
+
+        peaks = {}
+        for mode in ("memory", "stream"):
+            output_path = os.path.join(tmp, f"out_{mode}.csv")
+            result = subprocess.run([sys.executable, "-c", MERGE_SNIPPET, mode, main_path, secondary_path,
+                                     output_path, str(args.chunk_rows)], cwd=HERE, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{mode:<12} failed: {result.stderr.strip().splitlines()[-1:]}")
+                return 1
+            stats = json.loads(result.stdout)
+            peaks[mode] = stats['max_rss_kb'] / 1024
+            print(f"{mode:<12} {stats['seconds']:8.2f} s   peak RSS {peaks[mode]:8.1f} MB")
+
+        identical = filecmp.cmp(os.path.join(tmp, "out_memory.csv"), os.path.join(tmp, "out_stream.csv"), shallow=False)
+        print(f"outputs byte-identical: {identical}")
+        if not identical:
+            return 1
+        if args.ceiling_mb and peaks["stream"] > args.ceiling_mb:
+            print(f"streaming peak RSS {peaks['stream']:.1f} MB exceeds the {args.ceiling_mb} MB ceiling")
+            return 1
+    return 0
+
+
+def match_on_strings(main_df, aggregated_quantities):
+    """The old matcher: merge the main keys with the aggregate on five string columns"""
+    import numpy as np
+    import pandas as pd
+    import inventory_core
+
+    main_keys = inventory_core.normalize_key_columns(main_df, inventory_core.MAIN_KEY_COLUMNS)
+    main_keys['_position'] = np.arange(len(main_df))
+    aggregate = pd.DataFrame(list(aggregated_quantities.keys()), columns=list(inventory_core.KEY_FIELDS))
+    aggregate['_new_quantity'] = list(aggregated_quantities.values())
+    matched = main_keys.merge(aggregate, on=list(inventory_core.KEY_FIELDS), how='inner').sort_values('_position')
+    return matched['_position'].to_numpy(), matched['_new_quantity'].to_numpy()
+
+
+def allocated_bytes(build):
+    """Bytes still allocated by whatever build() returns, measured with tracemalloc"""
+    import tracemalloc
+
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_keys(args):
+    """Memory and lookup speed of the interned CardKeyIndex vs dicts keyed by string tuples"""
+    import numpy as np
+    import inventory_core
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main_path = os.path.join(tmp, "main.csv")
+        secondary_path = os.path.join(tmp, "scan.csv")
+        write_main_csv(main_path, args.rows, seed=0)
+        write_secondary_csv(secondary_path, 100000, seed=1)
+        main_df = inventory_core.load_csv_data(main_path)
+        secondary_df = inventory_core.load_secondary_frame(secondary_path)
+        main_keys = inventory_core.normalize_key_columns(main_df, inventory_core.MAIN_KEY_COLUMNS)
+
+    partial, partial_bytes = allocated_bytes(lambda: inventory_core.aggregate_secondary_quantities(secondary_df))
+    string_index, string_bytes = allocated_bytes(
+        lambda: main_keys.groupby(list(inventory_core.KEY_FIELDS), sort=False).indices)
+    key_index, interned_bytes = allocated_bytes(lambda: inventory_core.CardKeyIndex(main_keys))
+    # The first encode also builds the vocabularies' hash tables; count those with the index
+    _, lookup_table_bytes = allocated_bytes(lambda: key_index.encode(partial))
+    encoded, encoded_bytes = allocated_bytes(lambda: key_index.encode(partial))
+
+    print(f"Card key index ({args.rows:,} main rows, {len(partial):,} secondary keys)")
+    print(f"{'main index, string tuples':<28} {string_bytes / 1e6:8.1f} MB")
+    print(f"{'main index, interned':<28} {(interned_bytes + lookup_table_bytes - encoded_bytes) / 1e6:8.1f} MB")
+    print(f"{'partial, string tuples':<28} {partial_bytes / 1e6:8.1f} MB")
+    print(f"{'partial, key ids':<28} {encoded_bytes / 1e6:8.1f} MB")
+
+    def string_lookups():
+        for card_key in partial:
+            string_index.get(card_key, ())
+
+    def id_lookups():
+        for slot in encoded:
+            key_index.positions(slot // len(inventory_core.MATCH_TIERS))
+
+    cases = [("lookups, string tuples", string_lookups),
+             ("lookups, key ids", id_lookups),
+             ("encode partial", lambda: key_index.encode(partial)),
+             ("match, string merge (old)", lambda: match_on_strings(main_df, partial)),
+             ("match, key ids", lambda: inventory_core.CardKeyIndex(main_keys).match(partial))]
+    for label, run in cases:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        report(label, timings)
+
+    old_positions, old_quantities = match_on_strings(main_df, partial)
+    new_positions, new_quantities, _ = key_index.match(partial)
+    if not (np.array_equal(old_positions, new_positions) and np.array_equal(old_quantities, new_quantities)):
+        print("MISMATCH between the string merge and the key id match")
+        return 1
+    return 0
+
+
+# Sealed products (no Number) whose names are similar enough to pass the fuzzy threshold but are
+# different products: the main inventory lists the first, the scan has only the second
+SEALED_NEAR_MISSES = [("Booster Box Case", "Booster Box"), ("Draft Booster Pack", "Draft Booster Box"),
+                      ("Commander Deck Set of 4", "Commander Deck")]
+
+
+# Share of alias and fuzzy matches that must go to the right card; a wrong match silently adds
+# stock to another card, so the looser tiers have to leave a key unmatched when in doubt
+FUZZY_PRECISION_FLOOR = 0.995
+
+
+def score_loose_matches(main_df, partial, aliases, truth):
+    """(matched, wrong, missed) counts of the keys the alias and fuzzy tiers matched, mismatched and left out"""
+    import pandas as pd
+
+    import inventory_core
+
+    key_index = inventory_core.CardKeyIndex(
+        inventory_core.normalize_key_columns(main_df, inventory_core.MAIN_KEY_COLUMNS))
+    keys = pd.DataFrame(list(partial), columns=list(inventory_core.KEY_FIELDS))
+    loose = keys[key_index.lookup(keys) < 0]
+    key_ids, _ = inventory_core.FuzzyMatcher(key_index, aliases).resolve(loose)
+    labels = key_index.key_labels()
+    main_keys = set(labels.itertuples(index=False, name=None))
+    matched = wrong = missed = 0
+    for key, key_id in zip(loose.itertuples(index=False, name=None), key_ids.tolist()):
+        expected = truth.get(key)
+        if key_id < 0:
+            missed += expected in main_keys
+            continue
+        matched += 1
+        wrong += tuple(labels.iloc[key_id]) != expected
+    return matched, wrong, missed
+
+
+def bench_fuzzy(args):
+    """Exact-only matching vs the exact, alias and fuzzy tiers on a scan with dirty keys, with precision"""
+    import pandas as pd
+
+    import inventory_core
+
+    truth = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        main_path = os.path.join(tmp, "main.csv")
+        secondary_path = os.path.join(tmp, "scan.csv")
+        write_main_csv(main_path, args.rows, seed=0)
+        write_secondary_csv(secondary_path, 100000, seed=1, dirty=0.2, truth=truth)
+        main_df = inventory_core.load_csv_data(main_path)
+        partial = inventory_core.aggregate_secondary_quantities(inventory_core.load_secondary_frame(secondary_path))
+
+    def normalized(key):
+        return tuple(str(value).strip().lower() for value in key)
+
+    truth = {normalized(key): normalized(card) for key, card in truth.items()}
+    sealed = [{"Product Line": "Magic", "Set Name": SETS[0], "Product Name": listed, "Number": "",
+               "Condition": CONDITIONS[0], "Add to Quantity": 0} for listed, _ in SEALED_NEAR_MISSES]
+    main_df = pd.concat([main_df, pd.DataFrame(sealed)], ignore_index=True)
+    for _, scanned in SEALED_NEAR_MISSES:
+        # Blank cells are read as NaN, which normalizes to 'nan'
+        key = normalized(("Magic", SETS[0], scanned, "nan", CONDITIONS[0]))
+        partial[key] = 3
+        truth[key] = None
+
+    print(f"Match tiers ({args.rows:,} main rows, {len(partial):,} secondary keys, 20% dirty)")
+    aliases = inventory_core.load_alias_tables()
+    for label, tables in (("exact only", None), ("exact + alias + fuzzy", aliases)):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            changes = inventory_core.find_inventory_changes(main_df, partial, tables)
+            timings.append(time.perf_counter() - start)
+        report(label, timings)
+        print(f"{'':<28} {len(changes):,} rows matched{inventory_core.describe_match_tiers(changes)}")
+
+    matched, wrong, missed = score_loose_matches(main_df, partial, aliases, truth)
+    precision = (matched - wrong) / matched if matched else 1.0
+    recall = (matched - wrong) / (matched - wrong + missed) if matched - wrong + missed else 1.0
+    print(f"Alias + fuzzy tiers against the known cards: {matched:,} keys matched, {wrong:,} to the wrong card, "
+          f"{missed:,} missed (precision {precision:.2%}, recall {recall:.1%})")
+    if precision < args.min_precision:
+        print(f"FAIL: precision below {args.min_precision:.2%}")
+        return 1
+
+
+def bench_write(args):
+    """Write throughput of DataFrame.to_csv vs the chunked atomic writer (plain, gzip, zstd)"""
+    import inventory_core
+    import inventory_writer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main_path = os.path.join(tmp, "main.csv")
+        write_main_csv(main_path, args.rows, seed=0)
+        main_df = inventory_core.load_csv_data(main_path)
+        size_mb = os.path.getsize(main_path) / 1e6
+        print(f"Inventory write ({args.rows:,} rows, {size_mb:.1f} MB)")
+
+        reference_path = os.path.join(tmp, "to_csv.csv")
+        cases = [("to_csv", reference_path, lambda path: main_df.to_csv(path, index=False)),
+                 ("atomic writer", os.path.join(tmp, "out.csv"),
+                  lambda path: inventory_core.write_inventory(main_df, path)),
+                 ("atomic writer, gzip", os.path.join(tmp, "out.csv.gz"),
+                  lambda path: inventory_core.write_inventory(main_df, path))]
+        if inventory_writer.ZSTD_AVAILABLE:
+            cases.append(("atomic writer, zstd", os.path.join(tmp, "out.csv.zst"),
+                          lambda path: inventory_core.write_inventory(main_df, path)))
+        for label, path, write in cases:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                write(path)
+                timings.append(time.perf_counter() - start)
+            report(label, timings)
+            print(f"{'':<28} {args.rows / min(timings):12,.0f} rows/s   {size_mb / min(timings):6.1f} MB/s   "
+                  f"file {os.path.getsize(path) / 1e6:6.1f} MB")
+
+        with open(reference_path, "rb") as f:
+            expected = f.read()
+        with open(os.path.join(tmp, "out.csv"), "rb") as f:
+            if f.read() != expected:
+                print("MISMATCH between to_csv and the atomic writer")
+                return 1
+    return 0
+
+
+# Realistic-shaped synthetic data for the benchmark suite
+SUITE_PRODUCT_LINES = ["Magic", "Pokemon", "YuGiOh", "Flesh and Blood", "Lorcana"]
+SUITE_CONDITIONS = CONDITIONS + [f"{condition} Foil" for condition in CONDITIONS]
+# Scanner exports are mostly Near Mint; weights follow SUITE_CONDITIONS
+SUITE_CONDITION_WEIGHTS = [50, 15, 6, 3, 1, 15, 5, 3, 1, 1]
+SET_ADJECTIVES = ["Ancient", "Burning", "Crimson", "Dark", "Eternal", "Fallen", "Gilded", "Hidden", "Iron", "Jade",
+                  "Lost", "Mystic", "Noble", "Obsidian", "Primal", "Radiant", "Shattered", "Silent", "Twilight",
+                  "Untamed", "Verdant", "Wild", "Frozen", "Savage", "Celestial", "Forgotten", "Sunken", "Broken",
+                  "Endless", "Hallowed"]
+SET_NOUNS = ["Legends", "Horizons", "Empires", "Tides", "Realms", "Echoes", "Crowns", "Shadows", "Kingdoms", "Origins",
+             "Storms", "Dominion", "Frontiers", "Relics", "Visions", "Ascension", "Embers", "Covenant", "Depths",
+             "Chronicles", "Eclipse", "Bastion", "Rebellion", "Harvest", "Odyssey", "Masters", "Dawn", "Ruins",
+             "Journey", "Onslaught"]
+# Includes accented syllables so cp1252 and UTF-8 exports differ
+NAME_SYLLABLES = ["ar", "bel", "cor", "dra", "el", "fen", "gor", "hal", "ith", "jor", "kel", "lum", "mor", "nar",
+                  "or", "pel", "quo", "ral", "sil", "tor", "ul", "vor", "wyn", "xan", "zer", "æth", "dûl", "sé",
+                  "ñor", "ïa"]
+SUITE_CARDS_PER_SET = 250
+
+
+def suite_catalogue(cards, seed):
+    """(product line, set, name, number) for every card; numbers are unique within a set, names may repeat"""
+    rng = random.Random(seed)
+    set_names = [f"{adjective} {noun}" for noun in SET_NOUNS for adjective in SET_ADJECTIVES]
+    rng.shuffle(set_names)
+    names = []
+    for _ in range(max(1, cards // 3)):
+        word = "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        names.append(word if rng.random() < 0.5 else f"{word} {rng.choice(SET_NOUNS)}")
+
+    catalogue = []
+    for card in range(cards):
+        set_index, number = divmod(card, SUITE_CARDS_PER_SET)
+        catalogue.append((SUITE_PRODUCT_LINES[set_index % len(SUITE_PRODUCT_LINES)],
+                          set_names[set_index % len(set_names)], rng.choice(names), number + 1))
+    return catalogue
+
+
+def write_suite_main(path, catalogue, seed):
+    """A TCGplayer export: one row per card and condition, with the unused export columns"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Product Line", "Set Name", "Product Name", "Number", "Condition", "Add to Quantity"]
+                        + EXTRA_COLUMNS)
+        for card, (product_line, set_name, name, number) in enumerate(catalogue):
+            for condition in SUITE_CONDITIONS:
+                price = round(rng.uniform(0.1, 50), 2)
+                writer.writerow([product_line, set_name, name, number, condition, rng.randint(0, 3), 100000 + card,
+                                 "Rare", price, price, price + 0.99, price, rng.randint(0, 20), price,
+                                 f"https://tcgplayer-cdn.tcgplayer.com/product/{100000 + card}_200w.jpg",
+                                 f"SKU-{card:07d}"])
+
+
+def write_suite_scan(path, catalogue, rows, seed, encoding):
+    """A scanner export: popular cards scanned many times, some dirty keys and quantities"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(["Product Line", "Set", "Product Name", "Number", "Condition", "Quantity"])
+        for _ in range(rows):
+            # Skewed towards the first cards, so keys repeat within and across files
+            product_line, set_name, name, number = catalogue[int(len(catalogue) * rng.random() ** 3)]
+            condition = rng.choices(SUITE_CONDITIONS, SUITE_CONDITION_WEIGHTS)[0]
+            quantity = rng.randint(1, 4)
+            dirt = rng.random()
+            if dirt < 0.02:
+                set_name, condition = f" {set_name.upper()} ", condition.lower()
+            elif dirt < 0.03:
+                quantity = rng.choice(["", "x", "-1"])
+            writer.writerow([product_line, set_name, name, number, condition, quantity])
+
+
+def suite_data(data_dir, rows, scans, seed):
+    """Generate (or reuse) the main file and scans for one suite size; every third scan is cp1252"""
+    main_path = os.path.join(data_dir, f"main_{rows}_{seed}.csv")
+    scan_paths = [os.path.join(data_dir, f"scan_{rows}_{seed}_{i}.csv") for i in range(scans)]
+    if all(os.path.exists(path) for path in [main_path] + scan_paths):
+        return main_path, scan_paths
+
+    catalogue = suite_catalogue(max(1, rows // len(SUITE_CONDITIONS)), seed)
+    write_suite_main(main_path, catalogue, seed)
+    for i, scan_path in enumerate(scan_paths):
+        write_suite_scan(scan_path, catalogue, max(1000, rows // 5), seed + i + 1,
+                         "cp1252" if i % 3 == 2 else "utf-8")
+    return main_path, scan_paths
+
+
+SUITE_SNIPPET = (
+    "import json, resource, sys, time\n"
+    "import inventory_core\n"
+    "stages = {}\n"
+    "def record(name, rows, start):\n"
+    "    seconds = time.perf_counter() - start\n"
+    "    stages[name] = {'seconds': seconds, 'rows': rows, 'rows_per_second': rows / seconds if seconds else None,\n"
+    "                    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}\n"
+    "start = time.perf_counter()\n"
+    "main_df = inventory_core.load_csv_data(sys.argv[1])\n"
+    "frames = [inventory_core.load_secondary_frame(path) for path in sys.argv[3:]]\n"
+    "secondary_rows = sum(len(frame) for frame in frames)\n"
+    "record('load', len(main_df) + secondary_rows, start)\n"
+    "start = time.perf_counter()\n"
+    "aggregated = inventory_core.reduce_partials(inventory_core.aggregate_secondary_quantities(frame) for frame in frames)\n"
+    "record('aggregate', secondary_rows, start)\n"
+    "start = time.perf_counter()\n"
+    "changes = inventory_core.find_inventory_changes(main_df, aggregated)\n"
+    "record('match', len(main_df), start)\n"
+    "start = time.perf_counter()\n"
+    "inventory_core.apply_changes(main_df, changes)\n"
+    "inventory_core.write_inventory(main_df, sys.argv[2])\n"
+    "record('write', len(main_df), start)\n"
+    "print(json.dumps({'main_rows': len(main_df), 'secondary_rows': secondary_rows, 'changes': len(changes),\n"
+    "                  'stages': stages}))\n"
+)
+SUITE_STAGES = ("load", "aggregate", "match", "write")
+
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run_suite_size(main_path, scan_paths, output_path, repeat):
+    """Run the staged merge repeat times in fresh processes; median seconds per stage, highest peak RSS"""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", SUITE_SNIPPET, main_path, output_path] + scan_paths,
+                                cwd=HERE, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1:])
+        runs.append(json.loads(result.stdout))
+
+    merged = dict(runs[0])
+    merged["stages"] = {}
+    for stage in SUITE_STAGES:
+        seconds = statistics.median(run["stages"][stage]["seconds"] for run in runs)
+        rows = runs[0]["stages"][stage]["rows"]
+        merged["stages"][stage] = {
+            "seconds": seconds,
+            "rows": rows,
+            "rows_per_second": rows / seconds if seconds else None,
+            "peak_rss_mb": max(run["stages"][stage]["peak_rss_mb"] for run in runs),
+        }
+    merged["total_seconds"] = sum(stage["seconds"] for stage in merged["stages"].values())
+    merged["peak_rss_mb"] = max(stage["peak_rss_mb"] for stage in merged["stages"].values())
+    merged["runs"] = repeat
+    return merged
+
+
+def compare_reports(baseline, report_data, max_slowdown):
+    """Print per-stage ratios against a baseline report; False if any stage slowed beyond max_slowdown"""
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('created', '?')})")
+    ok = True
+    for size, result in report_data["results"].items():
+        old = baseline.get("results", {}).get(size)
+        if old is None:
+            print(f"  {int(size):>9,} rows: not in baseline")
+            continue
+        for stage in SUITE_STAGES + ("total",):
+            new_seconds = result["total_seconds"] if stage == "total" else result["stages"][stage]["seconds"]
+            old_seconds = old["total_seconds"] if stage == "total" else old["stages"][stage]["seconds"]
+            ratio = new_seconds / old_seconds if old_seconds else float("inf")
+            flag = ""
+            if max_slowdown and ratio > max_slowdown:
+                flag = "  SLOWER"
+                ok = False
+            print(f"  {int(size):>9,} rows  {stage:<10} {old_seconds:8.3f} s -> {new_seconds:8.3f} s   x{ratio:5.2f}{flag}")
+        print(f"  {int(size):>9,} rows  {'peak RSS':<10} {old['peak_rss_mb']:8.1f} MB -> {result['peak_rss_mb']:8.1f} MB")
+    return ok
+
+
+def bench_suite(args):
+    """Staged load/aggregate/match/write timings and peak RSS at several sizes, as a JSON report"""
+    import pandas as pd
+
+    report_data = {
+        "version": 1,
+        "commit": git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "pyarrow": importlib.util.find_spec("pyarrow") is not None,
+        "cpu_count": os.cpu_count(),
+        "scans": args.scans,
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Benchmark suite ({args.scans} scans per size, {args.repeat} run(s) each)")
+        for rows in args.sizes:
+            main_path, scan_paths = suite_data(data_dir, rows, args.scans, args.seed)
+            try:
+                result = run_suite_size(main_path, scan_paths, os.path.join(tmp, "out.csv"), args.repeat)
+            except RuntimeError as e:
+                print(f"{rows:>9,} rows  failed: {e}")
+                return 1
+            report_data["results"][str(rows)] = result
+            for stage in SUITE_STAGES:
+                metrics = result["stages"][stage]
+                print(f"{rows:>9,} rows  {stage:<10} {metrics['seconds']:8.3f} s   "
+                      f"{metrics['rows_per_second'] or 0:12,.0f} rows/s   peak RSS {metrics['peak_rss_mb']:8.1f} MB")
+            print(f"{rows:>9,} rows  {'total':<10} {result['total_seconds']:8.3f} s   "
+                  f"({result['changes']:,} cards updated from {result['secondary_rows']:,} scanned rows)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report_data, f, indent=2)
+        print(f"Report written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare_reports(baseline, report_data, args.max_slowdown):
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TCGInventoryUpdater benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark")
+    subparsers.required = True
+
+    startup_parser = subparsers.add_parser("startup", help="Import times, CLI and GUI cold start")
+    startup_parser.add_argument("--repeat", type=int, default=5)
+    startup_parser.add_argument("--exe", metavar="FROZEN_APP", default=None,
+                                help="Also time the executable built by build_executable.py")
+    startup_parser.add_argument("--json", metavar="PATH", help="Write the report as JSON")
+    startup_parser.add_argument("--max-cli-ms", type=float, default=CLI_STARTUP_TARGET_MS,
+                                help=f"Fail if the CLI dry run's median is slower (default: {CLI_STARTUP_TARGET_MS})")
+    startup_parser.set_defaults(func=bench_startup)
+
+    parallel_parser = subparsers.add_parser("parallel", help="Secondary file loading, 1..N workers")
+    parallel_parser.add_argument("--files", type=int, default=40)
+    parallel_parser.add_argument("--rows", type=int, default=20000)
+    parallel_parser.add_argument("--max-workers", type=int, default=None)
+    parallel_parser.set_defaults(func=bench_parallel)
+
+    encoding_parser = subparsers.add_parser("encoding", help="Single-pass encoding detection vs re-parsing")
+    encoding_parser.add_argument("--rows", type=int, default=500000)
+    encoding_parser.add_argument("--repeat", type=int, default=3)
+    encoding_parser.set_defaults(func=bench_encoding)
+
+    load_parser = subparsers.add_parser("load", help="Full vs column-projected secondary loading")
+    load_parser.add_argument("--rows", type=int, default=500000)
+    load_parser.set_defaults(func=bench_load)
+
+    formats_parser = subparsers.add_parser("formats", help="Compressed and .xlsx secondaries vs converting to CSV")
+    formats_parser.add_argument("--rows", type=int, default=100000)
+    formats_parser.add_argument("--repeat", type=int, default=3)
+    formats_parser.set_defaults(func=bench_formats)
+
+    stream_parser = subparsers.add_parser("stream", help="In-memory vs streaming merge memory ceiling")
+    stream_parser.add_argument("--rows", type=int, default=1000000)
+    stream_parser.add_argument("--chunk-rows", type=int, default=50000)
+    stream_parser.add_argument("--ceiling-mb", type=float, default=None,
+                               help="Exit with an error if the streaming peak RSS exceeds this")
+    stream_parser.set_defaults(func=bench_stream)
+
+
+    keys_parser = subparsers.add_parser("keys", help="Interned card key index vs string tuple dicts")
+    keys_parser.add_argument("--rows", type=int, default=500000)
+    keys_parser.add_argument("--repeat", type=int, default=3)
+    keys_parser.set_defaults(func=bench_keys)
+
+    fuzzy_parser = subparsers.add_parser("fuzzy", help="Exact-only vs alias and fuzzy match tiers")
+    fuzzy_parser.add_argument("--rows", type=int, default=400000)
+    fuzzy_parser.add_argument("--repeat", type=int, default=3)
+    fuzzy_parser.add_argument("--min-precision", type=float, default=FUZZY_PRECISION_FLOOR,
+                              help="Exit with 1 when fewer of the loose matches are right")
+    fuzzy_parser.set_defaults(func=bench_fuzzy)
+
+    write_parser = subparsers.add_parser("write", help="to_csv vs the atomic chunked writer, with compression")
+    write_parser.add_argument("--rows", type=int, default=400000)
+    write_parser.add_argument("--repeat", type=int, default=3)
+    write_parser.set_defaults(func=bench_write)
+
+    fanout_parser = subparsers.add_parser("fanout", help="Separate merges vs one fan-out merge over N stores")
+    fanout_parser.add_argument("--stores", type=int, default=5)
+    fanout_parser.add_argument("--rows", type=int, default=200000)
+    fanout_parser.add_argument("--scans", type=int, default=4)
+    fanout_parser.add_argument("--scan-rows", type=int, default=200000)
+    fanout_parser.add_argument("--workers", type=int, default=None,
+                               help="Processes for parsing and for the stores (default: one per CPU)")
+    fanout_parser.set_defaults(func=bench_fanout)
+
+    suite_parser = subparsers.add_parser("suite", help="Per-stage timings and peak RSS at 10k/100k/1M rows")
+    suite_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                              help="Main inventory rows for each run")
+    suite_parser.add_argument("--scans", type=int, default=3, help="Secondary files per size")
+    suite_parser.add_argument("--repeat", type=int, default=1)
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.add_argument("--data-dir", default=None,
+                              help="Keep generated files here and reuse them on later runs")
+    suite_parser.add_argument("--json", metavar="PATH", help="Write the report as JSON")
+    suite_parser.add_argument("--compare", metavar="BASELINE", help="JSON report from an earlier run to compare with")
+    suite_parser.add_argument("--max-slowdown", type=float, default=None,
+                              help="With --compare, exit with an error if a stage is this many times slower")
+    suite_parser.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - parsed file cache
+Keeps the normalized {card_key: qty} partial of each secondary file on disk
+as Parquet, so an unchanged file is not parsed again on the next Preview.
+The file's rejected quantities are kept alongside, so they are still reported.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+CardKey = Tuple[str, ...]
+# (column, line, value, reason), as in inventory_core.RejectedQuantity without the file
+RejectedRow = Tuple[str, int, str, str]
+
+# Same field names as inventory_core.KEY_FIELDS, plus the summed quantity
+CACHE_COLUMNS = ("product_line", "set_name", "product_name", "number", "condition", "quantity")
+REJECTED_COLUMNS = ("column", "line", "value", "reason")
+
+# Bump when the partial format or key normalization changes
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+HASH_BLOCK_BYTES = 1024 * 1024
+INDEX_FILE = "index.json"
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory (LOCALAPPDATA on Windows, XDG_CACHE_HOME or ~/.cache elsewhere)"""
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "TCGInventoryUpdater")
+
+
+def file_content_hash(file_path: str) -> str:
+    """Hash the file's bytes without parsing them"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParsedFileCache:
+    """On-disk cache of secondary file partials with LRU eviction by total size.
+
+    Entries are keyed by absolute path, size, mtime and content hash. The
+    cache is disabled (every lookup is a miss and nothing is stored) when no
+    Parquet engine is installed. Not safe to share between processes; the
+    merge core only touches it from the parent process.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.enabled = importlib.util.find_spec('pyarrow') is not None
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        # Entry computed by the last get() per path, so a following put() need not hash again
+        self._looked_up = {}
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            try:
+                with open(self._index_path(), 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                self._index = index['entries'] if index.get('version') == CACHE_VERSION else {}
+            except (OSError, ValueError, KeyError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self._index_path() + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': self._index}, f)
+        os.replace(temp_path, self._index_path())
+
+    def _entry_name(self, file_path: str) -> Tuple[str, Dict]:
+        """Build the cache entry name and metadata for the file as it is on disk now"""
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        looked_up = self._looked_up.pop(file_path, None)
+        if looked_up is not None and (looked_up[1]['size'], looked_up[1]['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return looked_up
+        content_hash = file_content_hash(file_path)
+        key = f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}|{content_hash}"
+        name = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return name, {'path': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash}
+
+    def _data_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}.parquet")
+
+    def _rejected_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}.rejected.parquet")
+
+    def get(self, file_path: str) -> Optional[Tuple[Dict[CardKey, int], List[RejectedRow]]]:
+        """Return the cached (partial, rejected rows) for file_path, or None (a miss) if absent or stale"""
+        if not self.enabled:
+            self.misses += 1
+            return None
+
+        index = self._load_index()
+        try:
+            name, metadata = self._entry_name(file_path)
+            self._looked_up[metadata['path']] = (name, metadata)
+            entry = index.get(name)
+            frame = pd.read_parquet(self._data_path(name)) if entry is not None else None
+            rejected = []
+            if frame is not None and entry.get('rejected'):
+                rejected_frame = pd.read_parquet(self._rejected_path(name))
+                rejected = list(zip(*(rejected_frame[column].tolist() for column in REJECTED_COLUMNS)))
+        except (OSError, ValueError):
+            frame = None
+
+        if frame is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._looked_up.pop(entry['path'], None)
+        entry['last_used'] = time.time()
+        self._save_index()
+        keys = zip(*(frame[column].tolist() for column in CACHE_COLUMNS[:-1]))
+        return dict(zip(keys, (int(quantity) for quantity in frame['quantity'].tolist()))), rejected
+
+    def put(self, file_path: str, partial: Dict[CardKey, int], rejected: Iterable[RejectedRow] = ()) -> None:
+        """Store the partial and rejected rows for file_path, replacing older entries for the same path"""
+        if not self.enabled:
+            return
+
+        index = self._load_index()
+        name, metadata = self._entry_name(file_path)
+        rows = [card_key + (quantity,) for card_key, quantity in partial.items()]
+        frame = pd.DataFrame(rows, columns=list(CACHE_COLUMNS))
+        frame['quantity'] = frame['quantity'].astype('int64')
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path = self._data_path(name)
+        frame.to_parquet(data_path, index=False)
+        size = os.path.getsize(data_path)
+        rejected = list(rejected)
+        if rejected:
+            rejected_path = self._rejected_path(name)
+            pd.DataFrame(rejected, columns=list(REJECTED_COLUMNS)).to_parquet(rejected_path, index=False)
+            size += os.path.getsize(rejected_path)
+
+        for stale_name in [other for other, entry in index.items() if entry['path'] == metadata['path'] and other != name]:
+            self._remove(stale_name)
+        metadata.update(bytes=size, rejected=len(rejected), last_used=time.time())
+        index[name] = metadata
+        self._evict()
+        self._save_index()
+
+    def _remove(self, name: str) -> None:
+        self._index.pop(name, None)
+        for path in (self._data_path(name), self._rejected_path(name)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = sum(entry['bytes'] for entry in self._index.values())
+        for name, entry in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['bytes']
+            self._remove(name)
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        for name in list(self._load_index()):
+            self._remove(name)
+        self._save_index()
+
+    def stats_message(self) -> str:
+        if not self.enabled:
+            return "Cache: disabled (install pyarrow to enable)"
+        return f"Cache: {self.hits} hits, {self.misses} misses"
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - command line interface
+Runs merges headless (no Tk, no dialogs), e.g. from a nightly cron job:
+
+    tcg-inventory merge --main inventory.csv --add a.csv --add b.csv --out updated.csv
+    tcg-inventory fanout --main store1.csv --main store2.csv --add a.csv --out-dir updated/
+    tcg-inventory watch --main inventory.csv --folder scans/ --out updated.csv
+    tcg-inventory store --db inventory.db import a.csv b.csv
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional, TextIO
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for the tcg-inventory command"""
+    parser = argparse.ArgumentParser(
+        prog="tcg-inventory",
+        description="Update TCGPlayer inventory quantities from secondary files without the GUI."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    merge_parser = subparsers.add_parser("merge", help="Merge secondary files into a main inventory")
+    merge_parser.add_argument("--main", required=True, help="Main TCGPlayer inventory CSV")
+    merge_parser.add_argument("--add", required=True, action="append", metavar="FILE",
+                              help="Secondary file to add: CSV, .csv.gz, .zip or .xlsx (repeat for several files)")
+    merge_parser.add_argument("--out", help="Where to write the updated inventory (omit, with --delta, for a dry run)")
+    merge_parser.add_argument("--delta", metavar="FILE", default=None,
+                              help="Also write just the updated rows to FILE, e.g. for TCGplayer's bulk upload "
+                                   "(without --out, only that file is written)")
+    merge_parser.add_argument("--rejects", metavar="FILE", default=None,
+                              help="Where to list rejected quantities (default: NAME-rejected.csv next to the "
+                                   "output, when there are any)")
+    merge_parser.add_argument("--workers", type=int, default=None,
+                              help="Processes used to parse secondary files "
+                                   "(default: one per file up to the CPU count, none below 16 MB of input)")
+    merge_parser.add_argument("--cache-dir", default=None,
+                              help="Where parsed secondary files are cached (default: per-user cache directory)")
+    merge_parser.add_argument("--no-cache", action="store_true", help="Always parse secondary files from scratch")
+    merge_parser.add_argument("--stream", action="store_true",
+                              help="Process the main file in chunks instead of loading it into memory "
+                                   "(exact matches only)")
+    merge_parser.add_argument("--chunk-rows", type=int, default=None,
+                              help="Rows per chunk in --stream mode (default: 50000)")
+    merge_parser.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                              help="Compress the output (default: from the --out extension, .gz or .zst)")
+    merge_parser.add_argument("--aliases", metavar="FILE", default=None,
+                              help="JSON file of extra condition and set aliases for --fuzzy")
+    merge_parser.add_argument("--fuzzy", action="store_true",
+                              help="Also match cards with no exact match by alias and by a similar product name")
+    merge_parser.add_argument("--profile", metavar="FILE", default=None,
+                              help="Write a cProfile (pstats) dump of the whole run to FILE")
+    merge_parser.add_argument("--metrics-json", metavar="FILE", default=None,
+                              help="Write per-stage timings as JSON to FILE ('-' for stdout, "
+                                   "which sends the log to stderr)")
+    merge_parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors")
+
+    fanout_parser = subparsers.add_parser("fanout", help="Merge the same secondary files into several main inventories")
+    fanout_parser.add_argument("--main", required=True, action="append", metavar="FILE",
+                               help="Main TCGPlayer inventory CSV (repeat for each store)")
+    fanout_parser.add_argument("--add", required=True, action="append", metavar="FILE",
+                               help="Secondary file to add: CSV, .csv.gz, .zip or .xlsx (repeat for several files)")
+    fanout_parser.add_argument("--out-dir", metavar="DIR", default=None,
+                               help="Write each updated inventory here, under its main file's name, .zip becoming "
+                                    ".csv (omit, with --delta-dir, for a dry run)")
+    fanout_parser.add_argument("--delta-dir", metavar="DIR", default=None,
+                               help="Write each store's updated rows alone here, under its main file's name "
+                                    "(a .zip main is written as .csv)")
+    fanout_parser.add_argument("--rejects", metavar="FILE", default=None,
+                               help="Where to list rejected secondary quantities (default: only summarized)")
+    fanout_parser.add_argument("--workers", type=int, default=None,
+                               help="Processes used to parse secondary files and to merge stores "
+                                    "(default: one per file up to the CPU count, none below 16 MB of input)")
+    fanout_parser.add_argument("--cache-dir", default=None,
+                               help="Where parsed secondary files are cached (default: per-user cache directory)")
+    fanout_parser.add_argument("--no-cache", action="store_true", help="Always parse secondary files from scratch")
+    fanout_parser.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                               help="Compress the outputs (default: from the main file extension, .gz or .zst)")
+    fanout_parser.add_argument("--aliases", metavar="FILE", default=None,
+                               help="JSON file of extra condition and set aliases for --fuzzy")
+    fanout_parser.add_argument("--fuzzy", action="store_true",
+                               help="Also match cards with no exact match by alias and by a similar product name")
+    fanout_parser.add_argument("--metrics-json", metavar="FILE", default=None,
+                               help="Write per-stage timings as JSON to FILE ('-' for stdout, "
+                                    "which sends the log to stderr)")
+    fanout_parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors")
+
+    watch_parser = subparsers.add_parser("watch", help="Keep merging secondary files as they appear in a folder")
+    watch_parser.add_argument("--main", required=True, help="Main TCGPlayer inventory CSV")
+    watch_parser.add_argument("--folder", required=True, help="Folder the scanners write their exports to")
+    watch_parser.add_argument("--out", help="Where to write the updated inventory")
+    watch_parser.add_argument("--delta", metavar="FILE", default=None, help="Where to write just the updated rows")
+    watch_parser.add_argument("--journal", metavar="FILE", default=None,
+                              help="Record of processed files (default: .tcg-inventory-journal.jsonl in the folder)")
+    watch_parser.add_argument("--pattern", default="*.csv", help="Which files in the folder to merge (default: *.csv)")
+    watch_parser.add_argument("--poll", type=float, default=2.0, help="Seconds between folder scans (default: 2)")
+    watch_parser.add_argument("--debounce", type=float, default=10.0,
+                              help="Write once no new file has arrived for this many seconds (default: 10)")
+    watch_parser.add_argument("--max-wait", type=float, default=60.0,
+                              help="Write at least this often while files keep arriving (default: 60)")
+    watch_parser.add_argument("--workers", type=int, default=None,
+                              help="Processes used when several files arrive at once "
+                                   "(default: one per file up to the CPU count, none below 16 MB of input)")
+    watch_parser.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                              help="Compress the output (default: from the file extension, .gz or .zst)")
+    watch_parser.add_argument("--aliases", metavar="FILE", default=None,
+                              help="JSON file of extra condition and set aliases for --fuzzy")
+    watch_parser.add_argument("--fuzzy", action="store_true",
+                              help="Also match cards with no exact match by alias and by a similar product name")
+    watch_parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors")
+
+    store_parser = subparsers.add_parser("store", help="Accumulate secondary files across sessions in a SQLite file")
+    store_parser.add_argument("--db", required=True, help="SQLite database file (created if missing)")
+    store_parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors")
+    actions = store_parser.add_subparsers(dest="action")
+    actions.required = True
+    set_main_parser = actions.add_parser("set-main", help="Store (or replace) the main inventory")
+    set_main_parser.add_argument("main", help="Main TCGPlayer inventory CSV")
+    import_parser = actions.add_parser("import", help="Import secondary files; files imported before are skipped")
+    import_parser.add_argument("files", nargs="+", metavar="FILE",
+                               help="Secondary files to import (CSV, .csv.gz, .zip or .xlsx)")
+    import_parser.add_argument("--workers", type=int, default=None,
+                               help="Processes used to parse secondary files "
+                                    "(default: one per file up to the CPU count, none below 16 MB of input)")
+    batches_parser = actions.add_parser("batches", help="List the imported batches")
+    batches_parser.add_argument("--since", metavar="DATE", default=None,
+                                help="Only batches imported on or after DATE (YYYY-MM-DD[THH:MM:SS])")
+    remove_parser = actions.add_parser("remove", help="Take an imported batch back out")
+    remove_parser.add_argument("batch_id", type=int, help="Batch id, as listed by 'batches'")
+    export_parser = actions.add_parser("export", help="Write the updated inventory (preview without --out/--delta)")
+    export_parser.add_argument("--out", help="Where to write the updated inventory")
+    export_parser.add_argument("--delta", metavar="FILE", default=None, help="Where to write just the updated rows")
+    export_parser.add_argument("--since", metavar="DATE", default=None,
+                               help="Only count batches imported on or after DATE (YYYY-MM-DD[THH:MM:SS])")
+    export_parser.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                               help="Compress the output (default: from the file extension, .gz or .zst)")
+    export_parser.add_argument("--aliases", metavar="FILE", default=None,
+                               help="JSON file of extra condition and set aliases for --fuzzy")
+    export_parser.add_argument("--fuzzy", action="store_true",
+                               help="Also match cards with no exact match by alias and by a similar product name")
+    return parser
+
+
+def run_merge(args: argparse.Namespace) -> int:
+    """Run the merge subcommand and return the process exit code"""
+    # Imported here so --help and argument errors do not pay for pandas
+    import inventory_core
+    from inventory_cache import ParsedFileCache
+    from inventory_metrics import StageTimer, profile_to
+
+    def log(message: str) -> None:
+        if not args.quiet:
+            print(message, file=log_stream(args))
+
+    cache = None if args.no_cache else ParsedFileCache(args.cache_dir)
+    chunk_rows = args.chunk_rows or inventory_core.READ_CHUNK_ROWS
+    timer = StageTimer()
+    report_path = args.rejects
+    if report_path is None and (args.out or args.delta):
+        report_path = inventory_core.rejects_file_name(args.out or args.delta)
+
+    try:
+        aliases = inventory_core.load_alias_tables(args.aliases) if args.fuzzy else None
+        with profile_to(args.profile):
+            changes = inventory_core.merge_inventory(args.main, args.add, args.out, log, args.workers, cache,
+                                                     stream=args.stream, chunk_rows=chunk_rows, aliases=aliases,
+                                                     timer=timer, compression=args.compress, delta_path=args.delta,
+                                                     report_path=report_path)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        write_metrics(timer, args.metrics_json)
+    if args.profile:
+        log(f"Profile written to {args.profile}")
+
+    if changes and not args.out and not args.delta:
+        log_preview(changes, log)
+    if args.metrics_json != "-":
+        for line in timer.summary_lines():
+            log(line)
+    return 0
+
+
+def run_fanout(args: argparse.Namespace) -> int:
+    """Run the fanout subcommand; the exit code is 1 if any store failed"""
+    import inventory_core
+    from inventory_cache import ParsedFileCache
+    from inventory_metrics import StageTimer
+
+    def log(message: str) -> None:
+        if not args.quiet:
+            print(message, file=log_stream(args))
+
+    cache = None if args.no_cache else ParsedFileCache(args.cache_dir)
+    timer = StageTimer()
+    try:
+        output_paths = inventory_core.store_output_paths(args.main, args.out_dir)
+        delta_paths = inventory_core.store_output_paths(args.main, args.delta_dir)
+        for directory in (args.out_dir, args.delta_dir):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        aliases = inventory_core.load_alias_tables(args.aliases) if args.fuzzy else None
+        results = inventory_core.merge_stores(args.main, args.add, output_paths, delta_paths, log, args.workers,
+                                              cache, aliases, timer, args.compress, args.rejects)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        write_metrics(timer, args.metrics_json)
+
+    failed = [result for result in results if result.error is not None]
+    for result in failed:
+        print(f"Error: {result.main_path}: {result.error}", file=sys.stderr)
+    log(f"{len(results) - len(failed)} of {len(results)} stores merged: "
+        f"{sum(result.updated for result in results):,} cards updated")
+    if args.metrics_json != "-":
+        for line in timer.summary_lines():
+            log(line)
+    return 1 if failed else 0
+
+
+def log_preview(changes: List[dict], log) -> None:
+    """List the cards a dry run would update"""
+    import inventory_core
+
+    log(f"Preview: {len(changes)} cards will be updated")
+    for change in changes:
+        tier = f" [{change['match']}]" if change['match'] != inventory_core.MATCH_EXACT else ""
+        log(f"  {change['product_name']} ({change['set_name']}, {change['condition']}) → {change['new_add_quantity']}{tier}")
+
+
+def log_stream(args: argparse.Namespace) -> TextIO:
+    """Where the log goes: stdout, unless --metrics-json - keeps stdout for the JSON alone"""
+    return sys.stderr if args.metrics_json == "-" else sys.stdout
+
+
+def write_metrics(timer, path: Optional[str]) -> None:
+    """Write the stage timings as JSON to path, or to stdout when path is '-'"""
+    if not path:
+        return
+    metrics = json.dumps(timer.as_dict(), indent=2)
+    if path == "-":
+        print(metrics)
+        return
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(metrics + "\n")
+    except OSError as e:
+        print(f"Error: could not write metrics to {path}: {str(e)}", file=sys.stderr)
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    """Run the watch subcommand until Ctrl+C and return the process exit code"""
+    import inventory_core
+    from inventory_watch import FolderWatch
+
+    def log(message: str) -> None:
+        if not args.quiet:
+            print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+    try:
+        aliases = inventory_core.load_alias_tables(args.aliases) if args.fuzzy else None
+        watch = FolderWatch(args.main, args.folder, args.out, args.delta, args.journal, aliases, args.pattern,
+                            args.debounce, args.max_wait, args.workers, args.compress, log)
+        watch.run(poll_seconds=args.poll)
+    except KeyboardInterrupt:
+        log("Stopped.")
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_store(args: argparse.Namespace) -> int:
+    """Run one store action and return the process exit code"""
+    import sqlite3
+
+    import inventory_core
+    from inventory_store import InventoryStore
+
+    def log(message: str) -> None:
+        if not args.quiet:
+            print(message)
+
+    try:
+        with InventoryStore(args.db) as store:
+            if args.action == "set-main":
+                store.set_main(args.main, log)
+            elif args.action == "import":
+                store.import_files(args.files, args.workers, log)
+            elif args.action == "batches":
+                batches = store.batches(args.since)
+                for batch in batches:
+                    print(f"{batch.id:>5}  {batch.imported_at}  {batch.cards:>8,} cards  "
+                          f"{batch.quantity:>9,} qty  {batch.source}")
+                log(f"{len(batches)} batches")
+            elif args.action == "remove":
+                if not store.remove_batch(args.batch_id):
+                    print(f"Error: no batch {args.batch_id} in {args.db}", file=sys.stderr)
+                    return 1
+                log(f"Removed batch {args.batch_id}")
+            elif args.action == "export":
+                aliases = inventory_core.load_alias_tables(args.aliases) if args.fuzzy else None
+                changes = store.export(args.out, args.delta, aliases, args.since, args.compress)
+                if args.out or args.delta:
+                    inventory_core.log_saved(log, len(changes), args.out, args.delta)
+                elif changes:
+                    log_preview(changes, log)
+                else:
+                    log("No changes")
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    if getattr(sys, 'frozen', False):
+        # freeze_support does nothing unless frozen; importing multiprocessing costs ~10 ms of cold start
+        import multiprocessing
+        multiprocessing.freeze_support()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'aliases', None) and not args.fuzzy:
+        parser.error("--aliases only applies with --fuzzy")
+    if args.command == "merge":
+        return run_merge(args)
+    if args.command == "fanout":
+        return run_fanout(args)
+    if args.command == "watch":
+        return run_watch(args)
+    if args.command == "store":
+        return run_store(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
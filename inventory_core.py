@@ -0,0 +1,1590 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - merge core
+Loading, matching and saving logic shared by the GUI and the command line.
+This module must not import tkinter.
+"""
+
+import codecs
+import importlib.util
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from inventory_cache import ParsedFileCache
+from inventory_metrics import RowCounter, StageTimer
+from inventory_reader import csv_source, input_compression, is_excel, open_input, read_excel_columns
+from inventory_writer import COMPRESSION_EXTENSIONS, WRITE_CHUNK_ROWS, AtomicOutput, write_csv
+
+# Fixed column names
+MAIN_KEY_COLUMNS = ("Product Line", "Set Name", "Product Name", "Number", "Condition")
+MAIN_ADD_QUANTITY = "Add to Quantity"
+SECONDARY_KEY_COLUMNS = ("Product Line", "Set", "Product Name", "Number", "Condition")
+SECONDARY_QUANTITY = "Quantity"
+# Only these columns are read from secondary files; the low-cardinality ones as categories
+SECONDARY_COLUMNS = SECONDARY_KEY_COLUMNS + (SECONDARY_QUANTITY,)
+SECONDARY_CATEGORY_COLUMNS = ("Product Line", "Set", "Condition")
+
+# Normalized key fields, in match order
+KEY_FIELDS = ("product_line", "set_name", "product_name", "number", "condition")
+
+# Encodings tried in order; the last one must accept any byte sequence
+CSV_ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+# Bytes sampled to rule out an encoding before validating the whole file
+ENCODING_SAMPLE_BYTES = 64 * 1024
+ENCODING_VALIDATE_BYTES = 1024 * 1024
+
+# Optional faster CSV parser for secondary files; read_csv's pyarrow engine needs pandas 1.4
+PYARROW_AVAILABLE = (importlib.util.find_spec('pyarrow') is not None
+                     and tuple(int(part) for part in re.findall(r'\d+', pd.__version__)[:2]) >= (1, 4))
+
+# Rows parsed between progress reports / cancellation checks
+READ_CHUNK_ROWS = 50000
+# Less input than this (about a second of parsing) is read without a process pool, which costs
+# more to start than it saves; on Windows every worker imports pandas again
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+# Why a quantity was rejected (counted as 0); blank cells are not rejected
+REJECT_NOT_A_NUMBER = 'not a number'
+REJECT_NEGATIVE = 'negative'
+REJECT_FRACTION = 'not a whole number'
+REJECT_TOO_LARGE = 'too large'
+# Largest count a float64 holds exactly
+MAX_QUANTITY = 2 ** 53
+# Rejected quantities quoted in the log; the report has all of them
+LOGGED_REJECTS = 5
+REJECTS_SUFFIX = "-rejected"
+REJECTS_COLUMNS = ("File", "Line", "Column", "Value", "Reason")
+
+# Match tiers, strictest first. Later tiers only see secondary keys the earlier ones left unmatched
+MATCH_EXACT = 'exact'
+MATCH_ALIAS = 'alias'
+MATCH_FUZZY = 'fuzzy'
+MATCH_TIERS = (MATCH_EXACT, MATCH_ALIAS, MATCH_FUZZY)
+# Minimum trigram similarity (Dice coefficient) for a fuzzy product name match; candidates
+# already agree on set, number and condition, so this can be fairly lenient
+FUZZY_NAME_THRESHOLD = 0.7
+
+# Built-in aliases, keyed and valued in normalized (lowercase) form. Condition
+# aliases apply per word, so "NM Foil" becomes "near mint foil"; set aliases
+# apply to the whole set name.
+DEFAULT_CONDITION_ALIASES = {
+    'nm': 'near mint', 'lp': 'lightly played', 'mp': 'moderately played',
+    'hp': 'heavily played', 'dmg': 'damaged', 'f': 'foil',
+}
+DEFAULT_SET_ALIASES = {
+    'm10': 'magic 2010', 'm11': 'magic 2011', 'm12': 'magic 2012', 'm13': 'magic 2013',
+    'm14': 'magic 2014', 'm15': 'magic 2015', 'm19': 'core set 2019', 'm20': 'core set 2020',
+    'm21': 'core set 2021', 'c13': 'commander 2013', 'dom': 'dominaria', 'tmp': 'tempest',
+}
+
+CardKey = Tuple[str, ...]
+LogCallback = Callable[[str], None]
+# Called with (file name, rows read so far) after every chunk
+ProgressCallback = Callable[[str, int], None]
+
+
+class OperationCancelled(Exception):
+    """Raised at a chunk boundary when the caller has requested cancellation"""
+
+
+class RejectedQuantity(NamedTuple):
+    """A quantity cell that could not be used; line is the file line, counting the header as 1"""
+    file: str
+    line: int
+    column: str
+    value: str
+    reason: str
+
+
+def _no_log(message: str) -> None:
+    pass
+
+
+def check_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    """Raise OperationCancelled if cancel_event has been set"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise OperationCancelled()
+
+
+class DecodeIssue(NamedTuple):
+    """A byte sequence that is not valid in the encoding being tried"""
+    file_path: str
+    encoding: str
+    byte_offset: int
+    reason: str
+    fallback: str
+
+    def __str__(self) -> str:
+        return (f"Warning: {os.path.basename(self.file_path)} is not valid {self.encoding} "
+                f"at byte {self.byte_offset:,} ({self.reason}); reading it as {self.fallback}")
+
+
+def _find_decode_error(f, encoding: str, limit: Optional[int] = None) -> Optional[UnicodeDecodeError]:
+    """Stream f through an incremental decoder, returning the first error with an absolute start offset"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    offset = 0
+    while limit is None or offset < limit:
+        size = ENCODING_VALIDATE_BYTES if limit is None else min(ENCODING_VALIDATE_BYTES, limit - offset)
+        data = f.read(size)
+        # A multi-byte character cut by a sampled prefix is not an error
+        final = not data and limit is None
+        pending = len(decoder.getstate()[0])
+        try:
+            decoder.decode(data, final=final)
+        except UnicodeDecodeError as e:
+            e.start = offset - pending + e.start
+            return e
+        if not data:
+            break
+        offset += len(data)
+    return None
+
+
+def detect_encoding(file_path: str) -> Tuple[str, List[DecodeIssue]]:
+    """Pick the encoding to parse file_path with, decoding its bytes but never parsing them.
+
+    Candidates are tried in CSV_ENCODINGS order. A candidate that fails on the
+    sampled prefix is dropped straight away; one that passes is then validated
+    against the whole file. Every rejected candidate is reported as a
+    DecodeIssue with the byte offset of the first bad sequence.
+    """
+    issues = []
+    for encoding, fallback in zip(CSV_ENCODINGS, CSV_ENCODINGS[1:] + ('',)):
+        if not fallback:
+            # Last resort maps every byte, so it can never fail
+            return encoding, issues
+        for limit in (ENCODING_SAMPLE_BYTES, None):
+            # Reopened rather than rewound: a decompressing stream cannot always seek
+            with open_input(file_path) as f:
+                error = _find_decode_error(f, encoding, limit)
+            if error is not None:
+                issues.append(DecodeIssue(file_path, encoding, error.start, error.reason, fallback))
+                break
+        else:
+            return encoding, issues
+    return CSV_ENCODINGS[-1], issues
+
+
+class _CheckedStream(io.RawIOBase):
+    """Binary stream that checks the bytes read through it are valid in encoding, noting the first error.
+
+    It never raises: the parser reading through it may or may not notice bad
+    bytes itself, so the caller looks at error once the parse is done.
+    """
+
+    def __init__(self, raw: BinaryIO, encoding: str):
+        self.raw = raw
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.offset = 0
+        self.error = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.raw.read(len(buffer))
+        count = len(data)
+        buffer[:count] = data
+        if self.error is None:
+            pending = len(self.decoder.getstate()[0])
+            try:
+                self.decoder.decode(data, final=not count)
+            except UnicodeDecodeError as e:
+                e.start = self.offset - pending + e.start
+                self.error = e
+            self.offset += count
+        return count
+
+
+def _read_compressed(file_path: str, read: Callable[[BinaryIO, str], pd.DataFrame],
+                     log: LogCallback) -> pd.DataFrame:
+    """Parse a compressed CSV with read(stream, encoding), checking the encoding during that same pass.
+
+    Decompressing is most of the cost of reading a compressed file, so rather
+    than detect_encoding's separate validation pass over the whole file, the
+    bytes are checked as the parser pulls them through. Only if they turn out
+    not to be valid in the chosen encoding is the file parsed again with the
+    next candidate; the issues are logged as detect_encoding's would be.
+    """
+    for encoding, fallback in zip(CSV_ENCODINGS, CSV_ENCODINGS[1:] + ('',)):
+        if not fallback:
+            with open_input(file_path) as f:
+                return read(f, encoding)
+        with open_input(file_path) as f:
+            error = _find_decode_error(f, encoding, ENCODING_SAMPLE_BYTES)
+        if error is None:
+            with open_input(file_path) as f:
+                stream = _CheckedStream(f, encoding)
+                try:
+                    df = read(stream, encoding)
+                except (UnicodeDecodeError, ValueError):
+                    # The parser's own decoding (or pyarrow's UTF-8 check) hit the bad bytes first
+                    if stream.error is None:
+                        raise
+                    df = None
+                error = stream.error
+            if error is None:
+                return df
+        log(str(DecodeIssue(file_path, encoding, error.start, error.reason, fallback)))
+
+
+def _read_csv_chunked(file_path: str, encoding: str, progress: Optional[ProgressCallback],
+                      cancel_event: Optional[threading.Event], stream: Optional[BinaryIO] = None,
+                      **read_options) -> pd.DataFrame:
+    """Read a CSV in chunks so progress can be reported and cancellation honoured.
+
+    stream, when given, is an open stream of file_path's decompressed bytes
+    to read instead of the file.
+    """
+    file_name = os.path.basename(file_path)
+    chunks = []
+    rows_read = 0
+    with ExitStack() as stack:
+        source = stream if stream is not None else stack.enter_context(csv_source(file_path))
+        for chunk in pd.read_csv(source, encoding=encoding, chunksize=READ_CHUNK_ROWS, **read_options):
+            check_cancelled(cancel_event)
+            chunks.append(chunk)
+            rows_read += len(chunk)
+            if progress is not None:
+                progress(file_name, rows_read)
+
+    if not chunks:
+        with csv_source(file_path) as source:
+            return pd.read_csv(source, encoding=encoding, **read_options)
+    if len(chunks) == 1:
+        return chunks[0]
+    # Chunks can end up with different category sets; union them instead of falling back to object
+    for column, dtype in read_options.get('dtype', {}).items():
+        if dtype == 'category':
+            categories = union_categoricals([chunk[column] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _check_not_excel(file_path: str) -> None:
+    if is_excel(file_path):
+        raise ValueError(f"{os.path.basename(file_path)} is an Excel workbook; "
+                         f"the main inventory must be a TCGplayer CSV export")
+
+
+def load_csv_data(file_path: str, progress: Optional[ProgressCallback] = None,
+                  cancel_event: Optional[threading.Event] = None,
+                  log: LogCallback = _no_log) -> pd.DataFrame:
+    """Load CSV data, detecting the encoding first so the file is parsed exactly once.
+
+    .gz, .zip and .zst files are decompressed as they are read. Excel
+    workbooks are only accepted as secondary files (see load_secondary_frame).
+    """
+    _check_not_excel(file_path)
+    if input_compression(file_path) is not None:
+        return _read_compressed(file_path, lambda stream, encoding: _read_csv_chunked(
+            file_path, encoding, progress, cancel_event, stream), log)
+    encoding, issues = detect_encoding(file_path)
+    for issue in issues:
+        log(str(issue))
+    return _read_csv_chunked(file_path, encoding, progress, cancel_event)
+
+
+def load_secondary_frame(file_path: str, progress: Optional[ProgressCallback] = None,
+                         cancel_event: Optional[threading.Event] = None,
+                         log: LogCallback = _no_log,
+                         rejected: Optional[List[RejectedQuantity]] = None) -> pd.DataFrame:
+    """Fast-load a secondary file: only the key and quantity columns, compactly typed.
+
+    Product Line, Set and Condition are read as categories and Quantity
+    becomes a nullable Int64; blank and rejected values are <NA>, and the
+    rejected ones are appended to rejected. The pyarrow CSV engine is used
+    when it is installed; it parses in one go, so progress is reported once
+    and cancellation is only checked before and after. Compressed CSVs are
+    decompressed as they are read, and .xlsx workbooks are streamed row by
+    row (see inventory_reader.read_excel_columns).
+    """
+    if is_excel(file_path):
+        def on_rows(rows_read: int) -> None:
+            check_cancelled(cancel_event)
+            if progress is not None:
+                progress(os.path.basename(file_path), rows_read)
+
+        df = read_excel_columns(file_path, list(SECONDARY_COLUMNS), list(SECONDARY_CATEGORY_COLUMNS), on_rows)
+    else:
+        df = _read_secondary_csv(file_path, progress, cancel_event, log)
+
+    if SECONDARY_QUANTITY in df.columns:
+        df[SECONDARY_QUANTITY], rejects = parse_quantities(df[SECONDARY_QUANTITY], file_path, SECONDARY_QUANTITY)
+        if rejected is not None:
+            rejected.extend(rejects)
+    return df
+
+
+def _read_secondary_csv(file_path: str, progress: Optional[ProgressCallback],
+                        cancel_event: Optional[threading.Event], log: LogCallback) -> pd.DataFrame:
+    """The key and quantity columns of a secondary CSV, as load_secondary_frame types them"""
+    def read(stream: Optional[BinaryIO], encoding: str) -> pd.DataFrame:
+        with csv_source(file_path) as source:
+            header = pd.read_csv(source, encoding=encoding, nrows=0).columns
+        usecols = [column for column in header if column in SECONDARY_COLUMNS]
+        dtype = {column: 'category' for column in SECONDARY_CATEGORY_COLUMNS if column in usecols}
+
+        check_cancelled(cancel_event)
+        if PYARROW_AVAILABLE:
+            # The categories are applied afterwards: given any dtype, pandas 3's pyarrow engine casts
+            # integer columns with blanks (Number, for sealed product) to int64 and fails
+            df = pd.read_csv(stream if stream is not None else file_path, encoding=encoding, usecols=usecols,
+                             engine='pyarrow')
+            if dtype:
+                df = df.astype(dtype)
+            check_cancelled(cancel_event)
+            if progress is not None:
+                progress(os.path.basename(file_path), len(df))
+            return df
+        return _read_csv_chunked(file_path, encoding, progress, cancel_event, stream, usecols=usecols, dtype=dtype)
+
+    if input_compression(file_path) is not None:
+        return _read_compressed(file_path, read, log)
+    encoding, issues = detect_encoding(file_path)
+    for issue in issues:
+        log(str(issue))
+    return read(None, encoding)
+
+
+def parse_quantities(values: pd.Series, file_path: str, column: str,
+                     allow_negative: bool = False) -> Tuple[pd.Series, List[RejectedQuantity]]:
+    """Parse a quantity column to a nullable Int64 and list the values that had to be rejected.
+
+    One to_numeric pass over the column gives the numbers; only the cells
+    that are not a whole number in range are looked at again, to tell
+    blanks (plain <NA>) from rejects such as "3x", "2.5" or "-1" (also <NA>,
+    and reported). allow_negative is for Add to Quantity, where TCGplayer
+    takes a negative number as stock to remove. Line numbers assume one line
+    per row, as in TCGplayer exports.
+    """
+    numbers = pd.to_numeric(values, errors='coerce').astype('float64').to_numpy()
+    whole = np.trunc(numbers)
+    with np.errstate(invalid='ignore'):
+        in_range = np.abs(numbers) < MAX_QUANTITY if allow_negative else (numbers >= 0) & (numbers < MAX_QUANTITY)
+        valid = (whole == numbers) & in_range
+    quantities = pd.Series(whole, index=values.index).where(valid).astype('Int64')
+    suspects = np.flatnonzero(~valid)
+    if not len(suspects):
+        return quantities, []
+
+    raw = values.iloc[suspects]
+    text = raw.astype(object).where(raw.notna(), '').astype(str).str.strip().tolist()
+    rejects = []
+    for position, value, number in zip(suspects.tolist(), text, numbers[suspects].tolist()):
+        if not value:
+            continue
+        if number != number or number in (float('inf'), float('-inf')):
+            reason = REJECT_NOT_A_NUMBER
+        elif number < 0 and not allow_negative:
+            reason = REJECT_NEGATIVE
+        elif abs(number) >= MAX_QUANTITY:
+            reason = REJECT_TOO_LARGE
+        else:
+            reason = REJECT_FRACTION
+        rejects.append(RejectedQuantity(file_path, position + 2, column, value, reason))
+    return quantities, rejects
+
+
+def _normalize_key_column(series: pd.Series) -> pd.Series:
+    """Strip and lowercase one key column, the way str(value).strip().lower() would"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Normalize each distinct label once; code -1 (missing) picks the trailing 'nan'
+        labels = series.cat.categories.astype(str).str.strip().str.lower()
+        labels = np.append(np.asarray(labels, dtype=object), 'nan')
+        return pd.Series(labels[series.cat.codes.to_numpy()], index=series.index)
+    # astype(str) keeps NaN on newer pandas; match the old str(nan) key
+    return series.astype(str).fillna('nan').str.strip().str.lower()
+
+
+def normalize_key_columns(df: pd.DataFrame, columns: Tuple[str, ...]) -> pd.DataFrame:
+    """Build the normalized 5-field match key for every row of df"""
+    keys = {}
+    for field, column in zip(KEY_FIELDS, columns):
+        if column in df.columns:
+            keys[field] = _normalize_key_column(df[column])
+        else:
+            keys[field] = pd.Series('', index=df.index)
+    return pd.DataFrame(keys, index=df.index)
+
+
+def coerce_quantity(df: pd.DataFrame, column: str) -> pd.Series:
+    """Quantities as int64 (negative ones kept), treating blank or rejected values (see parse_quantities) as 0"""
+    if column not in df.columns:
+        return pd.Series(0, index=df.index, dtype='int64')
+    values = df[column]
+    if not isinstance(values.dtype, pd.Int64Dtype):
+        values, _ = parse_quantities(values, '', column, allow_negative=True)
+    return values.fillna(0).astype('int64')
+
+
+def aggregate_secondary_quantities(secondary_df: pd.DataFrame) -> Dict[CardKey, int]:
+    """Sum positive quantities per card key for one secondary file"""
+    keys = normalize_key_columns(secondary_df, SECONDARY_KEY_COLUMNS)
+    quantity = coerce_quantity(secondary_df, SECONDARY_QUANTITY)
+
+    mask = (quantity > 0) & (keys['product_line'] != '') & (keys['set_name'] != '') & (keys['product_name'] != '')
+    if not mask.any():
+        return {}
+
+    totals = quantity[mask].groupby([keys.loc[mask, field] for field in KEY_FIELDS], sort=False).sum()
+    return {card_key: int(total) for card_key, total in totals.items()}
+
+
+def aggregate_quantities(secondary_frames: Iterable[pd.DataFrame], log: LogCallback = _no_log,
+                         cancel_event: Optional[threading.Event] = None) -> Dict[CardKey, int]:
+    """Sum quantities per card key across all secondary files"""
+    aggregated_quantities = {}
+
+    for secondary_df in secondary_frames:
+        check_cancelled(cancel_event)
+        try:
+            partial = aggregate_secondary_quantities(secondary_df)
+            for card_key, quantity in partial.items():
+                aggregated_quantities[card_key] = aggregated_quantities.get(card_key, 0) + quantity
+        except Exception as e:
+            log(f"Error processing secondary file: {str(e)}")
+            continue
+
+    return aggregated_quantities
+
+
+class CardKeyIndex:
+    """The main inventory's card keys, interned to integers.
+
+    Each key field keeps one vocabulary of its distinct normalized labels,
+    so a set name or condition is stored once rather than once per row. A
+    card key becomes the mixed-radix number of its five label codes, and
+    every distinct key gets a dense id (0..len-1) with its main row
+    positions. Secondary keys are encoded the same way and matched by
+    comparing integers; a key with any label the main file lacks cannot
+    match and gets id -1.
+    """
+
+    def __init__(self, main_keys: pd.DataFrame):
+        self.vocabularies = []
+        codes = []
+        for field in KEY_FIELDS:
+            field_codes, labels = pd.factorize(main_keys[field])
+            self.vocabularies.append(pd.Index(labels))
+            codes.append(field_codes)
+
+        packed = self._pack(codes)
+        self.packed_keys, key_ids = np.unique(packed, return_inverse=True)
+        self.key_ids = key_ids.reshape(-1).astype(np.int64)
+        # Main row positions grouped by key id: positions of id i are order[starts[i]:starts[i + 1]]
+        self.order = np.argsort(self.key_ids, kind='stable')
+        self.starts = np.concatenate(([0], np.cumsum(np.bincount(self.key_ids, minlength=len(self)))))
+
+    def __len__(self) -> int:
+        return len(self.packed_keys)
+
+    def _pack(self, codes: List[np.ndarray]) -> np.ndarray:
+        """Combine per-field codes into one number per key, falling back to Python ints on overflow"""
+        capacity = 1
+        for vocabulary in self.vocabularies:
+            capacity *= max(len(vocabulary), 1)
+        dtype = np.int64 if capacity <= np.iinfo(np.int64).max else object
+        packed = np.zeros(len(codes[0]), dtype=dtype)
+        for vocabulary, field_codes in zip(self.vocabularies, codes):
+            packed = packed * max(len(vocabulary), 1) + field_codes.astype(dtype)
+        return packed
+
+    def key_labels(self) -> pd.DataFrame:
+        """The normalized labels of every distinct key, one row per key id"""
+        labels = {}
+        remaining = self.packed_keys
+        for field, vocabulary in reversed(list(zip(KEY_FIELDS, self.vocabularies))):
+            radix = max(len(vocabulary), 1)
+            codes = (remaining % radix).astype(np.int64)
+            remaining = remaining // radix
+            labels[field] = np.asarray(vocabulary, dtype=object)[codes]
+        return pd.DataFrame({field: labels[field] for field in KEY_FIELDS})
+
+    def lookup(self, keys: pd.DataFrame) -> np.ndarray:
+        """Key id of every row of a normalized key frame, or -1 where the key is not in the main file"""
+        codes = [vocabulary.get_indexer(keys[field]) for field, vocabulary in zip(KEY_FIELDS, self.vocabularies)]
+        known = np.logical_and.reduce([field_codes >= 0 for field_codes in codes])
+        key_ids = np.full(len(keys), -1, dtype=np.int64)
+        if not known.any() or not len(self):
+            return key_ids
+
+        packed = self._pack([field_codes[known] for field_codes in codes])
+        slots = np.minimum(np.searchsorted(self.packed_keys, packed), len(self) - 1)
+        found = self.packed_keys[slots] == packed
+        key_ids[np.flatnonzero(known)[found]] = slots[found]
+        return key_ids
+
+    def encode(self, quantities: Dict[CardKey, int], fuzzy: Optional['FuzzyMatcher'] = None,
+               unmatched_keys: Optional[List[CardKey]] = None) -> Dict[int, int]:
+        """Re-key a {card_key: qty} dict by match slot, dropping keys that match no main row.
+
+        A slot is key_id * len(MATCH_TIERS) + tier index. Keys without an
+        exact match are handed to fuzzy, when given, for the looser tiers;
+        quantities of keys that land on the same slot are summed. The dropped
+        keys are appended to unmatched_keys, when given.
+        """
+        if not quantities:
+            return {}
+        keys = pd.DataFrame(list(quantities.keys()), columns=list(KEY_FIELDS))
+        key_ids = self.lookup(keys)
+        tiers = np.zeros(len(keys), dtype=np.int64)
+        unmatched = np.flatnonzero(key_ids < 0)
+        if fuzzy is not None and len(unmatched):
+            key_ids[unmatched], tiers[unmatched] = fuzzy.resolve(keys.iloc[unmatched])
+
+        matched = key_ids >= 0
+        if unmatched_keys is not None and not matched.all():
+            card_keys = list(quantities.keys())
+            unmatched_keys.extend(card_keys[position] for position in np.flatnonzero(~matched))
+        slots = key_ids[matched] * len(MATCH_TIERS) + tiers[matched]
+        values = np.fromiter(quantities.values(), dtype=np.int64, count=len(quantities))[matched]
+        if len(unmatched) and fuzzy is not None:
+            totals = pd.Series(values).groupby(slots, sort=False).sum()
+            return dict(zip(totals.index.tolist(), totals.tolist()))
+        return dict(zip(slots.tolist(), values.tolist()))
+
+    def positions(self, key_id: int) -> np.ndarray:
+        """Main row positions holding key_id, in file order"""
+        return self.order[self.starts[key_id]:self.starts[key_id + 1]]
+
+    def match(self, quantities: Dict[CardKey, int], fuzzy: Optional['FuzzyMatcher'] = None,
+              unmatched_keys: Optional[List[CardKey]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(main row positions, new quantities, tier indices) for every main row some key in quantities matches.
+
+        A row matched through several tiers gets the summed quantity and the
+        loosest of those tiers. Keys that match no row are appended to
+        unmatched_keys, when given.
+        """
+        totals = np.zeros(len(self), dtype=np.int64)
+        key_tiers = np.full(len(self), -1, dtype=np.int64)
+        encoded = self.encode(quantities, fuzzy, unmatched_keys)
+        if encoded:
+            slots = np.fromiter(encoded.keys(), dtype=np.int64, count=len(encoded))
+            key_ids, tiers = slots // len(MATCH_TIERS), slots % len(MATCH_TIERS)
+            np.add.at(totals, key_ids, np.fromiter(encoded.values(), dtype=np.int64, count=len(encoded)))
+            np.maximum.at(key_tiers, key_ids, tiers)
+        positions = np.flatnonzero(key_tiers[self.key_ids] >= 0)
+        row_keys = self.key_ids[positions]
+        return positions, totals[row_keys], key_tiers[row_keys]
+
+
+class AliasTables(NamedTuple):
+    """Aliases used by the alias match tier, keyed and valued in normalized form"""
+    conditions: Dict[str, str]
+    sets: Dict[str, str]
+
+
+def _simplify(label: str) -> str:
+    """Collapse punctuation and runs of whitespace into single spaces"""
+    return ' '.join(re.findall(r'[^\W_]+', label))
+
+
+def load_alias_tables(file_path: Optional[str] = None) -> AliasTables:
+    """The built-in alias tables, extended by a JSON file of {"conditions": {...}, "sets": {...}}.
+
+    Entries in the file override built-in ones with the same alias. Case,
+    spacing and punctuation in the file do not matter.
+    """
+    conditions = dict(DEFAULT_CONDITION_ALIASES)
+    sets = dict(DEFAULT_SET_ALIASES)
+    if file_path:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, dict) or not all(isinstance(config.get(name, {}), dict)
+                                                   for name in ('conditions', 'sets')):
+            raise ValueError(f"{os.path.basename(file_path)}: expected a JSON object with 'conditions' and 'sets'")
+        for table, name in ((conditions, 'conditions'), (sets, 'sets')):
+            for alias, value in config.get(name, {}).items():
+                table[_simplify(str(alias).lower())] = _simplify(str(value).lower())
+    return AliasTables(conditions, sets)
+
+
+def canonical_number(label: str) -> str:
+    """Number without leading zeros or a trailing .0, so '001', '1' and '1.0' agree"""
+    label = re.sub(r'\.0+$', '', label.strip())
+    return re.sub(r'^0+(?=\d)', '', label)
+
+
+def _canonical_frame(keys: pd.DataFrame, aliases: AliasTables) -> pd.DataFrame:
+    """Canonical form of a normalized key frame, computed once per distinct label"""
+    canonicalize = {
+        'product_line': _simplify,
+        'set_name': lambda label: aliases.sets.get(_simplify(label), _simplify(label)),
+        'product_name': _simplify,
+        'number': canonical_number,
+        'condition': lambda label: ' '.join(aliases.conditions.get(word, word) for word in _simplify(label).split()),
+    }
+    canonical = {}
+    for field in KEY_FIELDS:
+        codes, labels = pd.factorize(keys[field])
+        labels = np.array([canonicalize[field](str(label)) for label in labels], dtype=object)
+        canonical[field] = labels[codes]
+    return pd.DataFrame(canonical)
+
+
+def _trigrams(name: str) -> set:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _name_parts(name: str) -> Tuple[Tuple[str, ...], frozenset]:
+    """(the numbers in a product name, its words without digits): what a fuzzy match may not change"""
+    return tuple(re.findall(r'\d+', name)), frozenset(re.findall(r'[^\W\d]+', name))
+
+
+def _same_product(parts: Tuple[Tuple[str, ...], frozenset],
+                  candidate_parts: Tuple[Tuple[str, ...], frozenset]) -> bool:
+    """False for names that differ in a number ("Card 4976", "Card 1976") or by whole words ("Booster Box Case")"""
+    (numbers, words), (candidate_numbers, candidate_words) = parts, candidate_parts
+    return numbers == candidate_numbers and not (words < candidate_words or candidate_words < words)
+
+
+# Fields a fuzzy name candidate must agree on (canonically) before names are compared
+BLOCK_FIELDS = ('product_line', 'set_name', 'number', 'condition')
+# Blocks with more main keys than this are searched through a name trigram index instead of scanned
+BLOCK_SCAN_LIMIT = 64
+# Number labels of products without one (sealed product). Their block is too weak to go by the
+# name alone ("Booster Box" would pass for "Booster Box Case"), so they skip the fuzzy tier
+BLANK_NUMBERS = ('', 'nan')
+
+
+class FuzzyMatcher:
+    """The alias and fuzzy match tiers, for secondary keys with no exact match.
+
+    Alias tier: keys are canonicalized (alias tables applied to conditions
+    and sets, punctuation collapsed, numbers without leading zeros) and
+    looked up in a CardKeyIndex of the main keys' canonical forms. Fuzzy
+    tier: keys still unmatched are compared by product name, but only with
+    main keys in the same block (canonical product line, set, number and
+    condition) and, in large blocks, sharing a name trigram, so there is
+    never an all-pairs comparison. Keys without a number never get past the
+    alias tier. A close name still has to keep the same numbers and may not
+    add or drop whole words, which a typo does not do but a different
+    product does. A key whose name is close to more than one main name in
+    its block is left unmatched rather than guessed. Main-side indexes are
+    built on first use and kept for later calls.
+    """
+
+    def __init__(self, key_index: CardKeyIndex, aliases: AliasTables):
+        self.key_index = key_index
+        self.aliases = aliases
+        self.main_canonical = None
+        self.canonical_index = None
+        self.main_names = None
+        # block -> main key ids in it, plus a name trigram index for blocks too big to scan
+        self.blocks = {}
+        self.block_trigrams = {}
+        self.name_trigrams = {}
+        self.name_parts = {}
+
+    def resolve(self, keys: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """(main key id or -1, tier index) for every row of a normalized key frame"""
+        key_ids = np.full(len(keys), -1, dtype=np.int64)
+        tiers = np.full(len(keys), MATCH_TIERS.index(MATCH_ALIAS), dtype=np.int64)
+        if not len(keys) or not len(self.key_index):
+            return key_ids, tiers
+
+        if self.canonical_index is None:
+            # Row i of main_canonical is main key id i, so canonical positions are key ids
+            self.main_canonical = _canonical_frame(self.key_index.key_labels(), self.aliases)
+            self.canonical_index = CardKeyIndex(self.main_canonical)
+            self.main_names = self.main_canonical['product_name'].tolist()
+        canonical = _canonical_frame(keys, self.aliases)
+        canonical_ids = self.canonical_index.lookup(canonical)
+
+        found = np.flatnonzero(canonical_ids >= 0)
+        starts = self.canonical_index.starts
+        unique = starts[canonical_ids[found] + 1] - starts[canonical_ids[found]] == 1
+        key_ids[found[unique]] = self.canonical_index.order[starts[canonical_ids[found[unique]]]]
+
+        remaining = np.flatnonzero(canonical_ids < 0)
+        if len(remaining):
+            key_ids[remaining] = self._match_names(canonical.iloc[remaining])
+            tiers[remaining] = MATCH_TIERS.index(MATCH_FUZZY)
+        return key_ids, tiers
+
+    def _index_blocks(self, needed: set) -> None:
+        """Collect the main key ids of every needed block not seen yet"""
+        needed = needed - self.blocks.keys()
+        if not needed:
+            return
+        for block in needed:
+            self.blocks[block] = []
+        main = self.main_canonical
+        in_needed = pd.MultiIndex.from_frame(main[list(BLOCK_FIELDS)]).isin(list(needed))
+        candidates = main[in_needed]
+        for key_id, *block in zip(np.flatnonzero(in_needed).tolist(),
+                                  *(candidates[field].tolist() for field in BLOCK_FIELDS)):
+            self.blocks[tuple(block)].append(key_id)
+
+    def _trigrams_of(self, key_id: int) -> set:
+        trigrams = self.name_trigrams.get(key_id)
+        if trigrams is None:
+            trigrams = self.name_trigrams[key_id] = _trigrams(self.main_names[key_id])
+        return trigrams
+
+    def _parts_of(self, key_id: int) -> Tuple[Tuple[str, ...], frozenset]:
+        parts = self.name_parts.get(key_id)
+        if parts is None:
+            parts = self.name_parts[key_id] = _name_parts(self.main_names[key_id])
+        return parts
+
+    def _candidates(self, block: Tuple[str, ...], trigrams: set) -> Iterable[int]:
+        """Main key ids in the block worth scoring: all of a small block, those sharing a trigram otherwise"""
+        key_ids = self.blocks[block]
+        if len(key_ids) <= BLOCK_SCAN_LIMIT:
+            return key_ids
+        trigram_index = self.block_trigrams.get(block)
+        if trigram_index is None:
+            trigram_index = self.block_trigrams[block] = {}
+            for key_id in key_ids:
+                for trigram in self._trigrams_of(key_id):
+                    trigram_index.setdefault(trigram, []).append(key_id)
+        return {key_id for trigram in trigrams for key_id in trigram_index.get(trigram, ())}
+
+    def _match_names(self, canonical: pd.DataFrame) -> np.ndarray:
+        blocks = list(zip(*(canonical[field].tolist() for field in BLOCK_FIELDS)))
+        number = BLOCK_FIELDS.index('number')
+        self._index_blocks({block for block in blocks if block[number] not in BLANK_NUMBERS})
+        return np.array([self._best_name_match(block, name) if block[number] not in BLANK_NUMBERS else -1
+                         for block, name in zip(blocks, canonical['product_name'].tolist())], dtype=np.int64)
+
+    def _best_name_match(self, block: Tuple[str, ...], name: str) -> int:
+        """Main key id of the one name in the block close enough to name, or -1 if there is none or several"""
+        trigrams = _trigrams(name)
+        parts = _name_parts(name)
+        found = -1
+        for key_id in self._candidates(block, trigrams):
+            candidate = self._trigrams_of(key_id)
+            if (2 * len(trigrams & candidate) / (len(trigrams) + len(candidate)) >= FUZZY_NAME_THRESHOLD
+                    and _same_product(parts, self._parts_of(key_id))):
+                if found >= 0:
+                    # "Card 119" is one letter from both "Card 1119" and "Card 1719"; a guess would often be wrong
+                    return -1
+                found = key_id
+        return found
+
+
+def describe_match_tiers(changes: List[Dict]) -> str:
+    """Note on how many changes came from the looser match tiers, or '' if all matched exactly"""
+    counts = Counter(change.get('match', MATCH_EXACT) for change in changes)
+    parts = [f"{counts[tier]} by {tier} match" for tier in MATCH_TIERS[1:] if counts[tier]]
+    return f" ({', '.join(parts)})" if parts else ""
+
+
+def find_inventory_changes(main_df: pd.DataFrame, aggregated_quantities: Dict[CardKey, int],
+                           aliases: Optional[AliasTables] = None,
+                           unmatched_keys: Optional[List[CardKey]] = None) -> List[Dict]:
+    """Match aggregated quantities onto the main inventory and return the change list.
+
+    Without aliases only exact key matches count. With them, keys that have
+    no exact match go on to the alias and fuzzy tiers; each change records
+    the tier that matched it under 'match'. Card keys that match no main row
+    are appended to unmatched_keys, when given.
+    """
+    if not aggregated_quantities:
+        return []
+    if main_df.empty:
+        if unmatched_keys is not None:
+            unmatched_keys.extend(aggregated_quantities)
+        return []
+
+    key_index = CardKeyIndex(normalize_key_columns(main_df, MAIN_KEY_COLUMNS))
+    fuzzy = FuzzyMatcher(key_index, aliases) if aliases is not None else None
+    positions, new, tiers = key_index.match(aggregated_quantities, fuzzy, unmatched_keys)
+    return changes_for_rows(main_df.iloc[positions], new, tiers)
+
+
+def changes_for_rows(rows: pd.DataFrame, new_quantities: Iterable[int],
+                     tiers: Optional[Iterable[int]] = None) -> List[Dict]:
+    """The change list for matched main rows: each row's new quantity and match tier index (exact by default)"""
+    if rows.empty:
+        return []
+    if tiers is None:
+        tiers = [MATCH_TIERS.index(MATCH_EXACT)] * len(rows)
+    current = coerce_quantity(rows, MAIN_ADD_QUANTITY).to_numpy()
+
+    def column_values(column):
+        if column in rows.columns:
+            return rows[column].tolist()
+        return [''] * len(rows)
+
+    changes = []
+    for index, product_line, set_name, product_name, number, condition, current_quantity, new_quantity, tier in zip(
+            rows.index, *(column_values(column) for column in MAIN_KEY_COLUMNS), current, new_quantities, tiers):
+        changes.append({
+            'index': index,
+            'product_line': product_line,
+            'set_name': set_name,
+            'product_name': product_name,
+            'number': number,
+            'condition': condition,
+            'current_add_quantity': int(current_quantity),
+            'new_add_quantity': int(new_quantity),
+            'change': int(new_quantity) - int(current_quantity),
+            'match': MATCH_TIERS[tier]
+        })
+    return changes
+
+
+class ChangeDiff(NamedTuple):
+    """How the change list moved after a secondary file was added or removed"""
+    added: List[Dict]
+    updated: List[Dict]
+    removed: List[Dict]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+def file_stamp(file_path: str) -> Tuple[int, int]:
+    """(size, mtime) of a file, used to notice that it changed on disk"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ChangePlan(NamedTuple):
+    """A change list together with the inputs it was computed from.
+
+    version is the IncrementalMerge version the changes were taken at; the
+    stamps fingerprint the main and secondary files, so a Save can apply a
+    previewed plan as is while nothing it depends on has changed.
+    """
+    version: int
+    main_path: Optional[str]
+    main_stamp: Optional[Tuple[int, int]]
+    file_stamps: Dict[str, Optional[Tuple[int, int]]]
+    aliases: Optional[AliasTables]
+    changes: List[Dict]
+
+    def is_current(self, main_path: str, secondary_files: Iterable[str],
+                   aliases: Optional[AliasTables]) -> bool:
+        """True when the inputs are the same files, unchanged on disk, matched with the same aliases"""
+        if main_path != self.main_path or aliases is not self.aliases or set(secondary_files) != set(self.file_stamps):
+            return False
+        try:
+            return (file_stamp(main_path) == self.main_stamp
+                    and all(file_stamp(file_path) == stamp for file_path, stamp in self.file_stamps.items()))
+        except OSError:
+            return False
+
+
+class IncrementalMerge:
+    """Running merge of secondary partials onto one resident main inventory.
+
+    The main file's keys are indexed once in a CardKeyIndex, and each added
+    partial is re-keyed by match slot (key id and tier), keeping only the
+    keys that match a main row. Adding or removing a secondary file only touches the keys in its
+    partial and the main rows those keys point at, so the cost is that of
+    the file rather than of the whole inventory. changes() always equals
+    find_inventory_changes(main_df, reduce_partials(partials), aliases).
+    """
+
+    def __init__(self, main_df: pd.DataFrame, main_path: Optional[str] = None,
+                 main_stamp: Optional[Tuple[int, int]] = None, aliases: Optional[AliasTables] = None):
+        self.main_df = main_df
+        self.main_path = main_path
+        self.main_stamp = main_stamp
+        self.aliases = aliases
+        self.key_index = CardKeyIndex(normalize_key_columns(main_df, MAIN_KEY_COLUMNS))
+        self.fuzzy = FuzzyMatcher(self.key_index, aliases) if aliases is not None else None
+        self.current_quantities = coerce_quantity(main_df, MAIN_ADD_QUANTITY).to_numpy()
+        self.partials = {}
+        self.stamps = {}
+        self.aggregated_quantities = {}
+        self.changes_by_position = {}
+        # Bumped on every add_file/remove_file, so a ChangePlan can tell it is out of date
+        self.version = 0
+
+    def _value_at(self, column: str, position: int):
+        if column in self.main_df.columns:
+            return self.main_df[column].iat[position]
+        return ''
+
+    def _change_at(self, position: int, new_quantity: int, tier: str) -> Dict:
+        current_quantity = int(self.current_quantities[position])
+        return {
+            'index': self.main_df.index[position],
+            'product_line': self._value_at(MAIN_KEY_COLUMNS[0], position),
+            'set_name': self._value_at(MAIN_KEY_COLUMNS[1], position),
+            'product_name': self._value_at(MAIN_KEY_COLUMNS[2], position),
+            'number': self._value_at(MAIN_KEY_COLUMNS[3], position),
+            'condition': self._value_at(MAIN_KEY_COLUMNS[4], position),
+            'current_add_quantity': current_quantity,
+            'new_add_quantity': int(new_quantity),
+            'change': int(new_quantity) - current_quantity,
+            'match': tier
+        }
+
+    def _key_total(self, key_id: int) -> Tuple[int, Optional[str]]:
+        """Quantity summed over every tier that matched key_id, and the loosest of those tiers"""
+        total, tier = 0, None
+        for tier_index, name in enumerate(MATCH_TIERS):
+            quantity = self.aggregated_quantities.get(key_id * len(MATCH_TIERS) + tier_index, 0)
+            if quantity > 0:
+                total += quantity
+                tier = name
+        return total, tier
+
+    def _apply_delta(self, encoded: Dict[int, int], sign: int) -> ChangeDiff:
+        self.version += 1
+        touched = {}
+        for slot, quantity in encoded.items():
+            total = self.aggregated_quantities.get(slot, 0) + sign * quantity
+            if total > 0:
+                self.aggregated_quantities[slot] = total
+            else:
+                self.aggregated_quantities.pop(slot, None)
+            touched[slot // len(MATCH_TIERS)] = True
+
+        diff = ChangeDiff([], [], [])
+        for key_id in touched:
+            total, tier = self._key_total(key_id)
+            for position in self.key_index.positions(key_id).tolist():
+                previous = self.changes_by_position.pop(position, None)
+                if total > 0:
+                    change = self._change_at(position, total, tier)
+                    self.changes_by_position[position] = change
+                    (diff.updated if previous is not None else diff.added).append(change)
+                elif previous is not None:
+                    diff.removed.append(previous)
+        return diff
+
+    def add_file(self, file_path: str, partial: Dict[CardKey, int],
+                 stamp: Optional[Tuple[int, int]] = None) -> ChangeDiff:
+        """Fold one secondary file's partial into the running aggregate; a rewritten file's diff is the net change"""
+        before = self.snapshot() if file_path in self.partials else None
+        if before is not None:
+            self.remove_file(file_path)
+        encoded = self.key_index.encode(partial, self.fuzzy)
+        self.partials[file_path] = encoded
+        self.stamps[file_path] = stamp
+        diff = self._apply_delta(encoded, 1)
+        return diff if before is None else self.diff_since(before)
+
+    def remove_file(self, file_path: str) -> ChangeDiff:
+        """Subtract one secondary file's partial from the running aggregate"""
+        encoded = self.partials.pop(file_path, None)
+        self.stamps.pop(file_path, None)
+        if encoded is None:
+            return ChangeDiff([], [], [])
+        return self._apply_delta(encoded, -1)
+
+    def stale_files(self, file_paths: Iterable[str]) -> List[str]:
+        """Files in file_paths that are new, or changed on disk since they were added"""
+        stale = []
+        for file_path in file_paths:
+            try:
+                stamp = file_stamp(file_path)
+            except OSError:
+                stamp = None
+            if file_path not in self.partials or stamp is None or self.stamps.get(file_path) != stamp:
+                stale.append(file_path)
+        return stale
+
+    def changes(self) -> List[Dict]:
+        """The full change list, in main file order"""
+        return [self.changes_by_position[position] for position in sorted(self.changes_by_position)]
+
+    def plan(self) -> ChangePlan:
+        """The current changes as a ChangePlan, fingerprinted with the files they came from"""
+        return ChangePlan(self.version, self.main_path, self.main_stamp, dict(self.stamps), self.aliases,
+                          self.changes())
+
+    def snapshot(self) -> Dict[int, Dict]:
+        """Copy of the current changes, to diff against later with diff_since"""
+        return dict(self.changes_by_position)
+
+    def diff_since(self, snapshot: Dict[int, Dict]) -> ChangeDiff:
+        """Net difference between a snapshot and the current changes, in main file order"""
+        diff = ChangeDiff([], [], [])
+        for position in sorted(set(snapshot) | set(self.changes_by_position)):
+            before = snapshot.get(position)
+            after = self.changes_by_position.get(position)
+            if before is None:
+                diff.added.append(after)
+            elif after is None:
+                diff.removed.append(before)
+            elif (after['new_add_quantity'], after['match']) != (before['new_add_quantity'], before['match']):
+                diff.updated.append(after)
+        return diff
+
+
+def default_worker_count(file_paths: List[str]) -> int:
+    """One worker per file, capped at the number of CPUs; 1 (no pool) for one file or little data"""
+    total_bytes = 0
+    for file_path in file_paths:
+        try:
+            total_bytes += os.path.getsize(file_path)
+        except OSError:
+            pass
+    if len(file_paths) <= 1 or total_bytes < PARALLEL_MIN_BYTES:
+        return 1
+    return min(len(file_paths), os.cpu_count() or 1)
+
+
+def _load_secondary_partial(file_path: str) -> Tuple[Dict[CardKey, int], int, List[str], List[RejectedQuantity]]:
+    """Parse one secondary file and pre-aggregate it (runs in a pool worker)"""
+    messages = []
+    rejects = []
+    df = load_secondary_frame(file_path, log=messages.append, rejected=rejects)
+    return aggregate_secondary_quantities(df), len(df), messages, rejects
+
+
+def load_secondary_partials(file_paths: List[str], workers: Optional[int] = None,
+                            log: LogCallback = _no_log,
+                            progress: Optional[ProgressCallback] = None,
+                            cancel_event: Optional[threading.Event] = None,
+                            cache: Optional[ParsedFileCache] = None,
+                            rejected: Optional[Dict[str, List[RejectedQuantity]]] = None
+                            ) -> Dict[str, Dict[CardKey, int]]:
+    """Parse and pre-aggregate every secondary file into a per-file {card_key: qty} partial.
+
+    Files found in cache (unchanged since they were last parsed) are not
+    parsed again. With more than one worker the rest are parsed in a process
+    pool. The result maps each successfully loaded path to its partial, in
+    the order of file_paths, whatever order the workers finish in. Files
+    that fail to load are logged and left out. With rejected, the rejected
+    quantities of each loaded file (cached ones included) are stored there
+    by path.
+    """
+    results = {}
+    rejects_by_file = {}
+    to_parse = []
+    if cache is not None:
+        cache.reset_stats()
+    for file_path in file_paths:
+        cached = cache.get(file_path) if cache is not None else None
+        if cached is None:
+            to_parse.append(file_path)
+        else:
+            results[file_path] = cached[0]
+            rejects_by_file[file_path] = [RejectedQuantity(file_path, *row) for row in cached[1]]
+
+    if workers is None:
+        workers = default_worker_count(to_parse)
+
+    parsed = {}
+    if workers <= 1 or len(to_parse) <= 1:
+        for file_path in to_parse:
+            check_cancelled(cancel_event)
+            try:
+                rejects = []
+                df = load_secondary_frame(file_path, progress, cancel_event, log, rejects)
+                parsed[file_path] = aggregate_secondary_quantities(df)
+                rejects_by_file[file_path] = rejects
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                log(f"Error loading {os.path.basename(file_path)}: {str(e)}")
+    else:
+        # Only imported when a pool is used: concurrent.futures.process pulls in multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_load_secondary_partial, file_path): file_path for file_path in to_parse}
+            try:
+                for future in as_completed(futures):
+                    check_cancelled(cancel_event)
+                    file_path = futures[future]
+                    try:
+                        partial, rows_read, messages, rejects = future.result()
+                    except Exception as e:
+                        log(f"Error loading {os.path.basename(file_path)}: {str(e)}")
+                        continue
+                    for message in messages:
+                        log(message)
+                    parsed[file_path] = partial
+                    rejects_by_file[file_path] = rejects
+                    if progress is not None:
+                        progress(os.path.basename(file_path), rows_read)
+            except OperationCancelled:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    if cache is not None:
+        for file_path, partial in parsed.items():
+            try:
+                cache.put(file_path, partial, [reject[1:] for reject in rejects_by_file[file_path]])
+            except Exception as e:
+                log(f"Warning: could not cache {os.path.basename(file_path)}: {str(e)}")
+        log(cache.stats_message())
+
+    results.update(parsed)
+    if rejected is not None:
+        rejected.update(rejects_by_file)
+    return {file_path: results[file_path] for file_path in file_paths if file_path in results}
+
+
+def reduce_partials(partials: Iterable[Dict[CardKey, int]]) -> Dict[CardKey, int]:
+    """Sum per-file partials into one aggregated_quantities dict"""
+    aggregated_quantities = {}
+    for partial in partials:
+        for card_key, quantity in partial.items():
+            aggregated_quantities[card_key] = aggregated_quantities.get(card_key, 0) + quantity
+    return aggregated_quantities
+
+
+def process_inventory_changes(main_df: pd.DataFrame, secondary_frames: Iterable[pd.DataFrame],
+                              log: LogCallback = _no_log,
+                              cancel_event: Optional[threading.Event] = None) -> List[Dict]:
+    """Aggregate the secondary files and return the changes for the main inventory"""
+    aggregated_quantities = aggregate_quantities(secondary_frames, log, cancel_event)
+    check_cancelled(cancel_event)
+    return find_inventory_changes(main_df, aggregated_quantities)
+
+
+def apply_changes(main_df: pd.DataFrame, changes: List[Dict]) -> int:
+    """Write the new Add to Quantity values into main_df, returning the number of rows updated"""
+    if not changes:
+        return 0
+    labels = [change['index'] for change in changes]
+    if MAIN_ADD_QUANTITY in main_df.columns and not pd.api.types.is_numeric_dtype(main_df[MAIN_ADD_QUANTITY]):
+        # A rejected value such as "3x" leaves the column as strings, which newer pandas will not
+        # store numbers in; object keeps the other rows' text as it was read
+        main_df[MAIN_ADD_QUANTITY] = main_df[MAIN_ADD_QUANTITY].astype(object)
+    main_df.loc[labels, MAIN_ADD_QUANTITY] = [change['new_add_quantity'] for change in changes]
+    return len(changes)
+
+
+@contextmanager
+def quantities_restored(main_df: pd.DataFrame) -> Iterator[None]:
+    """Put main_df's Add to Quantity column back as it was when the with block ends, error or not"""
+    original_quantities = main_df[MAIN_ADD_QUANTITY].copy() if MAIN_ADD_QUANTITY in main_df.columns else None
+    try:
+        yield
+    finally:
+        if original_quantities is not None:
+            main_df[MAIN_ADD_QUANTITY] = original_quantities
+        elif MAIN_ADD_QUANTITY in main_df.columns:
+            main_df.drop(columns=MAIN_ADD_QUANTITY, inplace=True)
+
+
+def write_inventory(main_df: pd.DataFrame, output_path: Optional[str], compression: Optional[str] = None,
+                    delta_path: Optional[str] = None, changes: Optional[List[Dict]] = None) -> None:
+    """Save the inventory to a CSV file, replacing output_path only once the file is complete.
+
+    With delta_path, the rows in changes are also written there with all of
+    their columns, in main file order, during the same pass over main_df:
+    the delta TCGplayer's bulk upload needs. output_path may be None for a
+    delta-only export. compression is 'gzip' or 'zstd'; by default it
+    follows each file's extension (.gz, .zst).
+    """
+    if delta_path is None:
+        with AtomicOutput(output_path, compression) as f:
+            write_csv(main_df, f)
+        return
+
+    positions = np.sort(main_df.index.get_indexer([change['index'] for change in changes or []]))
+    with ExitStack() as stack:
+        full = stack.enter_context(AtomicOutput(output_path, compression)) if output_path else None
+        delta = stack.enter_context(AtomicOutput(delta_path, compression))
+        for f in (full, delta):
+            if f is not None:
+                write_csv(main_df.iloc[:0], f)
+        for start in range(0, len(main_df), WRITE_CHUNK_ROWS):
+            stop = start + WRITE_CHUNK_ROWS
+            if full is not None:
+                write_csv(main_df.iloc[start:stop], full, header=False)
+            changed = positions[np.searchsorted(positions, start):np.searchsorted(positions, stop)]
+            if len(changed):
+                write_csv(main_df.iloc[changed], delta, header=False)
+
+
+def _streamed_column_dtypes(file_path: str, encoding: str, chunk_rows: int,
+                            cancel_event: Optional[threading.Event]) -> Dict[str, object]:
+    """First streaming pass: the dtype each column ends up with when all chunks are concatenated.
+
+    Only one representative value per column and chunk is kept (the first
+    non-missing one, so all-missing chunks are recognised), which is enough
+    for pandas to apply the same upcasting rules as the full concat.
+    """
+    representatives = {}
+    with csv_source(file_path) as source:
+        for chunk in pd.read_csv(source, encoding=encoding, chunksize=chunk_rows):
+            check_cancelled(cancel_event)
+            for column in chunk.columns:
+                series = chunk[column]
+                first_valid = series.first_valid_index()
+                label = first_valid if first_valid is not None else series.index[0]
+                representatives.setdefault(column, []).append(series.loc[[label]])
+    return {column: pd.concat(values).dtype for column, values in representatives.items()}
+
+
+def iter_main_chunks(file_path: str, chunk_rows: int = READ_CHUNK_ROWS,
+                     progress: Optional[ProgressCallback] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     log: LogCallback = _no_log) -> Iterator[pd.DataFrame]:
+    """Yield the main inventory in chunks, typed exactly as load_csv_data would type the whole file.
+
+    The file is read twice: once to settle the column dtypes, once to yield
+    the chunks. With chunk_rows equal to READ_CHUNK_ROWS (the default) the
+    chunks match load_csv_data's, so anything written from them is
+    byte-identical to writing the fully loaded frame. Yields nothing for a
+    file with a header but no rows.
+    """
+    _check_not_excel(file_path)
+    encoding, issues = detect_encoding(file_path)
+    for issue in issues:
+        log(str(issue))
+
+    dtypes = _streamed_column_dtypes(file_path, encoding, chunk_rows, cancel_event)
+    file_name = os.path.basename(file_path)
+    rows_read = 0
+    with csv_source(file_path) as source:
+        for chunk in pd.read_csv(source, encoding=encoding, chunksize=chunk_rows):
+            check_cancelled(cancel_event)
+            for column, dtype in dtypes.items():
+                if chunk[column].dtype != dtype:
+                    chunk[column] = chunk[column].astype(dtype)
+            rows_read += len(chunk)
+            if progress is not None:
+                progress(file_name, rows_read)
+            yield chunk
+
+
+def stream_inventory_changes(main_path: str, aggregated_quantities: Dict[CardKey, int],
+                             chunk_rows: int = READ_CHUNK_ROWS,
+                             progress: Optional[ProgressCallback] = None,
+                             cancel_event: Optional[threading.Event] = None,
+                             log: LogCallback = _no_log) -> List[Dict]:
+    """Find the changes for a main inventory without ever holding all of it in memory"""
+    changes = []
+    for chunk in iter_main_chunks(main_path, chunk_rows, progress, cancel_event, log):
+        changes.extend(find_inventory_changes(chunk, aggregated_quantities))
+    return changes
+
+
+def stream_merge_inventory(main_path: str, aggregated_quantities: Dict[CardKey, int], output_path: Optional[str],
+                           chunk_rows: int = READ_CHUNK_ROWS,
+                           progress: Optional[ProgressCallback] = None,
+                           cancel_event: Optional[threading.Event] = None,
+                           log: LogCallback = _no_log, compression: Optional[str] = None,
+                           delta_path: Optional[str] = None) -> List[Dict]:
+    """Apply the aggregate to the main inventory chunk by chunk, appending each chunk to output_path.
+
+    Memory use is bounded by chunk_rows and the aggregate, not by the size of
+    the inventory. The output is written to a temporary file next to
+    output_path and only moved into place when the run completes and at
+    least one card was updated, so a failed or empty run leaves any existing
+    file untouched. With delta_path, the updated rows alone are written there
+    too (see write_inventory); output_path may then be None. Returns the
+    applied changes.
+    """
+    changes = []
+    outputs = [AtomicOutput(path, compression) for path in (output_path, delta_path) if path]
+    with ExitStack() as stack:
+        files = [stack.enter_context(output) for output in outputs]
+        full = files[0] if output_path else None
+        delta = files[-1] if delta_path else None
+        header = True
+        for chunk in iter_main_chunks(main_path, chunk_rows, progress, cancel_event, log):
+            chunk_changes = find_inventory_changes(chunk, aggregated_quantities)
+            apply_changes(chunk, chunk_changes)
+            changes.extend(chunk_changes)
+            if full is not None:
+                write_csv(chunk, full, header=header)
+            if delta is not None:
+                write_csv(chunk.loc[[change['index'] for change in chunk_changes]], delta, header=header)
+            header = False
+        if not changes:
+            for output in outputs:
+                output.discard()
+    return changes
+
+
+def merge_inventory(main_path: str, secondary_paths: List[str], output_path: Optional[str],
+                    log: LogCallback = _no_log, workers: Optional[int] = None,
+                    cache: Optional[ParsedFileCache] = None, stream: bool = False,
+                    chunk_rows: int = READ_CHUNK_ROWS, aliases: Optional[AliasTables] = None,
+                    timer: Optional[StageTimer] = None, compression: Optional[str] = None,
+                    delta_path: Optional[str] = None, report_path: Optional[str] = None) -> List[Dict]:
+    """Run a whole merge without any UI: load, match, apply and (optionally) save.
+
+    With stream=True the main file is processed chunk_rows rows at a time
+    and never fully loaded; only exact matches are used then, since a key
+    unmatched in one chunk may still match exactly in a later one. With
+    aliases the alias and fuzzy tiers run after the exact one. Each stage
+    is recorded in timer, when given. compression and delta_path (the
+    changed rows alone) are passed on to write_inventory. Rejected
+    quantities are summarized in the log and, with report_path, all written
+    there (the main file's Add to Quantity is not checked when streaming).
+    Raises ValueError when the main file or every secondary file fails to load.
+    """
+    timer = timer if timer is not None else StageTimer()
+    rejected = {}
+    if stream:
+        aggregated_quantities = _load_aggregate(secondary_paths, workers, log, cache, timer, rejected)
+        report_rejected(log, rejected, report_path)
+        with timer.stage("stream merge") as stage:
+            rows = RowCounter()
+            if output_path or delta_path:
+                changes = stream_merge_inventory(main_path, aggregated_quantities, output_path, chunk_rows, rows,
+                                                 log=log, compression=compression, delta_path=delta_path)
+            else:
+                changes = stream_inventory_changes(main_path, aggregated_quantities, chunk_rows, rows, log=log)
+            stage.rows = rows.total
+        if not changes:
+            log("No changes to apply.")
+        else:
+            log_saved(log, len(changes), output_path, delta_path)
+        return changes
+
+    with timer.stage("load main") as stage:
+        try:
+            main_df = load_csv_data(main_path, log=log)
+        except Exception as e:
+            raise ValueError(f"Failed to load main inventory file: {str(e)}")
+        stage.rows = len(main_df)
+        if MAIN_ADD_QUANTITY in main_df.columns:
+            _, rejected[main_path] = parse_quantities(main_df[MAIN_ADD_QUANTITY], main_path, MAIN_ADD_QUANTITY,
+                                                      allow_negative=True)
+
+    aggregated_quantities = _load_aggregate(secondary_paths, workers, log, cache, timer, rejected)
+    report_rejected(log, rejected, report_path)
+
+    with timer.stage("match", len(main_df)):
+        changes = find_inventory_changes(main_df, aggregated_quantities, aliases)
+    if not changes:
+        log("No changes to apply.")
+        return changes
+    if describe_match_tiers(changes):
+        log(f"Matched {len(changes)} cards{describe_match_tiers(changes)}")
+
+    with timer.stage("apply", len(changes)):
+        updated_count = apply_changes(main_df, changes)
+    if output_path or delta_path:
+        with timer.stage("write", len(main_df) if output_path else len(changes)):
+            write_inventory(main_df, output_path, compression, delta_path, changes)
+    log_saved(log, updated_count, output_path, delta_path)
+    return changes
+
+
+class StoreResult(NamedTuple):
+    """What a fan-out merge did to one main inventory"""
+    main_path: str
+    output_path: Optional[str]
+    delta_path: Optional[str]
+    rows: int = 0
+    updated: int = 0
+    unmatched: int = 0  # secondary card keys that match no row of this store
+    unmatched_quantity: int = 0
+    match_note: str = ""  # describe_match_tiers() of the changes
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def output_file_name(main_path: str) -> str:
+    """Default name to save main_path's update as: its own name, but .zip (never written) becomes .csv"""
+    name = os.path.basename(main_path)
+    base, extension = os.path.splitext(name)
+    if extension.lower() != '.zip':
+        return name
+    return base if base.lower().endswith('.csv') else f"{base}.csv"
+
+
+def store_output_paths(main_paths: List[str], directory: Optional[str]) -> List[Optional[str]]:
+    """Where each store's file goes in directory: named after its main file (see output_file_name), or None.
+
+    Main files with the same name (store1/inventory.csv, store2/inventory.csv)
+    get their folder's name in front (store1-inventory.csv), or their
+    position when the folders share a name too. Raises ValueError when an
+    output would overwrite its own main file.
+    """
+    if not directory:
+        return [None] * len(main_paths)
+    names = [output_file_name(main_path) for main_path in main_paths]
+    for prefix in (lambda position: os.path.basename(os.path.dirname(os.path.abspath(main_paths[position]))),
+                   lambda position: f"store{position + 1}"):
+        counts = Counter(os.path.normcase(name) for name in names)
+        names = [f"{prefix(position)}-{output_file_name(main_paths[position])}"
+                 if counts[os.path.normcase(name)] > 1 else name
+                 for position, name in enumerate(names)]
+    output_paths = [os.path.join(directory, name) for name in names]
+    for main_path, output_path in zip(main_paths, output_paths):
+        if os.path.normcase(os.path.abspath(main_path)) == os.path.normcase(os.path.abspath(output_path)):
+            raise ValueError(f"{output_path} would overwrite its main inventory; choose another folder")
+    return output_paths
+
+
+def merge_store(main_path: str, aggregated_quantities: Dict[CardKey, int], output_path: Optional[str] = None,
+                delta_path: Optional[str] = None, aliases: Optional[AliasTables] = None,
+                compression: Optional[str] = None) -> Tuple[StoreResult, List[str]]:
+    """Load one main inventory, match the aggregate onto it and write its outputs.
+
+    Returns the result and the messages logged on the way. Failures end up
+    in the result's error instead of being raised, so one bad store does not
+    stop the others. As with merge_inventory, nothing is written when no
+    card changes.
+    """
+    messages = []
+    start = time.perf_counter()
+    result = StoreResult(main_path, output_path, delta_path)
+    try:
+        main_df = load_csv_data(main_path, log=messages.append)
+        unmatched_keys = []
+        changes = find_inventory_changes(main_df, aggregated_quantities, aliases, unmatched_keys)
+        updated_count = apply_changes(main_df, changes)
+        if changes and (output_path or delta_path):
+            write_inventory(main_df, output_path, compression, delta_path, changes)
+        result = result._replace(
+            rows=len(main_df), updated=updated_count, unmatched=len(unmatched_keys),
+            unmatched_quantity=sum(aggregated_quantities[card_key] for card_key in unmatched_keys),
+            match_note=describe_match_tiers(changes))
+    except Exception as e:
+        result = result._replace(error=str(e))
+    return result._replace(seconds=time.perf_counter() - start), messages
+
+
+# The aggregate (and alias tables) every fan-out pool worker matches against, sent once per worker
+_fanout_shared = None
+
+
+def _init_fanout_worker(aggregated_quantities: Dict[CardKey, int], aliases: Optional[AliasTables]) -> None:
+    global _fanout_shared
+    _fanout_shared = (aggregated_quantities, aliases)
+
+
+def _merge_store_in_worker(main_path: str, output_path: Optional[str], delta_path: Optional[str],
+                           compression: Optional[str]) -> Tuple[StoreResult, List[str]]:
+    aggregated_quantities, aliases = _fanout_shared
+    return merge_store(main_path, aggregated_quantities, output_path, delta_path, aliases, compression)
+
+
+def merge_stores(main_paths: List[str], secondary_paths: List[str],
+                 output_paths: Optional[List[Optional[str]]] = None,
+                 delta_paths: Optional[List[Optional[str]]] = None,
+                 log: LogCallback = _no_log, workers: Optional[int] = None,
+                 cache: Optional[ParsedFileCache] = None, aliases: Optional[AliasTables] = None,
+                 timer: Optional[StageTimer] = None, compression: Optional[str] = None,
+                 report_path: Optional[str] = None) -> List[StoreResult]:
+    """Merge one set of secondary files into several main inventories (one per storefront).
+
+    The secondary files are loaded and aggregated once; then every store is
+    matched and written by merge_store, in a process pool with more than one
+    worker. Each worker gets the aggregate once, when it starts, not once per
+    store. output_paths and delta_paths hold one path (or None) per main
+    file. Returns one StoreResult per main file, in the order of main_paths;
+    a store that fails has its error set and does not stop the others.
+    Raises ValueError when every secondary file fails to load.
+    """
+    timer = timer if timer is not None else StageTimer()
+    output_paths = output_paths or [None] * len(main_paths)
+    delta_paths = delta_paths or [None] * len(main_paths)
+    rejected = {}
+    aggregated_quantities = _load_aggregate(secondary_paths, workers, log, cache, timer, rejected)
+    report_rejected(log, rejected, report_path)
+
+    if workers is None:
+        workers = default_worker_count(main_paths)
+    results = {}
+    with timer.stage("stores") as stage:
+        if workers <= 1 or len(main_paths) <= 1:
+            for main_path, output_path, delta_path in zip(main_paths, output_paths, delta_paths):
+                result, messages = merge_store(main_path, aggregated_quantities, output_path, delta_path,
+                                               aliases, compression)
+                for message in messages:
+                    log(message)
+                results[main_path] = result
+                log_store_result(log, result)
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=min(workers, len(main_paths)), initializer=_init_fanout_worker,
+                                     initargs=(aggregated_quantities, aliases)) as executor:
+                futures = {executor.submit(_merge_store_in_worker, main_path, output_path, delta_path, compression):
+                           main_path
+                           for main_path, output_path, delta_path in zip(main_paths, output_paths, delta_paths)}
+                for future in as_completed(futures):
+                    main_path = futures[future]
+                    try:
+                        result, messages = future.result()
+                    except Exception as e:
+                        result, messages = StoreResult(main_path, None, None, error=str(e)), []
+                    for message in messages:
+                        log(message)
+                    results[main_path] = result
+                    log_store_result(log, result)
+        stage.rows = sum(result.rows for result in results.values())
+    return [results[main_path] for main_path in main_paths]
+
+
+def log_store_result(log: LogCallback, result: StoreResult) -> None:
+    """One line per store of a fan-out merge"""
+    # The path as given: several stores' main files can share a name
+    name = result.main_path
+    if result.error is not None:
+        log(f"{name}: failed: {result.error}")
+        return
+    log(f"{name}: {result.updated:,} cards updated{result.match_note}, {result.unmatched:,} cards unmatched "
+        f"({result.unmatched_quantity:,} qty), {result.seconds:.2f} s")
+    if result.updated:
+        log_saved(log, result.updated, result.output_path, result.delta_path)
+
+
+def log_saved(log: LogCallback, updated_count: int, output_path: Optional[str], delta_path: Optional[str]) -> None:
+    """Report where a save wrote its full inventory and/or its changed rows"""
+    if output_path:
+        log(f"Saved: {updated_count} cards updated to {output_path}")
+    if delta_path:
+        log(f"Saved changed rows: {updated_count} rows to {delta_path}")
+
+
+def rejects_file_name(output_path: str) -> str:
+    """Where the rejected quantities report goes next to output_path: updated.csv.gz -> updated-rejected.csv"""
+    root, extension = os.path.splitext(output_path)
+    if extension.lower() in COMPRESSION_EXTENSIONS:
+        root, extension = os.path.splitext(root)
+    return f"{root}{REJECTS_SUFFIX}{extension or '.csv'}"
+
+
+def write_rejected_report(rejected: List[RejectedQuantity], report_path: str) -> None:
+    """Write every rejected quantity (file, line, column, raw value, reason) to a CSV"""
+    with AtomicOutput(report_path) as f:
+        write_csv(pd.DataFrame(rejected, columns=list(REJECTS_COLUMNS)), f)
+
+
+def report_rejected(log: LogCallback, rejected_by_file: Dict[str, List[RejectedQuantity]],
+                    report_path: Optional[str] = None) -> None:
+    """Summarize rejected quantities in the log and, with report_path, write them all there"""
+    rejected = [reject for rejects in rejected_by_file.values() for reject in rejects]
+    if not rejected:
+        return
+    if report_path:
+        write_rejected_report(rejected, report_path)
+    reasons = Counter(reject.reason for reject in rejected)
+    file_count = len({reject.file for reject in rejected})
+    log(f"Rejected {len(rejected):,} quantities in {file_count} file{'s' if file_count != 1 else ''}, counted as 0 "
+        f"({', '.join(f'{count:,} {reason}' for reason, count in reasons.most_common())})")
+    for reject in rejected[:LOGGED_REJECTS]:
+        log(f"  {os.path.basename(reject.file)} line {reject.line}: {reject.column} '{reject.value}' ({reject.reason})")
+    if len(rejected) > LOGGED_REJECTS:
+        log(f"  ... and {len(rejected) - LOGGED_REJECTS:,} more")
+    if report_path:
+        log(f"Rejected quantities written to {report_path}")
+
+
+def _load_aggregate(secondary_paths: List[str], workers: Optional[int], log: LogCallback,
+                    cache: Optional[ParsedFileCache], timer: StageTimer,
+                    rejected: Optional[Dict[str, List[RejectedQuantity]]] = None) -> Dict[CardKey, int]:
+    """Timed 'load secondary' (parse and pre-aggregate each file) and 'aggregate' (sum them) stages"""
+    with timer.stage("load secondary") as stage:
+        rows = RowCounter()
+        partials = load_secondary_partials(secondary_paths, workers, log, rows, cache=cache, rejected=rejected)
+        stage.rows = rows.total
+    if not partials:
+        raise ValueError("No secondary files could be loaded.")
+    with timer.stage("aggregate", sum(len(partial) for partial in partials.values())):
+        return reduce_partials(partials.values())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - stage metrics
+Wall time, throughput and memory delta per merge stage (load, aggregate,
+match, apply, write), plus an opt-in cProfile dump of a whole run.
+"""
+
+import cProfile
+import importlib.util
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# psutil gives the resident set size everywhere; without it only Linux (/proc) is supported
+PSUTIL_AVAILABLE = importlib.util.find_spec('psutil') is not None
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None where it cannot be read"""
+    if PSUTIL_AVAILABLE:
+        import psutil
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Stage:
+    """One timed stage; set rows inside the with block to get a throughput figure"""
+
+    def __init__(self, name: str, rows: int = 0):
+        self.name = name
+        self.rows = rows
+        self.seconds = 0.0
+        self.memory_delta = None
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        if not self.rows or not self.seconds:
+            return None
+        return self.rows / self.seconds
+
+    def as_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'seconds': self.seconds,
+            'rows': self.rows,
+            'rows_per_second': self.rows_per_second,
+            'memory_delta_bytes': self.memory_delta,
+        }
+
+
+class StageTimer:
+    """Records the stages of one Preview, Save or command line merge, in the order they ran"""
+
+    def __init__(self):
+        self.stages: List[Stage] = []
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0) -> Iterator[Stage]:
+        """Time the with block as a stage named name. The stage is kept even if the block raises."""
+        stage = Stage(name, rows)
+        rss_before = current_rss()
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            rss_after = current_rss()
+            if rss_before is not None and rss_after is not None:
+                stage.memory_delta = rss_after - rss_before
+            self.stages.append(stage)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(stage.seconds for stage in self.stages)
+
+    def summary_lines(self) -> List[str]:
+        """One aligned line per stage and a total, for the log panel or the console"""
+        if not self.stages:
+            return []
+        lines = ["Timing:"]
+        for stage in self.stages:
+            rate = f"{stage.rows_per_second:>12,.0f} rows/s" if stage.rows_per_second else f"{'':>19}"
+            memory = f"{stage.memory_delta / (1024 * 1024):+9.1f} MB" if stage.memory_delta is not None else ""
+            lines.append(f"  {stage.name:<16} {stage.seconds:8.3f} s  {rate}  {memory}".rstrip())
+        lines.append(f"  {'total':<16} {self.total_seconds:8.3f} s")
+        return lines
+
+    def as_dict(self) -> Dict:
+        return {'stages': [stage.as_dict() for stage in self.stages], 'total_seconds': self.total_seconds}
+
+
+class RowCounter:
+    """Progress callback that remembers the rows read per file, passing each report on to forward"""
+
+    def __init__(self, forward: Optional[Callable[[str, int], None]] = None):
+        self.forward = forward
+        self.rows_by_file = {}
+
+    def __call__(self, file_name: str, rows_read: int) -> None:
+        self.rows_by_file[file_name] = rows_read
+        if self.forward is not None:
+            self.forward(file_name, rows_read)
+
+    @property
+    def total(self) -> int:
+        return sum(self.rows_by_file.values())
+
+
+@contextmanager
+def profile_to(output_path: Optional[str]) -> Iterator[None]:
+    """Profile the with block with cProfile and dump pstats to output_path; does nothing if it is None.
+
+    Only the calling thread is profiled, not process pool workers.
+    """
+    if not output_path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_path)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - input readers
+Opens input files by type: compressed CSVs (.gz, .zip, .zst) are decompressed
+as a stream while they are read, never to a temporary file, and Excel
+workbooks (.xlsx) are streamed out of their archive and parsed row by row,
+converting only the cells of the columns asked for.
+"""
+
+import functools
+import gzip
+import os
+import posixpath
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+from inventory_writer import ZSTD_AVAILABLE
+
+INPUT_COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.zip': 'zip', '.zst': 'zstd'}
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+
+# Rows read from a workbook between on_rows calls
+EXCEL_PROGRESS_ROWS = 50000
+# Bytes of a workbook's XML handed to the parser at a time
+XML_BLOCK_BYTES = 1024 * 1024
+
+
+def input_compression(file_path: str) -> Optional[str]:
+    """'gzip', 'zip', 'zstd' or None, from the file extension"""
+    return INPUT_COMPRESSION_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+
+def is_excel(file_path: str) -> bool:
+    return os.path.splitext(file_path)[1].lower() in EXCEL_EXTENSIONS
+
+
+def _archive_member(archive: zipfile.ZipFile, file_path: str) -> zipfile.ZipInfo:
+    """The one file in a .zip, ignoring folders and the __MACOSX metadata macOS adds"""
+    members = [info for info in archive.infolist()
+               if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+               and not os.path.basename(info.filename).startswith('.')]
+    if len(members) != 1:
+        raise ValueError(f"{os.path.basename(file_path)} must contain exactly one CSV file "
+                         f"(found {len(members)})")
+    return members[0]
+
+
+def open_input(file_path: str) -> BinaryIO:
+    """Open file_path for reading as bytes, decompressing .gz, .zip and .zst files on the fly.
+
+    Raises ValueError for a .zip that does not hold exactly one file, or a
+    .zst without zstandard installed.
+    """
+    compression = input_compression(file_path)
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if compression == 'zip':
+        archive = zipfile.ZipFile(file_path)
+        try:
+            # The archive's file stays open until the member is closed
+            return archive.open(_archive_member(archive, file_path))
+        finally:
+            archive.close()
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Reading .zst files needs the zstandard package (pip install zstandard)")
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+    return open(file_path, 'rb')
+
+
+@contextmanager
+def csv_source(file_path: str) -> Iterator[Union[str, BinaryIO]]:
+    """What to hand pd.read_csv for file_path: the path itself for a plain CSV, a decompressing stream otherwise"""
+    if input_compression(file_path) is None:
+        yield file_path
+        return
+    with open_input(file_path) as f:
+        yield f
+
+
+def _column_index(reference: str) -> int:
+    """Zero-based column of a cell reference: 'A1' -> 0, 'AB12' -> 27"""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+@functools.lru_cache(maxsize=None)
+def _local_name(tag: str) -> str:
+    # Transitional and strict workbooks use different namespaces for the same elements
+    return tag[tag.rfind('}') + 1:]
+
+
+def _excel_value(kind: str, text: Optional[str], shared_strings: List[str]):
+    """A cell's value as read_csv would have produced it: blanks are NaN, whole numbers ints"""
+    if text is None or (text == '' and kind != 'inlineStr'):
+        return np.nan
+    if kind == 's':
+        text = shared_strings[int(text)]
+    elif kind == 'n':
+        try:
+            number = float(text)
+        except ValueError:
+            return text
+        return int(number) if number.is_integer() else number
+    elif kind == 'b':
+        return text == '1'
+    return text if text != '' else np.nan
+
+
+class _SharedStrings:
+    """XMLParser target collecting sharedStrings.xml: one string per <si>, without phonetic (<rPh>) runs"""
+
+    def __init__(self):
+        self.strings = []
+        self.parts = None
+        self.collect = False
+        self.phonetic = 0
+
+    def start(self, tag, attrib) -> None:
+        name = _local_name(tag)
+        if name == 'si':
+            self.parts = []
+        elif name == 'rPh':
+            self.phonetic += 1
+        elif name == 't':
+            self.collect = not self.phonetic
+
+    def data(self, data: str) -> None:
+        if self.collect:
+            self.parts.append(data)
+
+    def end(self, tag) -> None:
+        name = _local_name(tag)
+        if name == 'si':
+            self.strings.append(''.join(self.parts))
+        elif name == 'rPh':
+            self.phonetic -= 1
+        elif name == 't':
+            self.collect = False
+
+    def close(self) -> List[str]:
+        return self.strings
+
+
+class _SheetColumns:
+    """XMLParser target collecting some columns of a worksheet, named by its first row.
+
+    Cells outside those columns are skipped as they stream past, without
+    being converted. Rows the sheet leaves out (empty ones) are filled in
+    with blanks, so a value's position still gives its sheet row.
+    """
+
+    def __init__(self, columns: List[str], shared_strings: List[str], on_rows: Optional[Callable[[int], None]]):
+        self.columns = columns
+        self.shared_strings = shared_strings
+        self.on_rows = on_rows
+        self.wanted = None  # column index -> name, once the header row has been read
+        self.values = {}
+        self.header_row = 0
+        self.row_number = 0
+        self.rows_read = 0
+        self.row = {}
+        self.next_column = 0
+        self.cell_column = 0
+        self.cell_kind = 'n'
+        self.cell_text = None
+        self.keep = False
+        self.text = None
+        self.phonetic = 0
+
+    def start(self, tag, attrib) -> None:
+        name = _local_name(tag)
+        if name == 'c':
+            reference = attrib.get('r')
+            self.cell_column = _column_index(reference) if reference else self.next_column
+            self.next_column = self.cell_column + 1
+            self.keep = self.wanted is None or self.cell_column in self.wanted
+            self.cell_kind = attrib.get('t', 'n')
+            self.cell_text = None
+        elif self.keep and not self.phonetic and (name == 'v' or name == 't'):
+            if self.cell_text is None:
+                self.cell_text = []
+            self.text = self.cell_text
+        elif name == 'row':
+            number = attrib.get('r')
+            self.row_number = int(number) if number else self.row_number + 1
+            self.next_column = 0
+            self.row = {}
+        elif name == 'rPh':
+            # Phonetic runs of an inline string, as in sharedStrings.xml
+            self.phonetic += 1
+
+    def data(self, data: str) -> None:
+        if self.text is not None:
+            self.text.append(data)
+
+    def end(self, tag) -> None:
+        name = _local_name(tag)
+        if name == 'v' or name == 't':
+            self.text = None
+        elif name == 'rPh':
+            self.phonetic -= 1
+        elif name == 'c':
+            if self.keep:
+                text = ''.join(self.cell_text) if self.cell_text is not None else None
+                self.row[self.cell_column] = _excel_value(self.cell_kind, text, self.shared_strings)
+        elif name == 'row':
+            self._end_row()
+
+    def _end_row(self) -> None:
+        if self.wanted is None:
+            header = {index: str(value).strip() for index, value in self.row.items() if value == value}
+            self.wanted = {}
+            for index in sorted(header):
+                if header[index] in self.columns and header[index] not in self.wanted.values():
+                    self.wanted[index] = header[index]
+            self.values = {name: [] for name in self.wanted.values()}
+            self.header_row = self.row_number
+            return
+        while self.header_row + self.rows_read + 1 < self.row_number:
+            self._append({})
+        self._append(self.row)
+
+    def _append(self, row: Dict[int, object]) -> None:
+        for index, name in self.wanted.items():
+            self.values[name].append(row.get(index, np.nan))
+        self.rows_read += 1
+        if self.on_rows is not None and self.rows_read % EXCEL_PROGRESS_ROWS == 0:
+            self.on_rows(self.rows_read)
+
+    def close(self) -> Dict[str, List]:
+        return self.values
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """Relationship id -> (type, target part) for a part of the package ('' for the package itself)"""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, '_rels', f"{name}.rels")
+    if rels_path not in archive.NameToInfo:
+        return {}
+    relationships = {}
+    for element in ElementTree.fromstring(archive.read(rels_path)):
+        target = element.get('Target', '')
+        target = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(folder, target))
+        relationships[element.get('Id')] = (element.get('Type', ''), target)
+    return relationships
+
+
+def _parse_part(archive: zipfile.ZipFile, part: str, target):
+    """Stream one XML part of the package through an XMLParser target and return target.close()"""
+    parser = ElementTree.XMLParser(target=target)
+    with archive.open(part) as f:
+        while True:
+            block = f.read(XML_BLOCK_BYTES)
+            if not block:
+                break
+            parser.feed(block)
+    return parser.close()
+
+
+def _first_sheet(archive: zipfile.ZipFile) -> Tuple[str, Optional[str]]:
+    """(first worksheet part, shared strings part or None) of a workbook package"""
+    workbook = next((target for kind, target in _relationships(archive, '').values()
+                     if kind.endswith('/officeDocument')), 'xl/workbook.xml')
+    relationships = _relationships(archive, workbook)
+    shared_strings = next((target for kind, target in relationships.values() if kind.endswith('/sharedStrings')),
+                          None)
+    for element in ElementTree.fromstring(archive.read(workbook)).iter():
+        if _local_name(element.tag) == 'sheet':
+            relationship = next(value for key, value in element.attrib.items() if _local_name(key) == 'id')
+            return relationships[relationship][1], shared_strings
+    raise ValueError("the workbook has no sheets")
+
+
+def read_excel_columns(file_path: str, columns: List[str], category_columns: List[str] = (),
+                       on_rows: Optional[Callable[[int], None]] = None) -> pd.DataFrame:
+    """Read the given columns from the first sheet of an .xlsx workbook; the first row is the header.
+
+    The sheet's XML is streamed out of the archive and parsed as it comes,
+    keeping only the cells of the wanted columns, so neither the sheet nor
+    the other columns are ever held in memory. Columns missing from the
+    header are left out; category_columns become categoricals. on_rows is
+    called with the rows read so far every EXCEL_PROGRESS_ROWS rows; an
+    exception it raises stops the read. Formulas give their cached results,
+    and dates come through as Excel's day numbers. Raises ValueError for a
+    file that is not a readable workbook.
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            sheet, shared_strings_part = _first_sheet(archive)
+            shared_strings = _parse_part(archive, shared_strings_part, _SharedStrings()) if shared_strings_part else []
+            values = _parse_part(archive, sheet, _SheetColumns(columns, shared_strings, on_rows))
+    except (zipfile.BadZipFile, KeyError, StopIteration, ElementTree.ParseError) as e:
+        raise ValueError(f"{os.path.basename(file_path)} is not a readable .xlsx workbook: {e}")
+
+    return pd.DataFrame({column: pd.Categorical(column_values) if column in category_columns
+                         else pd.Series(column_values, dtype=object)
+                         for column, column_values in values.items()})
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - SQLite inventory store
+Keeps a main inventory and every imported secondary file (as a batch) in one
+local SQLite database, so quantities accumulate across sessions and Preview
+or export reads one summed table instead of re-parsing every file.
+"""
+
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+import inventory_core
+from inventory_cache import file_content_hash
+from inventory_core import AliasTables, CardKey, LogCallback
+
+# Bump when the tables below change
+SCHEMA_VERSION = 3
+KEY_COLUMNS = inventory_core.KEY_FIELDS
+# The main inventory's own columns are stored as c0, c1, ... (any header is allowed in a CSV);
+# their names and dtypes are kept in meta as main_columns
+MAIN_TABLE = "main_inventory"
+# Rows per executemany call when writing a batch
+INSERT_CHUNK_ROWS = 50000
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    fingerprint TEXT NOT NULL UNIQUE,
+    imported_at TEXT NOT NULL,
+    cards INTEGER NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_quantities (
+    batch_id INTEGER NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    {', '.join(f'{column} TEXT NOT NULL' for column in KEY_COLUMNS)},
+    quantity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS batch_quantities_batch ON batch_quantities (batch_id);
+CREATE INDEX IF NOT EXISTS batch_quantities_key ON batch_quantities ({', '.join(KEY_COLUMNS)});
+CREATE TABLE IF NOT EXISTS totals (
+    {', '.join(f'{column} TEXT NOT NULL' for column in KEY_COLUMNS)},
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY ({', '.join(KEY_COLUMNS)})
+) WITHOUT ROWID;
+"""
+
+KEY_MATCH = ' AND '.join(f'{column} = ?' for column in KEY_COLUMNS)
+
+
+def _no_log(message: str) -> None:
+    pass
+
+
+class Batch(NamedTuple):
+    id: int
+    source: str
+    imported_at: str
+    cards: int
+    quantity: int
+
+
+class InventoryStore:
+    """Main inventory plus imported batches in a SQLite file.
+
+    Every batch keeps its own {card_key: qty} rows, and the totals table
+    holds their sum per card key, maintained on import and removal. A file
+    whose content was imported before is skipped, whatever its name.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            version = self._meta('schema_version')
+            if version is None:
+                self._set_meta('schema_version', str(SCHEMA_VERSION))
+            elif int(version) != SCHEMA_VERSION:
+                raise ValueError(f"{db_path} was created by a different version (schema {version})")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> 'InventoryStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _meta(self, name: str) -> Optional[str]:
+        row = self.connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name: str, value: str) -> None:
+        self.connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def set_main(self, main_path: str, log: LogCallback = _no_log) -> int:
+        """Replace the stored main inventory with main_path; returns its row count. Batches are kept.
+
+        Every row is stored under its normalized card key (indexed, like the
+        batches) next to its original values, and the column dtypes are
+        recorded so main_frame reads back what load_csv_data returned.
+        """
+        main_df = inventory_core.load_csv_data(main_path, log=log)
+        keys = inventory_core.normalize_key_columns(main_df, inventory_core.MAIN_KEY_COLUMNS)
+        value_columns = _value_columns(len(main_df.columns))
+        # Untyped columns store each value as it was bound, so mixed text and number columns survive;
+        # position is the row's index label in main_frame
+        rows = zip(itertools.count(), *(keys[field].tolist() for field in KEY_COLUMNS),
+                   *(main_df[column].astype(object).tolist() for column in main_df.columns))
+        with self.connection:
+            self.connection.execute(f"DROP TABLE IF EXISTS {MAIN_TABLE}")
+            self.connection.execute(
+                f"CREATE TABLE {MAIN_TABLE} (position INTEGER PRIMARY KEY, "
+                f"{', '.join(f'{column} TEXT NOT NULL' for column in KEY_COLUMNS)}, {', '.join(value_columns)})")
+            insert = (f"INSERT INTO {MAIN_TABLE} (position, {', '.join(KEY_COLUMNS + tuple(value_columns))}) "
+                      f"VALUES ({', '.join('?' * (1 + len(KEY_COLUMNS) + len(value_columns)))})")
+            while True:
+                chunk = list(itertools.islice(rows, INSERT_CHUNK_ROWS))
+                if not chunk:
+                    break
+                self.connection.executemany(insert, chunk)
+            self.connection.execute(f"CREATE INDEX {MAIN_TABLE}_key ON {MAIN_TABLE} ({', '.join(KEY_COLUMNS)})")
+            self._set_meta('main_columns', json.dumps([[column, str(dtype)] for column, dtype in main_df.dtypes.items()]))
+            self._set_meta('main_path', os.path.abspath(main_path))
+            self._set_meta('main_imported_at', _now())
+        log(f"Stored main inventory {os.path.basename(main_path)}: {len(main_df):,} rows")
+        return len(main_df)
+
+    def has_main(self) -> bool:
+        return self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (MAIN_TABLE,)).fetchone() is not None
+
+    def main_frame(self) -> pd.DataFrame:
+        """The stored main inventory, in its original row order and with its original dtypes"""
+        main_df, _ = self._read_main(f"SELECT {{columns}} FROM {MAIN_TABLE} ORDER BY position")
+        return main_df
+
+    def _read_main(self, query: str, parameters: Tuple = (), leading: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(main rows, their first `leading` selected columns) for a query whose {columns} is the value columns"""
+        if not self.has_main():
+            raise ValueError(f"{self.db_path} has no main inventory yet; store one first.")
+        columns = json.loads(self._meta('main_columns'))
+        value_columns = ', '.join(f'{MAIN_TABLE}.{column}' for column in _value_columns(len(columns)))
+        selected = pd.read_sql_query(query.format(columns=value_columns), self.connection, params=parameters)
+        main_df = selected.iloc[:, leading:]
+        # SQLite hands bools back as 1/0, and blank-only text columns as None
+        main_df.columns = [name for name, _ in columns]
+        return main_df.astype({name: dtype for name, dtype in columns}), selected.iloc[:, :leading]
+
+    def import_batch(self, source: str, fingerprint: str, partial: Dict[CardKey, int]) -> Optional[int]:
+        """Record one file's partial as a batch and add it to the totals, in one transaction.
+
+        Returns the new batch id, or None if a batch with this fingerprint
+        (the same file content) was imported before.
+        """
+        rows = [card_key + (int(quantity),) for card_key, quantity in partial.items()]
+        with self.connection:
+            try:
+                cursor = self.connection.execute(
+                    "INSERT INTO batches (source, fingerprint, imported_at, cards, quantity) VALUES (?, ?, ?, ?, ?)",
+                    (source, fingerprint, _now(), len(rows), sum(row[-1] for row in rows)))
+            except sqlite3.IntegrityError:
+                return None
+            batch_id = cursor.lastrowid
+            for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+                chunk = rows[start:start + INSERT_CHUNK_ROWS]
+                self.connection.executemany(
+                    f"INSERT INTO batch_quantities (batch_id, {', '.join(KEY_COLUMNS)}, quantity) "
+                    f"VALUES ({batch_id}, {', '.join('?' * len(KEY_COLUMNS))}, ?)", chunk)
+                self._add_to_totals(chunk, 1)
+        return batch_id
+
+    def _add_to_totals(self, rows: List[Tuple], sign: int) -> None:
+        # INSERT OR IGNORE + UPDATE rather than ON CONFLICT, which older SQLite builds lack
+        self.connection.executemany(
+            f"INSERT OR IGNORE INTO totals ({', '.join(KEY_COLUMNS)}, quantity) "
+            f"VALUES ({', '.join('?' * len(KEY_COLUMNS))}, 0)", [row[:-1] for row in rows])
+        self.connection.executemany(f"UPDATE totals SET quantity = quantity + ? WHERE {KEY_MATCH}",
+                                    [(sign * row[-1],) + tuple(row[:-1]) for row in rows])
+
+    def import_files(self, file_paths: List[str], workers: Optional[int] = None,
+                     log: LogCallback = _no_log, cache=None) -> List[int]:
+        """Parse secondary files and import each as a batch; returns the new batch ids"""
+        fingerprints = {}
+        to_parse = []
+        for file_path in file_paths:
+            fingerprint = file_content_hash(file_path)
+            imported = self.connection.execute(
+                "SELECT imported_at FROM batches WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if imported:
+                log(f"Skipped {os.path.basename(file_path)}: already imported on {imported[0]}")
+            elif fingerprint in fingerprints.values():
+                log(f"Skipped {os.path.basename(file_path)}: same content as another file in this import")
+            else:
+                fingerprints[file_path] = fingerprint
+                to_parse.append(file_path)
+
+        batch_ids = []
+        rejected = {}
+        partials = inventory_core.load_secondary_partials(to_parse, workers, log, cache=cache, rejected=rejected)
+        inventory_core.report_rejected(log, rejected)
+        for file_path, partial in partials.items():
+            batch_id = self.import_batch(os.path.abspath(file_path), fingerprints[file_path], partial)
+            if batch_id is not None:
+                batch_ids.append(batch_id)
+                log(f"Imported {os.path.basename(file_path)} as batch {batch_id}: {len(partial):,} cards")
+        return batch_ids
+
+    def remove_batch(self, batch_id: int) -> bool:
+        """Take a batch back out of the totals and delete it; False if there is no such batch"""
+        with self.connection:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(KEY_COLUMNS)}, quantity FROM batch_quantities WHERE batch_id = ?",
+                (batch_id,)).fetchall()
+            if self.connection.execute("DELETE FROM batches WHERE id = ?", (batch_id,)).rowcount == 0:
+                return False
+            self._add_to_totals(rows, -1)
+            self.connection.execute("DELETE FROM totals WHERE quantity <= 0")
+        return True
+
+    def batches(self, since: Optional[str] = None) -> List[Batch]:
+        """Imported batches, oldest first; since is an ISO date or timestamp"""
+        query = "SELECT id, source, imported_at, cards, quantity FROM batches"
+        parameters = ()
+        if since:
+            query += " WHERE imported_at >= ?"
+            parameters = (since,)
+        return [Batch(*row) for row in self.connection.execute(query + " ORDER BY id", parameters)]
+
+    def aggregated_quantities(self, since: Optional[str] = None) -> Dict[CardKey, int]:
+        """Summed quantity per card key over every batch, or over those imported since the given date"""
+        query, parameters = _aggregate_query(since)
+        rows = self.connection.execute(f"SELECT {', '.join(KEY_COLUMNS)}, quantity FROM ({query})", parameters)
+        return {tuple(row[:-1]): row[-1] for row in rows if row[-1] > 0}
+
+    def matched_rows(self, since: Optional[str] = None) -> Tuple[pd.DataFrame, List[int]]:
+        """The main rows a stored card key matches exactly, indexed as in main_frame, and their new quantities.
+
+        The summed batches are joined with the main table on its indexed key
+        columns, so only the matched rows are read.
+        """
+        query, parameters = _aggregate_query(since)
+        matched, selected = self._read_main(
+            f"SELECT {MAIN_TABLE}.position, totals.quantity, {{columns}} FROM ({query}) totals JOIN {MAIN_TABLE} ON "
+            + ' AND '.join(f'{MAIN_TABLE}.{column} = totals.{column}' for column in KEY_COLUMNS)
+            + f" WHERE totals.quantity > 0 ORDER BY {MAIN_TABLE}.position", parameters, leading=2)
+        matched.index = pd.Index(selected.iloc[:, 0].tolist())
+        return matched, selected.iloc[:, 1].tolist()
+
+    def changes(self, aliases: Optional[AliasTables] = None, since: Optional[str] = None,
+                main_df: Optional[pd.DataFrame] = None) -> List[Dict]:
+        """The change list for the stored main inventory and the stored batches.
+
+        Exact matching is the SQL join of matched_rows. The alias and fuzzy
+        tiers compare against every main key, so with aliases the main
+        inventory is loaded (unless main_df is given) and matched in pandas.
+        """
+        if aliases is None:
+            rows, quantities = self.matched_rows(since)
+            return inventory_core.changes_for_rows(rows, quantities)
+        if main_df is None:
+            main_df = self.main_frame()
+        return inventory_core.find_inventory_changes(main_df, self.aggregated_quantities(since), aliases)
+
+    def export(self, output_path: Optional[str] = None, delta_path: Optional[str] = None,
+               aliases: Optional[AliasTables] = None, since: Optional[str] = None,
+               compression: Optional[str] = None) -> List[Dict]:
+        """Write the updated full inventory and/or just the changed rows; returns the changes.
+
+        Without output_path and aliases (a preview or delta-only export) only
+        the matched rows are read from the store.
+        """
+        if output_path or aliases is not None:
+            main_df = self.main_frame()
+            changes = self.changes(aliases, since, main_df)
+        else:
+            main_df, quantities = self.matched_rows(since)
+            changes = inventory_core.changes_for_rows(main_df, quantities)
+        inventory_core.apply_changes(main_df, changes)
+        if output_path or delta_path:
+            inventory_core.write_inventory(main_df, output_path, compression, delta_path, changes)
+        return changes
+
+
+def _aggregate_query(since: Optional[str]) -> Tuple[str, Tuple]:
+    """(query, parameters) for the summed quantity per card key, over every batch or those imported since"""
+    if not since:
+        return "SELECT * FROM totals", ()
+    return (f"SELECT {', '.join(KEY_COLUMNS)}, SUM(q.quantity) AS quantity FROM batch_quantities q "
+            f"JOIN batches b ON b.id = q.batch_id WHERE b.imported_at >= ? GROUP BY {', '.join(KEY_COLUMNS)}",
+            (since,))
+
+
+def _value_columns(count: int) -> List[str]:
+    return [f'c{position}' for position in range(count)]
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec='seconds')
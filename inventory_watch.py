@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - watch folder
+Keeps the main inventory and its key index in memory and folds in secondary
+files as scanners drop them into a folder, writing the updated inventory once
+no new file has arrived for a few seconds. A journal of processed files (with
+their quantities) makes every file count exactly once, also across restarts.
+"""
+
+import fnmatch
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import inventory_core
+from inventory_core import AliasTables, CardKey, LogCallback
+
+DEFAULT_PATTERN = "*.csv"
+DEFAULT_POLL_SECONDS = 2.0
+# Write once no new file has arrived for this long, but at least every MAX_WAIT while files keep coming
+DEFAULT_DEBOUNCE_SECONDS = 10.0
+DEFAULT_MAX_WAIT_SECONDS = 60.0
+JOURNAL_NAME = ".tcg-inventory-journal.jsonl"
+
+Stamp = Tuple[int, int]
+
+
+def _no_log(message: str) -> None:
+    pass
+
+
+def _same_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class Journal:
+    """Append-only JSON lines record of processed files: path, (size, mtime) stamp and partial quantities.
+
+    Each line is flushed and fsynced before the file's quantities are
+    counted, so after a crash the journal is what has been counted. A later
+    line for the same path (the file was rewritten) replaces the earlier one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self, log: LogCallback = _no_log) -> Dict[str, Tuple[Stamp, Dict[CardKey, int]]]:
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line)
+                    partial = {tuple(row[:-1]): int(row[-1]) for row in entry['quantities']}
+                    entries[entry['file']] = (tuple(entry['stamp']), partial)
+                except (ValueError, KeyError, TypeError, IndexError):
+                    # Left torn by a crash while appending; that file was not counted yet
+                    log(f"Warning: skipping unreadable journal line {line_number} in {self.path}")
+        return entries
+
+    def append(self, file_path: str, stamp: Stamp, partial: Dict[CardKey, int]) -> None:
+        entry = {'file': file_path, 'stamp': list(stamp),
+                 'quantities': [list(card_key) + [int(quantity)] for card_key, quantity in partial.items()]}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+        with open(self.path, 'a+b') as f:
+            # Start on a fresh line if a crash left the last one torn
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class FolderWatch:
+    """Merge every secondary file that appears in folder into the main inventory, continuously.
+
+    A file is picked up once its size and modification time are the same on
+    two polls in a row (the scanner has finished writing it). Only that file
+    is parsed and folded into the resident IncrementalMerge, so each new file
+    costs about as much as the file itself, not the inventory. A file that is
+    rewritten replaces its earlier quantities; a file that is deleted after
+    it was processed stays counted. When the main file changes on disk it is
+    reloaded and every processed file is folded into it again.
+    """
+
+    def __init__(self, main_path: str, folder: str, output_path: Optional[str] = None,
+                 delta_path: Optional[str] = None, journal_path: Optional[str] = None,
+                 aliases: Optional[AliasTables] = None, pattern: str = DEFAULT_PATTERN,
+                 debounce: float = DEFAULT_DEBOUNCE_SECONDS, max_wait: float = DEFAULT_MAX_WAIT_SECONDS,
+                 workers: Optional[int] = None, compression: Optional[str] = None, log: LogCallback = _no_log):
+        if not output_path and not delta_path:
+            raise ValueError("Nothing to write: give an output path, a delta path or both.")
+        if not os.path.isdir(folder):
+            raise ValueError(f"Watch folder does not exist: {folder}")
+        for path in (output_path, delta_path):
+            # Each write would look like an outside edit of the main file and trigger another reload and write
+            if path and _same_path(path) == _same_path(main_path):
+                raise ValueError(f"{path} would overwrite the main inventory; write the output somewhere else")
+        self.main_path = main_path
+        self.folder = folder
+        self.output_path = output_path
+        self.delta_path = delta_path
+        self.journal = Journal(journal_path or os.path.join(folder, JOURNAL_NAME))
+        self.aliases = aliases
+        self.pattern = pattern.lower()
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.workers = workers
+        self.compression = compression
+        self.log = log
+
+        # Never treat our own files as scanner exports
+        self.ignored = {_same_path(path) for path in (main_path, output_path, delta_path, self.journal.path) if path}
+        self.state = None
+        self.main_stamp = None
+        self.original_quantities = None
+        self.applied = set()  # main index labels whose quantity currently holds an applied change
+        self.partials = {}  # path -> (stamp, partial) for every processed file, to refold after a main reload
+        self.pending = {}  # path -> stamp seen on the last poll, for files not processed yet
+        self.failed = {}  # path -> stamp that failed to load; retried once the file changes
+        self.first_change = None
+        self.last_change = None
+
+    def start(self) -> None:
+        """Load and index the main inventory, then fold in everything the journal has recorded"""
+        if not self.partials:
+            self.partials = self.journal.read(self.log)
+        self.main_stamp = inventory_core.file_stamp(self.main_path)
+        main_df = inventory_core.load_csv_data(self.main_path, log=self.log)
+        self.state = inventory_core.IncrementalMerge(main_df, self.main_path, self.main_stamp, self.aliases)
+        if inventory_core.MAIN_ADD_QUANTITY in main_df.columns:
+            self.original_quantities = main_df[inventory_core.MAIN_ADD_QUANTITY].copy()
+        else:
+            self.original_quantities = None
+        self.applied = set()
+        for file_path, (stamp, partial) in self.partials.items():
+            self.state.add_file(file_path, partial, stamp)
+        self.log(f"Watching {self.folder}: {len(main_df):,} main rows, {len(self.partials)} files already counted")
+        if self.partials:
+            # Brings the output up to date after a restart, e.g. if the last run stopped before writing
+            self._mark_changed(time.monotonic() - self.max_wait)
+
+    def _mark_changed(self, now: float) -> None:
+        if self.first_change is None:
+            self.first_change = now
+        self.last_change = now
+
+    def _scan(self) -> Dict[str, Stamp]:
+        found = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not fnmatch.fnmatch(entry.name.lower(), self.pattern):
+                    continue
+                path = os.path.abspath(entry.path)
+                if _same_path(path) in self.ignored:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                found[path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def poll(self) -> int:
+        """Fold in the files that are new or rewritten and have stopped changing; returns how many"""
+        try:
+            main_stamp = inventory_core.file_stamp(self.main_path)
+        except OSError:
+            main_stamp = self.main_stamp
+        if main_stamp != self.main_stamp:
+            self.log(f"{os.path.basename(self.main_path)} changed on disk; reloading it")
+            self.start()
+            self._mark_changed(time.monotonic())
+
+        found = self._scan()
+        ready = []
+        waiting = {}
+        for path, stamp in found.items():
+            processed = self.partials.get(path)
+            if (processed is not None and processed[0] == stamp) or self.failed.get(path) == stamp:
+                continue
+            if self.pending.get(path) == stamp:
+                ready.append(path)
+            else:
+                waiting[path] = stamp
+        self.pending = waiting
+        if not ready:
+            return 0
+
+        rejected = {}
+        loaded = inventory_core.load_secondary_partials(ready, self.workers, self.log, rejected=rejected)
+        inventory_core.report_rejected(self.log, rejected)
+        for path in ready:
+            stamp = found[path]
+            if path not in loaded:
+                self.failed[path] = stamp
+                continue
+            partial = loaded[path]
+            rewritten = path in self.partials
+            # Journal first: once it is on disk the file counts, even if we crash before writing the output
+            self.journal.append(path, stamp, partial)
+            self.partials[path] = (stamp, partial)
+            diff = self.state.add_file(path, partial, stamp)
+            self.log(f"{'Updated' if rewritten else 'Added'} {os.path.basename(path)}: {len(partial):,} cards "
+                     f"({len(diff.added)} new, {len(diff.updated)} changed, {len(diff.removed)} dropped rows)")
+        self._mark_changed(time.monotonic())
+        return len(ready)
+
+    def flush(self, force: bool = False) -> bool:
+        """Write the output if something changed and the debounce period is over (or force); True if written"""
+        if self.last_change is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self.last_change < self.debounce and now - self.first_change < self.max_wait:
+            return False
+
+        changes = self.state.changes()
+        main_df = self.state.main_df
+        current = {change['index'] for change in changes}
+        # Rows whose change went away (a rewritten file) get their original quantity back
+        stale = [label for label in self.applied if label not in current]
+        if stale and self.original_quantities is not None:
+            main_df.loc[stale, inventory_core.MAIN_ADD_QUANTITY] = self.original_quantities.loc[stale]
+        updated_count = inventory_core.apply_changes(main_df, changes)
+        self.applied = current
+        inventory_core.write_inventory(main_df, self.output_path, self.compression, self.delta_path, changes)
+        inventory_core.log_saved(self.log, updated_count, self.output_path, self.delta_path)
+        self.first_change = None
+        self.last_change = None
+        return True
+
+    def run(self, stop_event: Optional[threading.Event] = None, poll_seconds: float = DEFAULT_POLL_SECONDS) -> None:
+        """Poll and write until stop_event is set (or Ctrl+C), then write anything still pending"""
+        stop_event = stop_event if stop_event is not None else threading.Event()
+        self.start()
+        try:
+            while not stop_event.is_set():
+                self.poll()
+                self.flush()
+                stop_event.wait(poll_seconds)
+        finally:
+            if self.state is not None:
+                self.flush(force=True)
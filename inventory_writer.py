@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - CSV writer
+Writes inventories byte-for-byte as DataFrame.to_csv(index=False) would, but
+formats whole columns at a time, and never leaves a half-written file behind:
+output goes to a temporary file next to the target, which is fsynced and then
+renamed over it. Optional gzip or zstd (with the zstandard package) output.
+"""
+
+import gzip
+import importlib.util
+import io
+import os
+from typing import List, Optional, TextIO
+
+import numpy as np
+import pandas as pd
+
+ZSTD_AVAILABLE = importlib.util.find_spec('zstandard') is not None
+
+# Rows formatted and written per batch
+WRITE_CHUNK_ROWS = 100000
+
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+COMPRESSIONS = ('gzip', 'zstd')
+GZIP_LEVEL = 6
+
+# Fields containing any of these are quoted, as the csv module does for QUOTE_MINIMAL
+# with to_csv's line terminator
+QUOTE_CHARS = (',', '"') + tuple(os.linesep)
+
+
+def output_compression(output_path: str, compression: Optional[str] = None) -> Optional[str]:
+    """'gzip', 'zstd' or None; taken from the file extension unless compression is given.
+
+    Raises ValueError for an unknown compression, or zstd without zstandard installed.
+    """
+    if compression is None:
+        compression = COMPRESSION_EXTENSIONS.get(os.path.splitext(output_path)[1].lower())
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}' (use one of: {', '.join(COMPRESSIONS)})")
+    if compression == 'zstd' and not ZSTD_AVAILABLE:
+        raise ValueError("zstd output needs the zstandard package (pip install zstandard)")
+    return compression
+
+
+class AtomicOutput:
+    """Text file that replaces output_path only once it has been written completely.
+
+        with AtomicOutput(path) as f:
+            f.write(...)
+
+    The data goes to a temporary file in the same directory; a clean exit
+    flushes, fsyncs and renames it over output_path, an exception (or a call
+    to discard()) deletes it and leaves any existing file untouched.
+    """
+
+    def __init__(self, output_path: str, compression: Optional[str] = None):
+        self.output_path = output_path
+        self.compression = output_compression(output_path, compression)
+        self.temp_path = f"{output_path}.{os.getpid()}.tmp"
+        self.discarded = False
+        self._raw = None
+        self.file = None
+
+    def __enter__(self) -> TextIO:
+        self._raw = open(self.temp_path, 'wb')
+        if self.compression == 'gzip':
+            # No file name or timestamp in the header, so equal inventories give equal files
+            binary = gzip.GzipFile(filename='', mode='wb', fileobj=self._raw, compresslevel=GZIP_LEVEL, mtime=0)
+        elif self.compression == 'zstd':
+            import zstandard
+            binary = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            binary = self._raw
+        # newline='' so line endings are exactly what the writer chooses, as with to_csv
+        self.file = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+        return self.file
+
+    def discard(self) -> None:
+        """Leave output_path as it is when the block exits"""
+        self.discarded = True
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        binary = self.file.detach()
+        try:
+            if exc_type is None and not self.discarded:
+                if binary is not self._raw:
+                    binary.close()  # writes the compressed stream's trailer; the raw file stays open
+                self._raw.flush()
+                os.fsync(self._raw.fileno())
+                self._raw.close()
+                os.replace(self.temp_path, self.output_path)
+        finally:
+            if binary is not self._raw and not binary.closed:
+                try:
+                    binary.close()
+                except (OSError, ValueError):
+                    pass
+            self._raw.close()
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+
+
+def _quote_fields(values: List[str]) -> List[str]:
+    joined = ''.join(values)
+    if not any(char in joined for char in QUOTE_CHARS):
+        return values
+    return ['"' + value.replace('"', '""') + '"' if any(char in value for char in QUOTE_CHARS) else value
+            for value in values]
+
+
+def _format_column(series: pd.Series) -> Optional[List[str]]:
+    """Each value of series as to_csv writes it, or None for dtypes left to pandas"""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype):
+        if dtype.kind in 'iub':
+            return list(map(str, series.to_numpy().tolist()))
+        if dtype == np.float64:
+            return [repr(value) if value == value else '' for value in series.to_numpy().tolist()]
+        if dtype.kind != 'O':
+            return None
+    elif not isinstance(dtype, pd.StringDtype) and dtype.kind not in 'iub':
+        return None
+    values = series.to_numpy(dtype=object, na_value='').tolist()
+    if not isinstance(dtype, pd.StringDtype):
+        values = [value if type(value) is str else str(value) for value in values]
+    return _quote_fields(values)
+
+
+def _format_rows(df: pd.DataFrame) -> Optional[str]:
+    """df's rows as CSV text ending in a line break, or None if a column needs pandas"""
+    columns = []
+    for column in df.columns:
+        formatted = _format_column(df[column])
+        if formatted is None:
+            return None
+        columns.append(formatted)
+    return os.linesep.join(map(','.join, zip(*columns))) + os.linesep
+
+
+def write_csv(df: pd.DataFrame, f: TextIO, header: bool = True, chunk_rows: int = WRITE_CHUNK_ROWS) -> None:
+    """Write df to an open text file exactly like df.to_csv(f, index=False, header=header).
+
+    Columns are formatted a chunk at a time in plain Python, which is several
+    times faster than to_csv's general formatter; frames with a single
+    column, or with dtypes such as dates and categories, go through to_csv.
+    """
+    if len(df.columns) < 2:
+        df.to_csv(f, index=False, header=header)
+        return
+    if header:
+        f.write(','.join(_quote_fields([str(column) for column in df.columns])) + os.linesep)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        text = _format_rows(chunk)
+        if text is None:
+            chunk.to_csv(f, index=False, header=False)
+        else:
+            f.write(text)
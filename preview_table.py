@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+TCGPlayer Inventory Updater - preview table
+A ttk.Treeview that only ever holds the rows currently on screen, so a
+preview with hundreds of thousands of changes renders as fast as one with ten.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict, List
+
+ALL = "All"
+
+# (change dict key, heading, width, anchor)
+COLUMNS = (
+    ('product_name', "Product Name", 220, tk.W),
+    ('set_name', "Set", 140, tk.W),
+    ('condition', "Condition", 110, tk.W),
+    ('number', "Number", 60, tk.E),
+    ('current_add_quantity', "Current", 70, tk.E),
+    ('new_add_quantity', "New", 70, tk.E),
+    ('change', "Change", 70, tk.E),
+    ('match', "Match", 60, tk.W),
+)
+NUMERIC_COLUMNS = ('current_add_quantity', 'new_add_quantity', 'change')
+
+
+class PreviewTable(ttk.Frame):
+    """Virtualized change list with sorting, Set/Condition filters and a summary line.
+
+    The Treeview is given exactly `height` items; scrolling moves a window
+    over the filtered, sorted list of changes and rewrites those items.
+    """
+
+    def __init__(self, parent, height: int = 10, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.height = height
+        self.changes = []
+        self.view = []  # indices into self.changes after filtering and sorting
+        self.offset = 0
+        self.sort_key = None
+        self.sort_descending = False
+
+        filter_frame = ttk.Frame(self)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+
+        ttk.Label(filter_frame, text="Set:").grid(row=0, column=0, padx=(0, 5))
+        self.set_filter_var = tk.StringVar(value=ALL)
+        self.set_filter = ttk.Combobox(filter_frame, textvariable=self.set_filter_var, state='readonly', width=25)
+        self.set_filter.grid(row=0, column=1, padx=(0, 15))
+        self.set_filter.bind('<<ComboboxSelected>>', lambda event: self.refresh_view())
+
+        ttk.Label(filter_frame, text="Condition:").grid(row=0, column=2, padx=(0, 5))
+        self.condition_filter_var = tk.StringVar(value=ALL)
+        self.condition_filter = ttk.Combobox(filter_frame, textvariable=self.condition_filter_var, state='readonly', width=18)
+        self.condition_filter.grid(row=0, column=3)
+        self.condition_filter.bind('<<ComboboxSelected>>', lambda event: self.refresh_view())
+
+        self.tree = ttk.Treeview(self, columns=[key for key, _, _, _ in COLUMNS], show='headings',
+                                 height=height, selectmode='browse')
+        for key, heading, width, anchor in COLUMNS:
+            self.tree.heading(key, text=heading, command=lambda key=key: self.sort_by(key))
+            self.tree.column(key, width=width, anchor=anchor, stretch=key == 'product_name')
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+
+        self.summary_var = tk.StringVar(value="No preview yet")
+        ttk.Label(self, textvariable=self.summary_var, font=('Arial', 9)).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        # Scroll the virtual window, not the (always full) Treeview
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_mouse_wheel)
+        self.tree.bind('<Up>', lambda event: self.scroll_to(self.offset - 1) or 'break')
+        self.tree.bind('<Down>', lambda event: self.scroll_to(self.offset + 1) or 'break')
+        self.tree.bind('<Prior>', lambda event: self.scroll_to(self.offset - self.height) or 'break')
+        self.tree.bind('<Next>', lambda event: self.scroll_to(self.offset + self.height) or 'break')
+
+        self.item_ids = [self.tree.insert('', tk.END, values=()) for _ in range(height)]
+
+    def set_changes(self, changes: List[Dict]):
+        """Show a new change list, keeping the current sort and any filter that still applies"""
+        self.changes = changes
+        sets = sorted({str(change['set_name']) for change in changes})
+        conditions = sorted({str(change['condition']) for change in changes})
+        self.set_filter['values'] = [ALL] + sets
+        self.condition_filter['values'] = [ALL] + conditions
+        if self.set_filter_var.get() not in sets:
+            self.set_filter_var.set(ALL)
+        if self.condition_filter_var.get() not in conditions:
+            self.condition_filter_var.set(ALL)
+        self.refresh_view()
+
+    def clear(self):
+        self.set_changes([])
+        self.summary_var.set("No preview yet")
+
+    def sort_by(self, key: str):
+        """Sort by a column; clicking the same heading again reverses the order"""
+        if self.sort_key == key:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_key = key
+            self.sort_descending = key in NUMERIC_COLUMNS
+        for column_key, heading, _, _ in COLUMNS:
+            arrow = (" ▼" if self.sort_descending else " ▲") if column_key == key else ""
+            self.tree.heading(column_key, text=heading + arrow)
+        self.refresh_view()
+
+    def refresh_view(self):
+        """Recompute the filtered, sorted index list and redraw from the top"""
+        set_filter = self.set_filter_var.get()
+        condition_filter = self.condition_filter_var.get()
+        changes = self.changes
+        view = [i for i, change in enumerate(changes)
+                if (set_filter == ALL or str(change['set_name']) == set_filter)
+                and (condition_filter == ALL or str(change['condition']) == condition_filter)]
+
+        if self.sort_key is not None:
+            key = self.sort_key
+            if key in NUMERIC_COLUMNS:
+                view.sort(key=lambda i: changes[i][key], reverse=self.sort_descending)
+            else:
+                view.sort(key=lambda i: str(changes[i][key]).lower(), reverse=self.sort_descending)
+        self.view = view
+
+        total_cards = sum(changes[i]['new_add_quantity'] for i in view)
+        net_change = sum(changes[i]['change'] for i in view)
+        if len(view) == len(changes):
+            self.summary_var.set(f"{len(changes):,} cards will be updated · {total_cards:,} to add · net change {net_change:+,}")
+        else:
+            self.summary_var.set(f"Showing {len(view):,} of {len(changes):,} updates · {total_cards:,} to add · "
+                                 f"net change {net_change:+,}")
+        self.scroll_to(0)
+
+    def scroll_to(self, offset: int):
+        """Move the visible window to start at offset and rewrite the visible items"""
+        max_offset = max(0, len(self.view) - self.height)
+        self.offset = max(0, min(offset, max_offset))
+
+        for row, item_id in enumerate(self.item_ids):
+            position = self.offset + row
+            if position < len(self.view):
+                change = self.changes[self.view[position]]
+                self.tree.item(item_id, values=[change[key] for key, _, _, _ in COLUMNS])
+            else:
+                self.tree.item(item_id, values=())
+
+        if self.view:
+            self.scrollbar.set(self.offset / len(self.view), min(1.0, (self.offset + self.height) / len(self.view)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(int(float(amount) * len(self.view)))
+        elif action == tk.SCROLL:
+            step = self.height if unit == tk.PAGES else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_mouse_wheel(self, event):
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return 'break'
@@ -18,6 +18,8 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/TCGInventoryUpdater",
     packages=find_packages(),
+    py_modules=["tcg_inventory_updater", "inventory_core", "inventory_cache", "inventory_cli", "inventory_metrics",
+                "inventory_reader", "inventory_store", "inventory_watch", "inventory_writer", "preview_table"],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: End Users/Desktop",
@@ -37,6 +39,7 @@ setup(
     entry_points={
         "console_scripts": [
             "tcg-inventory-updater=tcg_inventory_updater:main",
+            "tcg-inventory=inventory_cli:main",
         ],
     },
     include_package_data=True,
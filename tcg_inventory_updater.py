@@ -6,34 +6,115 @@ Automates the process of updating TCGPlayer inventory quantities from secondary
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
-import pandas as pd
+import multiprocessing
+from collections import deque
+import json
 import os
-from typing import List, Dict, Tuple, Optional
+import queue
+import threading
+import time
+from typing import Callable, List, Dict, Tuple, Optional
 import logging
 
+from inventory_metrics import RowCounter, StageTimer, profile_to
+from preview_table import PreviewTable
+
+# The merge engine imports pandas and NumPy, which takes seconds on a cold start
+# (longer from a frozen build), so it is loaded on a background thread once the
+# window is up; see load_engine
+inventory_core = None
+ParsedFileCache = None
+_engine_lock = threading.Lock()
+
+# The log keeps only the most recent lines and is written in batches
+LOG_MAX_LINES = 2000
+LOG_FLUSH_MS = 100
+
+# Optional extra condition/set aliases for the alias match tier, next to the application
+ALIASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aliases.json")
+
+# What Save writes: the whole inventory, only the rows whose Add to Quantity changed
+# (enough for TCGplayer's bulk upload), or both in one pass
+SAVE_FULL = "Full inventory"
+SAVE_DELTA = "Changed rows only"
+SAVE_BOTH = "Full + changed rows"
+SAVE_MODES = (SAVE_FULL, SAVE_DELTA, SAVE_BOTH)
+# Workers box value that leaves the pool size to inventory_core.default_worker_count, which reads
+# little data without a pool at all
+WORKERS_AUTO = "Auto"
+
+# File dialog filters; secondary files may also be Excel workbooks
+COMPRESSED_CSV_FILES = ("Compressed CSV files", "*.csv.gz *.zip *.csv.zst")
+MAIN_FILE_TYPES = [("CSV files", "*.csv"), COMPRESSED_CSV_FILES, ("All files", "*.*")]
+SECONDARY_FILE_TYPES = [("Inventory files", "*.csv *.csv.gz *.zip *.csv.zst *.xlsx *.xlsm"), ("CSV files", "*.csv"),
+                        COMPRESSED_CSV_FILES, ("Excel workbooks", "*.xlsx *.xlsm"), ("All files", "*.*")]
+
+# Set to a directory to get a cProfile (pstats) dump of every Preview and Save in it
+PROFILE_DIR_ENV = "TCG_INVENTORY_PROFILE"
+# Set to a file path to record startup times there (JSON) and quit once the engine
+# has loaded; used by "benchmark.py startup", also for the frozen build
+STARTUP_PROBE_ENV = "TCG_INVENTORY_STARTUP_PROBE"
+ENGINE_POLL_MS = 50
+
+
+def load_engine():
+    """Import the merge engine on first use and return inventory_core; safe from any thread"""
+    global inventory_core, ParsedFileCache
+    with _engine_lock:
+        if inventory_core is None:
+            import inventory_core as core
+            from inventory_cache import ParsedFileCache as cache_class
+            ParsedFileCache = cache_class
+            inventory_core = core
+    return inventory_core
+
+
 class TCGInventoryUpdater:
     def __init__(self, root):
         self.root = root
         self.root.title("TCGPlayer Inventory Updater")
-        self.root.geometry("800x600")
+        self.root.geometry("900x800")
         
         # Ensure window is properly initialized
         self.root.update_idletasks()
         
         # Set initial window position (let Tkinter handle centering)
-        self.root.geometry("800x600+100+100")
+        self.root.geometry("900x800+100+100")
         
         # Data storage
         self.main_file_path = None
         self.secondary_files = []
-        self.main_data = None
-        self.secondary_data = []
+        # Resident main inventory plus per-file partials, updated incrementally between previews
+        self.merge_state = None
+        # What the last Preview showed; Save applies it as is while its input files are unchanged
+        self.change_plan = None
+        # Rejected quantities per file in the merge state (main file included), for the log and the Save report
+        self.rejected_quantities = {}
+        # None: chosen for each load (see WORKERS_AUTO)
+        self.worker_count = None
+        # Set up once the merge engine has loaded (see start_engine_load)
+        self.parse_cache = None
+        self.alias_tables = None
+        self.engine_thread = None
+        self.engine_action = None
+        
+        # Log lines waiting to be written; the deque drops the oldest beyond LOG_MAX_LINES
+        self.pending_log = deque(maxlen=LOG_MAX_LINES)
+        self.log_flush_scheduled = False
+        
+        # Background work: one worker at a time, results come back through work_queue
+        self.worker = None
+        self.cancel_event = threading.Event()
+        self.work_queue = queue.Queue()
+        # Stage timings of the current (or last) operation; Save's write step adds to its match step's
+        self.stage_timer = StageTimer()
         
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
         self.setup_ui()
+        self.root.after_idle(self.start_engine_load)
         
         # Ensure proper focus after UI is set up
         
@@ -85,10 +166,23 @@ class TCGInventoryUpdater:
         ttk.Button(files_buttons_frame, text="Remove Selected", command=self.remove_secondary_file, width=15).grid(row=0, column=1, padx=5)
         ttk.Button(files_buttons_frame, text="Clear All", command=self.clear_secondary_files, width=12).grid(row=0, column=2, padx=5)
         
+        ttk.Label(files_buttons_frame, text="Workers:").grid(row=0, column=3, padx=(20, 5))
+        self.worker_count_var = tk.StringVar(value=WORKERS_AUTO)
+        ttk.Spinbox(files_buttons_frame, values=(WORKERS_AUTO,) + tuple(range(1, (os.cpu_count() or 1) + 1)),
+                    textvariable=self.worker_count_var, width=5).grid(row=0, column=4)
+        
+        # Streams the main file in chunks instead of keeping it in memory
+        self.low_memory_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(files_buttons_frame, text="Low memory", variable=self.low_memory_var).grid(row=0, column=5, padx=(20, 0))
+        
+        # Alias and fuzzy name tiers for cards without an exact match; off unless asked for
+        self.fuzzy_match_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(files_buttons_frame, text="Fuzzy matching", variable=self.fuzzy_match_var).grid(row=0, column=6, padx=(10, 0))
+        
         
         # Action buttons
         buttons_frame = ttk.Frame(main_frame)
-        buttons_frame.grid(row=4, column=0, columnspan=3, pady=30)
+        buttons_frame.grid(row=4, column=0, columnspan=3, pady=(10, 20))
         
         self.preview_button = ttk.Button(buttons_frame, text="Preview Changes", command=self.preview_changes, width=20)
         self.preview_button.grid(row=0, column=0, padx=10)
@@ -96,11 +190,40 @@ class TCGInventoryUpdater:
         self.save_button = ttk.Button(buttons_frame, text="Save", command=self.save_inventory, width=20)
         self.save_button.grid(row=0, column=1, padx=10)
         
-        ttk.Button(buttons_frame, text="Clear All", command=self.clear_all, width=20).grid(row=0, column=2, padx=10)
+        self.save_mode_var = tk.StringVar(value=SAVE_FULL)
+        ttk.Combobox(buttons_frame, textvariable=self.save_mode_var, values=SAVE_MODES, state='readonly',
+                     width=20).grid(row=1, column=1, padx=10, pady=(5, 0))
+        
+        self.clear_all_button = ttk.Button(buttons_frame, text="Clear All", command=self.clear_all, width=20)
+        self.clear_all_button.grid(row=0, column=2, padx=10)
+        
+        # Progress
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        progress_frame.columnconfigure(0, weight=1)
+        
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(progress_frame, variable=self.progress_var, mode='determinate')
+        self.progress_bar.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 10))
+        
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self.cancel_operation, width=12, state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=1)
+        
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(progress_frame, textvariable=self.status_var, font=('Arial', 9)).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        # Preview table
+        preview_frame = ttk.LabelFrame(main_frame, text="Preview", padding="10")
+        preview_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(15, 0))
+        preview_frame.columnconfigure(0, weight=1)
+        preview_frame.rowconfigure(0, weight=1)
+        
+        self.preview_table = PreviewTable(preview_frame, height=10)
+        self.preview_table.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Log output
         log_frame = ttk.LabelFrame(main_frame, text="Log Output", padding="10")
-        log_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=20)
+        log_frame.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(15, 0))
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
         
@@ -108,19 +231,222 @@ class TCGInventoryUpdater:
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Configure main frame row weights
-        main_frame.rowconfigure(5, weight=1)
+        main_frame.rowconfigure(6, weight=3)
+        main_frame.rowconfigure(7, weight=1)
+        
+        
+    def start_engine_load(self):
+        """Import the merge engine on a background thread now that the window is up (UI thread)"""
+        self.first_idle_at = time.time()
+        self.engine_thread = threading.Thread(target=self.preload_engine, daemon=True)
+        self.engine_thread.start()
+        self.root.after(ENGINE_POLL_MS, self.poll_engine)
+        
+    def preload_engine(self):
+        try:
+            load_engine()
+        except Exception:
+            pass  # poll_engine imports again on the UI thread and reports the error
+            
+    def poll_engine(self):
+        """Finish setting up once the engine thread is done, then run a Preview or Save clicked meanwhile"""
+        if self.engine_thread.is_alive():
+            self.root.after(ENGINE_POLL_MS, self.poll_engine)
+            return
+        try:
+            load_engine()
+        except Exception as e:
+            self.status_var.set("Failed")
+            self.log_message(f"Error: could not load the merge engine: {str(e)}")
+            messagebox.showerror("Error", f"Could not load the merge engine: {str(e)}")
+            return
+        self.parse_cache = ParsedFileCache()
+        self.alias_tables = self.load_alias_tables()
+        probe_path = os.environ.get(STARTUP_PROBE_ENV)
+        if probe_path:
+            self.write_startup_probe(probe_path)
+            self.root.destroy()
+            return
+        if self.engine_action is not None:
+            action, self.engine_action = self.engine_action, None
+            self.status_var.set("Ready")
+            action()
+            
+    def engine_ready(self, action: Callable) -> bool:
+        """True if the merge engine is loaded; otherwise action runs as soon as it is (UI thread)"""
+        if self.parse_cache is not None:
+            return True
+        self.engine_action = action
+        self.status_var.set("Loading merge engine...")
+        return False
+        
+    def write_startup_probe(self, probe_path: str):
+        """Record when the window first went idle and when the engine was loaded (epoch seconds)"""
+        timings = {
+            'first_idle_at': self.first_idle_at,
+            'engine_ready_at': time.time(),
+        }
+        with open(probe_path, 'w', encoding='utf-8') as f:
+            json.dump(timings, f)
+            
+    def load_alias_tables(self) -> 'inventory_core.AliasTables':
+        """Built-in alias tables plus aliases.json, if there is one next to the application"""
+        if os.path.exists(ALIASES_FILE):
+            try:
+                return inventory_core.load_alias_tables(ALIASES_FILE)
+            except (OSError, ValueError) as e:
+                self.log_message(f"Warning: ignoring {os.path.basename(ALIASES_FILE)}: {str(e)}")
+        return inventory_core.load_alias_tables()
         
+    def current_aliases(self) -> Optional['inventory_core.AliasTables']:
+        """Alias tables to match with, or None for exact matching only (UI thread)"""
+        return self.alias_tables if self.fuzzy_match_var.get() else None
         
     def log_message(self, message):
         """Add a message to the log output"""
-        self.log_text.insert(tk.END, f"{message}\n")
+        self.pending_log.append(message)
+        if not self.log_flush_scheduled:
+            self.log_flush_scheduled = True
+            self.root.after(LOG_FLUSH_MS, self.flush_log)
+            
+    def flush_log(self):
+        """Write all pending log lines in one insert and trim the widget to LOG_MAX_LINES"""
+        self.log_flush_scheduled = False
+        if not self.pending_log:
+            return
+        self.log_text.insert(tk.END, "\n".join(self.pending_log) + "\n")
+        self.pending_log.clear()
+        
+        line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        if line_count > LOG_MAX_LINES:
+            self.log_text.delete('1.0', f"{line_count - LOG_MAX_LINES + 1}.0")
         self.log_text.see(tk.END)
         
+    def run_in_background(self, work: Callable, on_done: Callable, description: str,
+                          continue_timing: bool = False):
+        """Run work(post, timer) on a worker thread and call on_done(result) back on the UI thread.
+        
+        work receives a post(kind, *payload) function for sending 'log' and
+        'progress' messages; it must not touch any widget itself. It records
+        its stages in timer, which is logged once on_done starts no further
+        work; continue_timing adds to the previous operation's timer instead
+        of starting a new one.
+        """
+        if self.worker is not None and self.worker.is_alive():
+            messagebox.showinfo("Busy", "Please wait for the current operation to finish or cancel it.")
+            return
+            
+        self.cancel_event.clear()
+        self.progress_var.set(0)
+        self.status_var.set(description)
+        self.set_busy(True)
+        if not continue_timing:
+            self.stage_timer = StageTimer()
+        timer = self.stage_timer
+        profile_path = self.profile_path(description)
+        
+        def target():
+            try:
+                post = lambda *message: self.work_queue.put(message)
+                with profile_to(profile_path):
+                    result = work(post, timer)
+                if profile_path:
+                    post('log', f"Profile written to {profile_path}")
+                self.work_queue.put(('done', on_done, result))
+            except inventory_core.OperationCancelled:
+                self.work_queue.put(('cancelled',))
+            except Exception as e:
+                self.work_queue.put(('error', description, e))
+                
+        self.worker = threading.Thread(target=target, daemon=True)
+        self.worker.start()
+        self.root.after(100, self.poll_work_queue)
+        
+    def poll_work_queue(self):
+        """Drain messages from the worker; reschedules itself while the worker is running"""
+        finished = False
+        try:
+            while True:
+                message = self.work_queue.get_nowait()
+                kind = message[0]
+                if kind == 'log':
+                    self.log_message(message[1])
+                elif kind == 'progress':
+                    _, fraction, status = message
+                    self.progress_var.set(fraction * 100)
+                    self.status_var.set(status)
+                elif kind == 'done':
+                    finished = True
+                    self.finish_background(100, "Done")
+                    message[1](message[2])
+                    if self.worker is None:
+                        self.log_timing()
+                elif kind == 'cancelled':
+                    finished = True
+                    self.finish_background(0, "Cancelled")
+                    self.log_message("Operation cancelled.")
+                elif kind == 'error':
+                    finished = True
+                    _, description, error = message
+                    self.finish_background(0, "Failed")
+                    self.log_message(f"Error: {str(error)}")
+                    messagebox.showerror("Error", f"{description} failed: {str(error)}")
+                if finished:
+                    # Anything left belongs to a follow-up worker with its own poll loop
+                    break
+        except queue.Empty:
+            pass
+            
+        if not finished:
+            self.root.after(100, self.poll_work_queue)
+            
+    def profile_path(self, description: str) -> Optional[str]:
+        """Where to dump a profile of the next operation, if PROFILE_DIR_ENV is set"""
+        profile_dir = os.environ.get(PROFILE_DIR_ENV)
+        if not profile_dir:
+            return None
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+        except OSError as e:
+            self.log_message(f"Warning: not profiling, cannot use {profile_dir}: {str(e)}")
+            return None
+        return os.path.join(profile_dir, f"{description.lower()}-{time.strftime('%Y%m%d-%H%M%S')}.pstats")
+        
+    def log_timing(self):
+        """Write the finished operation's stage timings to the log panel and the logger"""
+        for line in self.stage_timer.summary_lines():
+            self.log_message(line)
+            self.logger.info(line)
+            
+    def finish_background(self, progress: float, status: str):
+        """Reset the progress widgets once the worker has finished"""
+        if self.worker is not None:
+            # The worker posts its last message just before exiting
+            self.worker.join()
+            self.worker = None
+        self.set_busy(False)
+        self.progress_var.set(progress)
+        self.status_var.set(status)
+        
+    def set_busy(self, busy: bool):
+        """Enable Cancel and disable the action buttons while work is running"""
+        action_state = tk.DISABLED if busy else tk.NORMAL
+        self.preview_button.configure(state=action_state)
+        self.save_button.configure(state=action_state)
+        self.clear_all_button.configure(state=action_state)
+        self.cancel_button.configure(state=tk.NORMAL if busy else tk.DISABLED)
+        
+    def cancel_operation(self):
+        """Ask the worker to stop at the next chunk boundary"""
+        if self.worker is not None and self.worker.is_alive():
+            self.cancel_event.set()
+            self.status_var.set("Cancelling...")
+            
     def select_main_file(self):
         """Select the main inventory file"""
         filename = filedialog.askopenfilename(
             title="Select Main Inventory File",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=MAIN_FILE_TYPES
         )
         if filename:
             self.main_file_path = filename
@@ -131,7 +457,7 @@ class TCGInventoryUpdater:
         """Add secondary files for inventory updates"""
         filenames = filedialog.askopenfilenames(
             title="Select Secondary Files",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=SECONDARY_FILE_TYPES
         )
         for filename in filenames:
             if filename not in self.secondary_files:
@@ -172,226 +498,312 @@ class TCGInventoryUpdater:
                 
         return True
         
-    def load_csv_data(self, file_path: str) -> Optional[pd.DataFrame]:
-        """Load CSV data with error handling"""
+    def sync_merge_state(self, post, timer: StageTimer, main_file_path: str, secondary_files: List[str],
+                         aliases: Optional['inventory_core.AliasTables']):
+        """Bring the merge state up to date with the selected files on the worker thread.
+        
+        The main file is only reloaded when it is new or changed on disk (or
+        fuzzy matching was switched on or off); then
+        only secondary files that were added, removed or edited since the last
+        run are subtracted or parsed and folded in. Returns (state, diff), where
+        diff is the net change relative to the previous state, or None when the
+        whole merge was rebuilt.
+        """
+        log = lambda message: post('log', message)
+        state = self.merge_state
+        
         try:
-            # Try different encodings
-            encodings = ['utf-8', 'latin-1', 'cp1252']
-            for encoding in encodings:
+            main_stamp = inventory_core.file_stamp(main_file_path)
+        except OSError:
+            main_stamp = None
+        reload_main = (state is None or state.main_path != main_file_path or state.main_stamp != main_stamp
+                       or state.aliases is not aliases)
+        
+        removed = [] if reload_main else [file_path for file_path in state.partials if file_path not in secondary_files]
+        stale = list(secondary_files) if reload_main else state.stale_files(secondary_files)
+        total_files = int(reload_main) + len(stale) + 1  # last step is matching
+        progress = self.progress_reporter(post, total_files - 1)
+        
+        if reload_main:
+            with timer.stage("load main") as stage:
                 try:
-                    df = pd.read_csv(file_path, encoding=encoding)
-                    return df
-                except UnicodeDecodeError:
-                    continue
-                    
-            # If all encodings fail, try with error handling
-            df = pd.read_csv(file_path, encoding='utf-8', errors='ignore')
-            return df
+                    main_data = inventory_core.load_csv_data(main_file_path, progress, self.cancel_event, log)
+                except inventory_core.OperationCancelled:
+                    raise
+                except Exception as e:
+                    log(f"Error loading {os.path.basename(main_file_path)}: {str(e)}")
+                    raise ValueError("Failed to load main inventory file.")
+                stage.rows = len(main_data)
+            self.rejected_quantities = {}
+            if inventory_core.MAIN_ADD_QUANTITY in main_data.columns:
+                _, self.rejected_quantities[main_file_path] = inventory_core.parse_quantities(
+                    main_data[inventory_core.MAIN_ADD_QUANTITY], main_file_path, inventory_core.MAIN_ADD_QUANTITY,
+                    allow_negative=True)
+            post('progress', 1 / total_files, "Indexing main inventory...")
+            with timer.stage("index main", len(main_data)):
+                state = inventory_core.IncrementalMerge(main_data, main_file_path, main_stamp, aliases)
+        snapshot = state.snapshot()
+        
+        with timer.stage("load secondary") as stage:
+            rows = RowCounter(progress)
+            partials = inventory_core.load_secondary_partials(
+                stale, self.worker_count, log, rows, self.cancel_event, self.parse_cache, self.rejected_quantities)
+            stage.rows = rows.total
+        for file_path in removed + [file_path for file_path in stale if file_path not in partials]:
+            self.rejected_quantities.pop(file_path, None)
+        inventory_core.report_rejected(log, self.rejected_quantities)
             
-        except Exception as e:
-            self.log_message(f"Error loading {os.path.basename(file_path)}: {str(e)}")
-            return None
+        post('progress', (total_files - 1) / total_files, "Matching cards...")
+        with timer.stage("match", sum(len(partial) for partial in partials.values())):
+            for file_path in removed + stale:
+                state.remove_file(file_path)
+            for file_path, partial in partials.items():
+                state.add_file(file_path, partial, inventory_core.file_stamp(file_path))
             
+        if not state.partials:
+            raise ValueError("No secondary files could be loaded.")
+        return state, None if reload_main else state.diff_since(snapshot)
+        
+    def read_worker_count(self) -> Optional[int]:
+        """Read the Workers spinbox (UI thread), falling back to the last valid value; None is Auto"""
+        value = self.worker_count_var.get().strip()
+        try:
+            self.worker_count = None if value.lower() == WORKERS_AUTO.lower() else max(1, int(value))
+        except ValueError:
+            self.worker_count_var.set(WORKERS_AUTO if self.worker_count is None else self.worker_count)
+        return self.worker_count
+        
     def preview_changes(self):
         """Preview the changes that will be made"""
-        if not self.validate_inputs():
+        if not self.validate_inputs() or not self.engine_ready(self.preview_changes):
             return
             
-        try:
-            self.log_message("Starting preview...")
-            
-            # Load main data
-            self.main_data = self.load_csv_data(self.main_file_path)
-            if self.main_data is None:
-                messagebox.showerror("Error", "Failed to load main inventory file.")
-                return
+        self.read_worker_count()
+        self.log_message("Starting preview...")
+        main_file_path = self.main_file_path
+        secondary_files = list(self.secondary_files)
+        aliases = self.current_aliases()
+        
+        if self.low_memory_var.get():
+            if aliases is not None:
+                self.log_message("Low memory mode matches cards exactly; fuzzy matching is skipped.")
                 
-            # Load secondary data
-            self.secondary_data = []
-            for file_path in self.secondary_files:
-                data = self.load_csv_data(file_path)
-                if data is not None:
-                    self.secondary_data.append(data)
-                        
-            if not self.secondary_data:
-                messagebox.showerror("Error", "No secondary files could be loaded.")
-                return
+            def work(post, timer):
+                aggregated_quantities = self.load_aggregate(post, timer, secondary_files)
+                with timer.stage("stream match") as stage:
+                    rows = RowCounter(self.progress_reporter(post, 1))
+                    changes = inventory_core.stream_inventory_changes(
+                        main_file_path, aggregated_quantities, progress=rows,
+                        cancel_event=self.cancel_event, log=lambda message: post('log', message))
+                    stage.rows = rows.total
+                return changes
                     
-            # Process changes
-            changes = self.process_inventory_changes()
+            self.run_in_background(work, self.log_change_list, "Preview")
+            return
             
-            if changes:
-                self.log_message(f"Preview: {len(changes)} cards will be updated")
-                for change in changes:  # Show all changes
-                    self.log_message(f"  {change['product_name']} ({change['set_name']}, {change['condition']}) → {change['new_add_quantity']}")
-            else:
-                self.log_message("No changes found to apply.")
-                
-        except Exception as e:
-            self.log_message(f"Error during preview: {str(e)}")
-            messagebox.showerror("Error", f"Preview failed: {str(e)}")
+        def work(post, timer):
+            return self.sync_merge_state(post, timer, main_file_path, secondary_files, aliases)
+            
+        self.run_in_background(work, self.show_preview, "Preview")
+        
+    def progress_reporter(self, post, total_files: int):
+        """Progress callback for the worker that reports rows read per file"""
+        files_seen = set()
+        
+        def progress(file_name, rows_read):
+            files_seen.add(file_name)
+            post('progress', (len(files_seen) - 1) / (total_files + 1),
+                 f"Loading {file_name} ({len(files_seen)}/{total_files}): {rows_read:,} rows")
+                 
+        return progress
+        
+    def load_aggregate(self, post, timer: StageTimer, secondary_files: List[str],
+                       report_path: Optional[str] = None) -> Dict:
+        """Parse the secondary files and sum them into one aggregate (worker thread, low-memory mode)"""
+        log = lambda message: post('log', message)
+        rejected = {}
+        with timer.stage("load secondary") as stage:
+            rows = RowCounter(self.progress_reporter(post, len(secondary_files) + 1))
+            partials = inventory_core.load_secondary_partials(
+                secondary_files, self.worker_count, log, rows, self.cancel_event, self.parse_cache, rejected)
+            stage.rows = rows.total
+        inventory_core.report_rejected(log, rejected, report_path)
+        if not partials:
+            raise ValueError("No secondary files could be loaded.")
+        with timer.stage("aggregate", sum(len(partial) for partial in partials.values())):
+            return inventory_core.reduce_partials(partials.values())
+        
+    def log_change_list(self, changes: List[Dict]):
+        """Show a full preview in the table and summarize it in the log (UI thread)"""
+        self.preview_table.set_changes(changes)
+        if changes:
+            self.log_message(f"Preview: {len(changes)} cards will be updated{inventory_core.describe_match_tiers(changes)}")
+        else:
+            self.log_message("No changes found to apply.")
+            
+    def show_preview(self, result):
+        """Store the merge state and show the preview, noting what changed since the last one (UI thread)"""
+        self.merge_state, diff = result
+        self.change_plan = self.merge_state.plan()
+        changes = self.change_plan.changes
+        
+        if diff is None:
+            self.log_change_list(changes)
+            return
             
+        self.preview_table.set_changes(changes)
+        self.log_message(f"Preview: {len(changes)} cards will be updated{inventory_core.describe_match_tiers(changes)} "
+                         f"({len(diff.added)} new, {len(diff.updated)} changed, {len(diff.removed)} dropped since last preview)")
+                         
     def process_inventory_changes(self) -> List[Dict]:
         """Process inventory changes and return list of changes"""
-        changes = []
-        
-        # Fixed column names
-        main_product_line = "Product Line"
-        main_set_name = "Set Name"
-        main_product_name = "Product Name"
-        main_number = "Number"
-        main_condition = "Condition"
-        main_add_quantity = "Add to Quantity"
-        
-        secondary_product_line = "Product Line"
-        secondary_set_name = "Set"
-        secondary_product_name = "Product Name"
-        secondary_number = "Number"
-        secondary_condition = "Condition"
-        secondary_quantity = "Quantity"
-        
-        # Aggregate quantities from secondary files
-        aggregated_quantities = {}
-        
-        for secondary_df in self.secondary_data:
-            try:
-                for _, row in secondary_df.iterrows():
-                    # Create a key for matching
-                    card_key = (
-                        str(row.get(secondary_product_line, '')).strip().lower(),
-                        str(row.get(secondary_set_name, '')).strip().lower(),
-                        str(row.get(secondary_product_name, '')).strip().lower(),
-                        str(row.get(secondary_number, '')).strip().lower(),
-                        str(row.get(secondary_condition, '')).strip().lower()
-                    )
-                    
-                    # Get quantity
-                    quantity = row.get(secondary_quantity, 0)
-                    try:
-                        quantity = int(float(quantity)) if pd.notna(quantity) else 0
-                    except (ValueError, TypeError):
-                        quantity = 0
-                        
-                    if quantity > 0 and card_key[0] and card_key[1] and card_key[2]:
-                        if card_key not in aggregated_quantities:
-                            aggregated_quantities[card_key] = 0
-                        aggregated_quantities[card_key] += quantity
-                        
-            except Exception as e:
-                self.log_message(f"Error processing secondary file: {str(e)}")
-                continue
-                    
-        # Find matching rows in main data and calculate changes
-        for _, main_row in self.main_data.iterrows():
-            try:
-                main_key = (
-                    str(main_row.get(main_product_line, '')).strip().lower(),
-                    str(main_row.get(main_set_name, '')).strip().lower(),
-                    str(main_row.get(main_product_name, '')).strip().lower(),
-                    str(main_row.get(main_number, '')).strip().lower(),
-                    str(main_row.get(main_condition, '')).strip().lower()
-                )
-                
-                if main_key in aggregated_quantities:
-                    current_add_quantity = main_row.get(main_add_quantity, 0)
-                    try:
-                        current_add_quantity = int(float(current_add_quantity)) if pd.notna(current_add_quantity) else 0
-                    except (ValueError, TypeError):
-                        current_add_quantity = 0
-                        
-                    new_quantity = aggregated_quantities[main_key]
-                    
-                    changes.append({
-                        'index': main_row.name,
-                        'product_line': main_row.get(main_product_line, ''),
-                        'set_name': main_row.get(main_set_name, ''),
-                        'product_name': main_row.get(main_product_name, ''),
-                        'number': main_row.get(main_number, ''),
-                        'condition': main_row.get(main_condition, ''),
-                        'current_add_quantity': current_add_quantity,
-                        'new_add_quantity': new_quantity,
-                        'change': new_quantity - current_add_quantity
-                    })
-                        
-            except Exception as e:
-                self.log_message(f"Error processing main row: {str(e)}")
-                continue
-                
-        return changes
+        return self.merge_state.changes() if self.merge_state is not None else []
         
     def save_inventory(self):
         """Save the updated inventory"""
-        if not self.validate_inputs():
+        if not self.validate_inputs() or not self.engine_ready(self.save_inventory):
             return
             
-        try:
-            # Load data if not already loaded
-            if self.main_data is None:
-                self.main_data = self.load_csv_data(self.main_file_path)
-                if self.main_data is None:
-                    messagebox.showerror("Error", "Failed to load main inventory file.")
-                    return
-                    
-            if not self.secondary_data:
-                for file_path in self.secondary_files:
-                    data = self.load_csv_data(file_path)
-                    if data is not None:
-                        self.secondary_data.append(data)
-                            
-            if not self.secondary_data:
-                messagebox.showerror("Error", "No secondary files could be loaded.")
+        self.read_worker_count()
+        main_file_path = self.main_file_path
+        secondary_files = list(self.secondary_files)
+        aliases = self.current_aliases()
+        
+        if self.low_memory_var.get():
+            # Streaming writes as it matches, so the destination is needed up front
+            output_path, delta_path = self.ask_output_paths()
+            if not output_path and not delta_path:
                 return
-                    
-            # Process changes
-            changes = self.process_inventory_changes()
+                
+            def work(post, timer):
+                report_path = inventory_core.rejects_file_name(output_path or delta_path)
+                aggregated_quantities = self.load_aggregate(post, timer, secondary_files, report_path)
+                with timer.stage("stream merge") as stage:
+                    rows = RowCounter(self.progress_reporter(post, 1))
+                    changes = inventory_core.stream_merge_inventory(
+                        main_file_path, aggregated_quantities, output_path, progress=rows,
+                        cancel_event=self.cancel_event, log=lambda message: post('log', message),
+                        delta_path=delta_path)
+                    stage.rows = rows.total
+                return len(changes), output_path, delta_path
+                
+            self.run_in_background(work, self.show_saved, "Save")
+            return
             
-            if not changes:
-                self.log_message("No changes to apply.")
-                return
-                    
-            # Apply changes
-            updated_count = 0
-            for change in changes:
-                self.main_data.at[change['index'], "Add to Quantity"] = change['new_add_quantity']
-                updated_count += 1
-                    
-            # Get output filename using file dialog
-            default_name = os.path.basename(self.main_file_path)
-            output_path = filedialog.asksaveasfilename(
-                title="Save Updated Inventory As",
-                defaultextension=".csv",
-                initialfile=default_name,
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
-            )
+        plan = self.change_plan
+        if (plan is not None and self.merge_state is not None and plan.version == self.merge_state.version
+                and plan.is_current(main_file_path, secondary_files, aliases)):
+            self.log_message("Inputs unchanged since Preview; saving the previewed changes.")
+            self.write_plan(plan)
+            return
             
-            if not output_path:
-                return
-                
-            # Save file
-            self.main_data.to_csv(output_path, index=False)
+        def work(post, timer):
+            # Only loads what changed since the last Preview
+            return self.sync_merge_state(post, timer, main_file_path, secondary_files, aliases)
             
-            self.log_message(f"Saved: {updated_count} cards updated to {output_path}")
-            messagebox.showinfo("Success", f"Inventory updated successfully!\n{updated_count} cards updated.")
+        self.run_in_background(work, self.choose_output_and_write, "Save")
+        
+    def choose_output_and_write(self, result):
+        """Take the freshly synced merge state and write its changes (UI thread)"""
+        self.merge_state, _ = result
+        self.change_plan = self.merge_state.plan()
+        self.write_plan(self.change_plan, continue_timing=True)
+        
+    def write_plan(self, plan: 'inventory_core.ChangePlan', continue_timing: bool = False):
+        """Ask where to save, then apply the plan and write on the worker thread (UI thread)"""
+        changes = plan.changes
+        if not changes:
+            self.log_message("No changes to apply.")
+            return
             
-                
-        except Exception as e:
-            self.log_message(f"Error: {str(e)}")
-            messagebox.showerror("Error", f"Save failed: {str(e)}")
+        output_path, delta_path = self.ask_output_paths()
+        if not output_path and not delta_path:
+            return
             
+        main_data = self.merge_state.main_df
+        # Already summarized in the log when they were loaded; Save adds the full report
+        rejected = [reject for rejects in self.rejected_quantities.values() for reject in rejects]
+        
+        def work(post, timer):
+            post('progress', 0.5, f"Writing {os.path.basename(output_path or delta_path)}...")
+            if rejected:
+                report_path = inventory_core.rejects_file_name(output_path or delta_path)
+                inventory_core.write_rejected_report(rejected, report_path)
+                post('log', f"Rejected quantities written to {report_path}")
+            # The resident main inventory keeps its own quantities, so the merge state still matches the
+            # files on disk for the next Preview, whether or not this write succeeds
+            with inventory_core.quantities_restored(main_data):
+                with timer.stage("apply", len(changes)):
+                    updated_count = inventory_core.apply_changes(main_data, changes)
+                with timer.stage("write", len(main_data) if output_path else len(changes)):
+                    inventory_core.write_inventory(main_data, output_path, delta_path=delta_path, changes=changes)
+            return updated_count, output_path, delta_path
+            
+        self.run_in_background(work, self.show_saved, "Save", continue_timing=continue_timing)
+        
+    def ask_output_paths(self) -> Tuple[Optional[str], Optional[str]]:
+        """(full inventory path, changed rows path) for the selected save mode; either may be None.
+        
+        Both are None if the dialog was cancelled. In "Full + changed rows"
+        mode the changed rows go next to the full file, named like it.
+        """
+        save_mode = self.save_mode_var.get()
+        if save_mode == SAVE_DELTA:
+            delta_path = self.ask_output_path("Save Changed Rows As", changes_file_name(inventory_core.output_file_name(self.main_file_path)))
+            return None, delta_path or None
+        output_path = self.ask_output_path("Save Updated Inventory As", inventory_core.output_file_name(self.main_file_path))
+        if not output_path:
+            return None, None
+        return output_path, changes_file_name(output_path) if save_mode == SAVE_BOTH else None
+        
+    def ask_output_path(self, title: str, default_name: str) -> str:
+        """Get output filename using file dialog (empty if cancelled)"""
+        return filedialog.asksaveasfilename(
+            title=title,
+            defaultextension=".csv",
+            initialfile=default_name,
+            filetypes=[("CSV files", "*.csv"), ("Compressed CSV files", "*.csv.gz *.csv.zst"), ("All files", "*.*")]
+        )
+        
+    def show_saved(self, result):
+        """Report a finished save (UI thread)"""
+        updated_count, output_path, delta_path = result
+        if not updated_count:
+            # Low-memory saves only find out while writing; nothing was written
+            self.log_message("No changes to apply.")
+            return
+        inventory_core.log_saved(self.log_message, updated_count, output_path, delta_path)
+        messagebox.showinfo("Success", f"Inventory updated successfully!\n{updated_count} cards updated.")
+        
     def clear_all(self):
         """Clear all data and reset the interface"""
         self.main_file_path = None
         self.secondary_files = []
-        self.main_data = None
-        self.secondary_data = []
+        self.merge_state = None
+        self.change_plan = None
+        self.rejected_quantities = {}
         
         self.main_file_var.set("")
         self.secondary_files_listbox.delete(0, tk.END)
+        self.pending_log.clear()
         self.log_text.delete(1.0, tk.END)
+        self.preview_table.clear()
+        self.progress_var.set(0)
+        self.status_var.set("Ready")
         
         self.log_message("Application reset. Ready for new files.")
 
+def changes_file_name(path: str) -> str:
+    """inventory.csv -> inventory-changes.csv, keeping a compression suffix (.csv.gz -> -changes.csv.gz)"""
+    base, extension = os.path.splitext(path)
+    if extension.lower() in ('.gz', '.zst'):
+        base, inner_extension = os.path.splitext(base)
+        extension = inner_extension + extension
+    return f"{base}-changes{extension}"
+
 def main():
+    # Secondary files are parsed in a process pool; needed for frozen builds
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = TCGInventoryUpdater(root)
     root.mainloop()
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, REPO_DIR)
+
+
+@pytest.fixture
+def sample_file():
+    """Path of one of the sample CSVs shipped with the repository"""
+    return lambda name: os.path.join(REPO_DIR, name)
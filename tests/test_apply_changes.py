@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+import inventory_core
+
+
+def main_frame(quantities):
+    return pd.DataFrame({"Product Name": [f"Card {n}" for n in range(len(quantities))],
+                         inventory_core.MAIN_ADD_QUANTITY: quantities})
+
+
+def test_apply_changes_on_text_quantities():
+    main_df = main_frame(["1", "3x", ""])
+    assert inventory_core.apply_changes(main_df, [{'index': 0, 'new_add_quantity': 4}]) == 1
+    assert main_df[inventory_core.MAIN_ADD_QUANTITY].tolist()[:2] == [4, "3x"]
+
+
+@pytest.mark.parametrize("quantities", [[1, 2, 3], ["1", "3x", "2"]])
+def test_quantities_restored_after_failed_write(quantities):
+    main_df = main_frame(quantities)
+    original = main_df.copy()
+    with pytest.raises(OSError):
+        with inventory_core.quantities_restored(main_df):
+            inventory_core.apply_changes(main_df, [{'index': 1, 'new_add_quantity': 7}])
+            assert main_df.loc[1, inventory_core.MAIN_ADD_QUANTITY] == 7
+            raise OSError("disk full")
+    pd.testing.assert_frame_equal(main_df, original)
+
+
+def test_quantities_restored_without_quantity_column():
+    main_df = pd.DataFrame({"Product Name": ["Card 0", "Card 1"]})
+    with inventory_core.quantities_restored(main_df):
+        inventory_core.apply_changes(main_df, [{'index': 0, 'new_add_quantity': 2}])
+    assert list(main_df.columns) == ["Product Name"]
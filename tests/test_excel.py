@@ -0,0 +1,172 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import inventory_core
+import inventory_reader
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+STRICT_NS = "http://purl.oclc.org/ooxml/spreadsheetml/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+COLUMNS = ["Set", "Product Name", "Quantity"]
+
+
+def write_workbook(path, rows_xml, shared_strings=None, namespace=MAIN_NS, dimension=None):
+    """A minimal .xlsx: the sheet's <sheetData> rows as given, with no styles or content types"""
+    sheet_rels = f'<Relationship Id="rId1" Type="{RELATIONSHIP}/worksheet" Target="worksheets/data.xml"/>'
+    if shared_strings is not None:
+        sheet_rels += f'<Relationship Id="rId2" Type="{RELATIONSHIP}/sharedStrings" Target="strings.xml"/>'
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("_rels/.rels", f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+                         f'relationships"><Relationship Id="rId1" Type="{RELATIONSHIP}/officeDocument" '
+                         f'Target="xl/book.xml"/></Relationships>')
+        archive.writestr("xl/book.xml", f'<workbook xmlns="{namespace}" xmlns:r="{REL_NS}"><sheets>'
+                         f'<sheet name="Scans" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        archive.writestr("xl/_rels/book.xml.rels", f'<Relationships xmlns="http://schemas.openxmlformats.org/'
+                         f'package/2006/relationships">{sheet_rels}</Relationships>')
+        archive.writestr("xl/worksheets/data.xml", f'<worksheet xmlns="{namespace}">'
+                         + (f'<dimension ref="{dimension}"/>' if dimension else '')
+                         + f'<sheetData>{rows_xml}</sheetData></worksheet>')
+        if shared_strings is not None:
+            archive.writestr("xl/strings.xml", f'<sst xmlns="{namespace}">{"".join(shared_strings)}</sst>')
+
+
+def header(*names):
+    return '<row r="1">' + ''.join(f'<c t="inlineStr"><is><t>{name}</t></is></c>' for name in names) + '</row>'
+
+
+def read(path, category_columns=(), on_rows=None):
+    return inventory_reader.read_excel_columns(str(path), COLUMNS, list(category_columns), on_rows)
+
+
+def column(df, name):
+    return [None if value != value else value for value in df[name]]
+
+
+def test_shared_strings_with_rich_text_and_phonetic_runs(tmp_path):
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>'
+                         '<row r="2"><c r="A2" t="s"><v>2</v></c><c r="B2" t="s"><v>3</v></c></row>',
+                   shared_strings=['<si><t>Set</t></si>', '<si><t xml:space="preserve"> Product Name </t></si>',
+                                   '<si><r><rPr><b/></rPr><t>Magic </t></r><r><t>2011</t></r></si>',
+                                   '<si><t>Lightning Bolt</t><rPh sb="0" eb="1"><t>ライトニング</t></rPh></si>'])
+    df = read(path)
+    assert list(df.columns) == ["Set", "Product Name"]
+    assert column(df, "Set") == ["Magic 2011"] and column(df, "Product Name") == ["Lightning Bolt"]
+
+
+def test_inline_strings_plain_and_rich(tmp_path):
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, header(*COLUMNS)
+                   + '<row r="2"><c r="A2" t="inlineStr"><is><t>Alpha</t></is></c>'
+                     '<c r="B2" t="inlineStr"><is><r><t>Black </t></r><r><rPr><i/></rPr><t>Lotus</t></r></is></c>'
+                     '<c r="C2"><v>1</v></c></row>'
+                   + '<row r="3"><c r="A3" t="inlineStr"><is><t></t></is></c>'
+                     '<c r="B3" t="inlineStr"><is><t xml:space="preserve">  </t></is></c><c r="C3" t="inlineStr">'
+                     '<is><t>Sol Ring</t><rPh sb="0" eb="1"><t>ソル</t></rPh></is></c></row>')
+    df = read(path)
+    assert column(df, "Set") == ["Alpha", None]
+    assert column(df, "Product Name") == ["Black Lotus", "  "]
+    assert column(df, "Quantity") == [1, "Sol Ring"]
+
+
+def test_empty_cells_and_missing_rows_are_blank(tmp_path):
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, header(*COLUMNS)
+                   + '<row r="2"><c r="A2" t="inlineStr"><is><t>Alpha</t></is></c><c r="C2"><v>2</v></c></row>'
+                   # An empty cell element, and a cell with an empty value
+                   + '<row r="3"><c r="A3" s="1"/><c r="B3" t="inlineStr"><is><t>Sol Ring</t></is></c>'
+                     '<c r="C3"><v></v></c></row>'
+                   # Rows 4 and 5 are left out, as Excel does for empty rows
+                   + '<row r="6"><c r="C6"><v>3</v></c></row>', dimension="A1:C6")
+    df = read(path)
+    assert column(df, "Set") == ["Alpha", None, None, None, None]
+    assert column(df, "Product Name") == [None, "Sol Ring", None, None, None]
+    assert column(df, "Quantity") == [2, None, None, None, 3]
+
+
+def test_sheet_without_dimension_or_cell_references(tmp_path):
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, '<row>' + ''.join(f'<c t="inlineStr"><is><t>{name}</t></is></c>' for name in COLUMNS)
+                   + '</row><row><c t="inlineStr"><is><t>Alpha</t></is></c><c t="inlineStr"><is><t>Sol Ring</t>'
+                     '</is></c><c><v>4</v></c></row><row><c r="C3"><v>5</v></c></row>')
+    df = read(path)
+    assert column(df, "Set") == ["Alpha", None]
+    assert column(df, "Quantity") == [4, 5]
+
+
+def test_cell_types_convert_like_read_csv(tmp_path):
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, header("Quantity", "Set")
+                   + ''.join(f'<row r="{number}"><c r="A{number}"{kind}><v>{value}</v></c></row>'
+                             for number, kind, value in [(2, '', '3'), (3, '', '3.0'), (4, '', '2.5'),
+                                                         (5, ' t="b"', '1'), (6, ' t="str"', '3x'),
+                                                         (7, ' t="e"', '#N/A')]))
+    assert column(read(path), "Quantity") == [3, 3, 2.5, True, "3x", "#N/A"]
+
+
+def test_header_columns_are_found_by_name(tmp_path):
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, header(" Quantity ", "Notes", "Set", "Quantity")
+                   + '<row r="2"><c r="A2"><v>7</v></c><c r="B2"><v>8</v></c><c r="C2" t="inlineStr">'
+                     '<is><t>Alpha</t></is></c><c r="D2"><v>9</v></c></row>')
+    df = read(path, category_columns=["Set"])
+    assert list(df.columns) == ["Quantity", "Set"]
+    assert column(df, "Quantity") == [7]
+    assert isinstance(df["Set"].dtype, pd.CategoricalDtype)
+
+
+def test_strict_workbook(tmp_path):
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, header("Set") + '<row r="2"><c r="A2" t="s"><v>0</v></c></row>',
+                   shared_strings=['<si><t>Tempest</t></si>'], namespace=STRICT_NS)
+    assert column(read(path), "Set") == ["Tempest"]
+
+
+def test_on_rows_reports_progress_and_can_stop_the_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(inventory_reader, 'EXCEL_PROGRESS_ROWS', 2)
+    path = tmp_path / "scans.xlsx"
+    write_workbook(path, header("Quantity") + ''.join(f'<row r="{n}"><c r="A{n}"><v>{n}</v></c></row>'
+                                                      for n in range(2, 8)))
+    reported = []
+    assert len(read(path, on_rows=reported.append)) == 6 and reported == [2, 4, 6]
+
+    def stop(rows_read):
+        raise inventory_core.OperationCancelled()
+
+    with pytest.raises(inventory_core.OperationCancelled):
+        read(path, on_rows=stop)
+
+
+@pytest.mark.parametrize("content", [b"not a zip", b""])
+def test_unreadable_workbook_raises_value_error(tmp_path, content):
+    path = tmp_path / "scans.xlsx"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match="not a readable .xlsx workbook"):
+        read(path)
+
+
+@pytest.mark.parametrize("write_only", [False, True], ids=["shared-strings", "inline-strings"])
+def test_openpyxl_workbook_matches_read_excel(tmp_path, write_only):
+    openpyxl = pytest.importorskip("openpyxl")
+    rows = [["Product Line", "Set", "Product Name", "Number", "Condition", "Quantity", "Notes"],
+            ["Magic", "Alpha", "Black Lotus", 1, "Near Mint", 2, "x"],
+            ["Magic", "Tempest", "Dark Ritual", None, "Damaged", "3x", None],
+            [None, None, None, None, None, None, None],
+            ["Magic", "Zendikar", "Booster Box", None, "Near Mint", 1.5, "sealed"]]
+    workbook = openpyxl.Workbook(write_only=write_only)
+    sheet = workbook.create_sheet() if write_only else workbook.active
+    for row in rows:
+        sheet.append(row)
+    path = tmp_path / "scans.xlsx"
+    workbook.save(path)
+
+    df = inventory_reader.read_excel_columns(str(path), list(inventory_core.SECONDARY_COLUMNS))
+    expected = pd.read_excel(path, usecols=list(inventory_core.SECONDARY_COLUMNS))
+    assert list(df.columns) == list(expected.columns)
+    for name in df.columns:
+        assert [None if value != value else value for value in df[name]] == \
+            [None if value != value else value for value in expected[name]], name
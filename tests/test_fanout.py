@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pandas as pd
+
+import inventory_cli
+import inventory_core
+
+
+def test_store_output_paths_keeps_distinct_names():
+    assert inventory_core.store_output_paths(["a/store1.csv", "b/store2.zip"], "out") == [
+        os.path.join("out", "store1.csv"), os.path.join("out", "store2.csv")]
+
+
+def test_store_output_paths_prefixes_same_named_mains():
+    paths = inventory_core.store_output_paths(["store1/inventory.csv", "store2/inventory.csv", "other.csv"], "out")
+    assert paths == [os.path.join("out", "store1-inventory.csv"), os.path.join("out", "store2-inventory.csv"),
+                     os.path.join("out", "other.csv")]
+
+
+def test_store_output_paths_falls_back_to_position_for_same_folders():
+    paths = inventory_core.store_output_paths(["a/shop/inventory.csv", "b/shop/inventory.csv"], "out")
+    assert paths == [os.path.join("out", "store1-inventory.csv"), os.path.join("out", "store2-inventory.csv")]
+
+
+def test_readme_fanout_example(tmp_path, sample_file, monkeypatch):
+    # fanout --main store1/inventory.csv --main store2/inventory.csv --add scans/a.csv --add scans/b.csv
+    #        --out-dir updated/ --delta-dir changes/
+    for folder in ("store1", "store2"):
+        (tmp_path / folder).mkdir()
+        shutil.copy(sample_file("sample_main_inventory.csv"), tmp_path / folder / "inventory.csv")
+    (tmp_path / "scans").mkdir()
+    shutil.copy(sample_file("sample_addition1.csv"), tmp_path / "scans" / "a.csv")
+    shutil.copy(sample_file("sample_addition2.csv"), tmp_path / "scans" / "b.csv")
+    monkeypatch.chdir(tmp_path)
+
+    exit_code = inventory_cli.main([
+        "fanout", "--main", "store1/inventory.csv", "--main", "store2/inventory.csv",
+        "--add", "scans/a.csv", "--add", "scans/b.csv", "--out-dir", "updated/", "--delta-dir", "changes/",
+        "--no-cache", "-q"])
+
+    assert exit_code == 0
+    for folder in ("updated", "changes"):
+        assert sorted(os.listdir(tmp_path / folder)) == ["store1-inventory.csv", "store2-inventory.csv"]
+    store1 = pd.read_csv(tmp_path / "updated" / "store1-inventory.csv")
+    store2 = pd.read_csv(tmp_path / "updated" / "store2-inventory.csv")
+    pd.testing.assert_frame_equal(store1, store2)
+    assert not store1.equals(pd.read_csv(tmp_path / "store1" / "inventory.csv"))
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+import inventory_core
+
+
+def main_frame(*names, number="176"):
+    return pd.DataFrame({"Product Line": "Magic", "Set Name": "Alpha", "Product Name": list(names),
+                         "Number": number, "Condition": "Near Mint", "Add to Quantity": 0})
+
+
+def scanned(name, number="176", condition="near mint"):
+    return {("magic", "alpha", name.lower(), number, condition): 2}
+
+
+def fuzzy_changes(main_df, aggregated):
+    unmatched = []
+    changes = inventory_core.find_inventory_changes(main_df, aggregated, inventory_core.load_alias_tables(), unmatched)
+    return [(change['product_name'], change['match']) for change in changes], unmatched
+
+
+def test_misspelled_name_matches_its_card():
+    changes, unmatched = fuzzy_changes(main_frame("Lightning Bolt"), scanned("Lightnin Bolt"))
+    assert changes == [("Lightning Bolt", inventory_core.MATCH_FUZZY)] and not unmatched
+
+
+def test_alias_condition_matches():
+    changes, _ = fuzzy_changes(main_frame("Lightning Bolt"), scanned("Lightning Bolt", condition="nm"))
+    assert changes == [("Lightning Bolt", inventory_core.MATCH_ALIAS)]
+
+
+@pytest.mark.parametrize("listed, scan", [
+    # A card missing from the main file, alone in its block with a name one digit away
+    ("Card 1976", "Card 4976"),
+    # A dropped digit that leaves a leading zero
+    ("Card 45", "Card 045"),
+    ("Card 3045", "Card 304"),
+    # Whole words added or dropped make another product
+    ("Booster Box", "Booster Box Case"),
+    ("Sol Ring Token", "Sol Ring"),
+])
+def test_names_differing_in_numbers_or_words_stay_unmatched(listed, scan):
+    changes, unmatched = fuzzy_changes(main_frame(listed), scanned(scan))
+    assert changes == [] and len(unmatched) == 1
+
+
+def test_dropped_space_still_matches():
+    changes, _ = fuzzy_changes(main_frame("Card 4976"), scanned("Card4976"))
+    assert changes == [("Card 4976", inventory_core.MATCH_FUZZY)]
+
+
+def test_name_close_to_several_cards_is_not_guessed():
+    changes, unmatched = fuzzy_changes(main_frame("Goblin Guide", "Goblin Grenade"), scanned("Goblin Gide"))
+    assert changes == [("Goblin Guide", inventory_core.MATCH_FUZZY)]
+    changes, unmatched = fuzzy_changes(main_frame("Elvish Mystic", "Elvish Mystik"), scanned("Elvish Mystc"))
+    assert changes == [] and len(unmatched) == 1
+
+
+def test_sealed_product_without_number_skips_fuzzy_tier():
+    changes, unmatched = fuzzy_changes(main_frame("Booster Box", number=""), scanned("Booster Bx", number="nan"))
+    assert changes == [] and len(unmatched) == 1
+
+
+def test_exact_only_without_aliases():
+    unmatched = []
+    changes = inventory_core.find_inventory_changes(main_frame("Lightning Bolt"), scanned("Lightnin Bolt"),
+                                                    None, unmatched)
+    assert changes == [] and len(unmatched) == 1
@@ -0,0 +1,40 @@
+import pandas as pd
+
+import inventory_core
+
+
+def card(name):
+    return ("magic", "alpha", name.lower(), "1", "near mint")
+
+
+def state_for(*names):
+    main_df = pd.DataFrame({"Product Line": "Magic", "Set Name": "Alpha", "Product Name": list(names),
+                            "Number": "1", "Condition": "Near Mint", "Add to Quantity": 0})
+    return inventory_core.IncrementalMerge(main_df)
+
+
+def counts(diff):
+    return len(diff.added), len(diff.updated), len(diff.removed)
+
+
+def test_added_file_reports_new_rows():
+    state = state_for("Sol Ring", "Black Lotus")
+    assert counts(state.add_file("a.csv", {card("Sol Ring"): 2})) == (1, 0, 0)
+    assert counts(state.add_file("b.csv", {card("Sol Ring"): 1, card("Black Lotus"): 1})) == (1, 1, 0)
+
+
+def test_rewritten_file_reports_net_change():
+    state = state_for("Sol Ring", "Black Lotus", "Counterspell")
+    state.add_file("a.csv", {card("Sol Ring"): 2, card("Black Lotus"): 1})
+    # Sol Ring changes quantity, Black Lotus is gone, Counterspell is new
+    diff = state.add_file("a.csv", {card("Sol Ring"): 3, card("Counterspell"): 4})
+    assert [change['product_name'] for change in diff.added] == ["Counterspell"]
+    assert [(change['product_name'], change['new_add_quantity']) for change in diff.updated] == [("Sol Ring", 3)]
+    assert [change['product_name'] for change in diff.removed] == ["Black Lotus"]
+
+
+def test_rewritten_file_with_same_content_changes_nothing():
+    state = state_for("Sol Ring")
+    state.add_file("a.csv", {card("Sol Ring"): 2})
+    assert counts(state.add_file("a.csv", {card("Sol Ring"): 2})) == (0, 0, 0)
+    assert [change['new_add_quantity'] for change in state.changes()] == [2]
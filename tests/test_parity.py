@@ -0,0 +1,129 @@
+"""The change list against the original row-wise implementation, on generated data with the awkward cases"""
+
+import csv
+import random
+
+import pandas as pd
+import pytest
+
+import inventory_core
+
+SETS = ["Magic 2011", "Magic 2010", "Alpha", "Commander 2013", "Tempest", "Dominaria", "Ravnica", "Zendikar"]
+CONDITIONS = ["Near Mint", "Lightly Played", "Moderately Played", "Heavily Played", "Damaged"]
+
+
+def rowwise_inventory_changes(main_df, secondary_frames):
+    """The original process_inventory_changes: iterrows over every secondary and main row"""
+    aggregated_quantities = {}
+    for secondary_df in secondary_frames:
+        for _, row in secondary_df.iterrows():
+            card_key = tuple(str(row.get(column, '')).strip().lower()
+                             for column in ("Product Line", "Set", "Product Name", "Number", "Condition"))
+            quantity = row.get("Quantity", 0)
+            try:
+                quantity = int(float(quantity)) if pd.notna(quantity) else 0
+            except (ValueError, TypeError):
+                quantity = 0
+            if quantity > 0 and card_key[0] and card_key[1] and card_key[2]:
+                aggregated_quantities[card_key] = aggregated_quantities.get(card_key, 0) + quantity
+
+    changes = []
+    for _, main_row in main_df.iterrows():
+        main_key = tuple(str(main_row.get(column, '')).strip().lower()
+                         for column in ("Product Line", "Set Name", "Product Name", "Number", "Condition"))
+        if main_key in aggregated_quantities:
+            current_add_quantity = main_row.get("Add to Quantity", 0)
+            try:
+                current_add_quantity = int(float(current_add_quantity)) if pd.notna(current_add_quantity) else 0
+            except (ValueError, TypeError):
+                current_add_quantity = 0
+            new_quantity = aggregated_quantities[main_key]
+            changes.append({
+                'index': main_row.name,
+                'product_line': main_row.get("Product Line", ''),
+                'set_name': main_row.get("Set Name", ''),
+                'product_name': main_row.get("Product Name", ''),
+                'number': main_row.get("Number", ''),
+                'condition': main_row.get("Condition", ''),
+                'current_add_quantity': current_add_quantity,
+                'new_add_quantity': new_quantity,
+                'change': new_quantity - current_add_quantity
+            })
+    return changes
+
+
+def write_parity_files(main_path, scan_paths, rows, seed):
+    """A main inventory and scans with repeated and differently spelled keys, blank key fields, cards the
+    main file lacks, duplicate main rows and unusable quantities"""
+    rng = random.Random(seed)
+    cards = [("Magic", rng.choice(SETS), f"Card {card}", str(card % 300 + 1), rng.choice(CONDITIONS))
+             for card in range(max(1, rows // 2))]
+    blank = rng.randrange(len(cards))
+    cards[blank] = cards[blank][:2] + ("",) + cards[blank][3:]
+    with open(main_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Product Line", "Set Name", "Product Name", "Number", "Condition", "Add to Quantity", "Price"])
+        for _ in range(rows):
+            card = list(rng.choice(cards))
+            if rng.random() < 0.05:
+                card[3] = ""
+            writer.writerow(card + [rng.choice(["0", "1", "2", "", "3x"]), round(rng.uniform(0.1, 50), 2)])
+
+    for scan_path in scan_paths:
+        with open(scan_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Product Line", "Set", "Product Name", "Number", "Condition", "Quantity"])
+            for _ in range(rows):
+                card = list(rng.choice(cards))
+                dirt = rng.random()
+                if dirt < 0.1:
+                    card = [f" {value.upper()} " for value in card]
+                elif dirt < 0.15:
+                    card[2] = f"Missing {rng.randrange(1000)}"
+                elif dirt < 0.2:
+                    card[rng.randrange(5)] = ""
+                writer.writerow(card + [rng.choice(["1", "2", "3", "3.0", "", "x", "-1", "0"])])
+
+
+def same_value(actual, expected):
+    # Blank key fields are NaN on both sides
+    return actual == expected or (actual != actual and expected != expected)
+
+
+@pytest.fixture(params=[False, True], ids=["python-engine", "pyarrow-engine"])
+def engine(request, monkeypatch):
+    if request.param and not inventory_core.PYARROW_AVAILABLE:
+        pytest.skip("pyarrow is not installed")
+    monkeypatch.setattr(inventory_core, 'PYARROW_AVAILABLE', request.param)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_change_list_matches_rowwise_original(tmp_path, engine, seed):
+    main_path = str(tmp_path / "main.csv")
+    scan_paths = [str(tmp_path / f"scan_{i}.csv") for i in range(3)]
+    write_parity_files(main_path, scan_paths, 1000, seed)
+
+    main_df = inventory_core.load_csv_data(main_path)
+    partials = inventory_core.load_secondary_partials(scan_paths, workers=1)
+    changes = inventory_core.find_inventory_changes(main_df, inventory_core.reduce_partials(partials.values()))
+    actual = [{field: value for field, value in change.items() if field != 'match'} for change in changes]
+    assert actual
+
+    # The frames the original read: plain read_csv, so every cleaning step above is under test
+    expected = rowwise_inventory_changes(pd.read_csv(main_path), [pd.read_csv(path) for path in scan_paths])
+    assert len(actual) == len(expected)
+    for change, original in zip(actual, expected):
+        assert change.keys() == original.keys()
+        assert all(same_value(change[field], original[field]) for field in original), (change, original)
+
+    # Read as text, key fields keep their spelling ('180', not 180.0); the matches must not change
+    as_text = rowwise_inventory_changes(pd.read_csv(main_path, dtype=str),
+                                        [pd.read_csv(path, dtype=str) for path in scan_paths])
+    fields = ('index', 'current_add_quantity', 'new_add_quantity', 'change')
+    assert [tuple(change[field] for field in fields) for change in actual] == \
+        [tuple(change[field] for field in fields) for change in as_text]
+
+    # The "3x" quantities leave Add to Quantity as text; the new quantities must still go in
+    inventory_core.apply_changes(main_df, changes)
+    applied = main_df[inventory_core.MAIN_ADD_QUANTITY]
+    assert all(applied.at[change['index']] == change['new_add_quantity'] for change in changes)
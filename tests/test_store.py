@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import inventory_core
+import inventory_store
+
+
+@pytest.fixture
+def store(tmp_path, sample_file):
+    with inventory_store.InventoryStore(str(tmp_path / "inventory.db")) as store:
+        store.set_main(sample_file("sample_main_inventory.csv"))
+        store.import_files([sample_file("sample_addition1.csv"), sample_file("sample_addition2.csv")], workers=1)
+        yield store
+
+
+def merged_changes(sample_file, aliases=None):
+    main_df = inventory_core.load_csv_data(sample_file("sample_main_inventory.csv"))
+    partials = inventory_core.load_secondary_partials(
+        [sample_file("sample_addition1.csv"), sample_file("sample_addition2.csv")], workers=1)
+    return inventory_core.find_inventory_changes(main_df, inventory_core.reduce_partials(partials.values()), aliases)
+
+
+def test_main_frame_reads_back_the_loaded_main(store, sample_file):
+    pd.testing.assert_frame_equal(store.main_frame(),
+                                  inventory_core.load_csv_data(sample_file("sample_main_inventory.csv")))
+
+
+def test_matched_rows_are_indexed_as_in_main_frame(store):
+    rows, quantities = store.matched_rows()
+    assert len(rows) == len(quantities) > 0
+    pd.testing.assert_frame_equal(rows, store.main_frame().loc[rows.index])
+
+
+@pytest.mark.parametrize("fuzzy", [False, True], ids=["exact", "fuzzy"])
+def test_changes_match_a_merge(store, sample_file, fuzzy):
+    aliases = inventory_core.load_alias_tables() if fuzzy else None
+    assert store.changes(aliases) == merged_changes(sample_file, aliases)
+
+
+def test_delta_export_writes_what_a_merge_writes(store, sample_file, tmp_path):
+    store_delta, merge_delta = str(tmp_path / "store-changes.csv"), str(tmp_path / "merge-changes.csv")
+    changes = store.export(delta_path=store_delta, since="2000-01-01")
+    main_df = inventory_core.load_csv_data(sample_file("sample_main_inventory.csv"))
+    expected = merged_changes(sample_file)
+    inventory_core.apply_changes(main_df, expected)
+    inventory_core.write_inventory(main_df, None, None, merge_delta, expected)
+    assert changes == expected
+    with open(store_delta, "rb") as actual, open(merge_delta, "rb") as written:
+        assert actual.read() == written.read()
+
+
+def test_since_after_every_batch_changes_nothing(store):
+    assert store.changes(since="9999-01-01") == []